@@ -2,10 +2,19 @@
 
 # This file centralizes all asset paths for the game.
 # It is designed to be imported by other modules, providing a single source of truth for asset locations.
-# The asset loading code is currently commented out and replaced with placeholders to maintain functionality.
+# It also owns the shared image and text caches, so every sprite that uses the same art at the same size
+# gets the same decoded Surface instead of loading the PNG again, and unchanged HUD text is not re-rendered.
 
 import pygame
 import os
+import re
+import weakref
+from collections import OrderedDict
+from settings import (
+    IMAGE_CACHE_MAX_BYTES, TEXT_CACHE_MAX_BYTES, ATLAS_PAGE_SIZE, ATLAS_PADDING,
+    TOWER_SIZE, PLOT_SIZE, SHOP_CARD_ICON_SIZE, SPAWN_GATE_SIZE, CASTLE_SIZE,
+    SHADOW_CRAWLER_SIZE, SHADOW_FLYER_SIZE, SHIELDING_SENTINEL_SIZE, CHRONO_WARPER_SIZE, SABOTEUR_SIZE, HEALER_SIZE,
+)
 
 # --- BASE PATHS ---
 # It's good practice to build absolute paths from the script's location
@@ -87,4 +96,360 @@ def get_placeholder_surface(width, height, color):
 
 # Example of how to use placeholders:
 # self.image = get_placeholder_surface(32, 32, (255, 0, 0)) # Red square for an enemy
-# self.rect = self.image.get_rect()
\ No newline at end of file
+# self.rect = self.image.get_rect()
+
+# --- IMAGE CACHE ---
+# Decoding a PNG and scaling it is far too slow to do in a sprite constructor, since a single
+# wave spawns dozens of enemies in one frame. The cache decodes each file once, keeps the
+# scaled/converted variants keyed by (path, size, alpha) and hands the same Surface to every
+# caller. Callers must treat the returned Surface as read-only and copy() it before drawing on it.
+
+class SurfaceCache:
+    """Least-recently-used store of Surfaces bounded by their total pixel memory."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _lookup(self, key):
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+        return surface
+
+    def _store(self, key, surface):
+        self._entries[key] = surface
+        self.current_bytes += _surface_bytes(surface)
+        # Evicted Surfaces stay alive for anyone still holding them; the cache just lets go
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= _surface_bytes(evicted)
+            self.evictions += 1
+
+
+class ImageCache(SurfaceCache):
+    """Decoded, scaled and converted image Surfaces keyed by (path, size, alpha)."""
+
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def get(self, path, size=None, alpha=True):
+        key = (path, tuple(size) if size is not None else None, alpha)
+        surface = self._lookup(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if size is None:
+            surface = self._decode(path, alpha)
+        else:
+            # Scale from the cached full-size decode so each file is only read from disk once
+            source = self._lookup((path, None, alpha))
+            if source is None:
+                source = self._decode(path, alpha)
+                self._store((path, None, alpha), source)
+            surface = pygame.transform.scale(source, key[1])
+        self._store(key, surface)
+        return surface
+
+    def variant(self, key, build):
+        """Returns the Surface cached under key, calling build() for it on a miss; shares the byte budget."""
+        surface = self._lookup(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self._store(key, surface)
+        return surface
+
+    def contains(self, path, size=None, alpha=True):
+        return (path, tuple(size) if size is not None else None, alpha) in self._entries
+
+    def install(self, path, size, alpha, surface):
+        """Stores a Surface decoded and scaled off the main thread, converting it here.
+
+        Only the main thread touches the cache; preload workers hand their results over through this.
+        """
+        key = (path, tuple(size) if size is not None else None, alpha)
+        if key not in self._entries:
+            self._store(key, self._convert(surface, alpha))
+
+    def _decode(self, path, alpha):
+        return self._convert(pygame.image.load(path), alpha)
+
+    def _convert(self, surface, alpha):
+        # convert()/convert_alpha() need a display mode; headless runs keep the raw pixel format
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        return surface
+
+
+class TextCache(SurfaceCache):
+    """Rendered text Surfaces keyed by (font, text, color, antialias).
+
+    Strings with digits in them (wave, health and currency counters) are assembled on a miss
+    from cached single-digit glyphs and the cached text around them, so a counter ticking up
+    never goes through font.render again once its digits have been seen.
+    """
+
+    def __init__(self, max_bytes=TEXT_CACHE_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def get(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self._lookup(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        # Only antialiased text has a per-pixel alpha format that composes cleanly
+        if antialias and len(text) > 1 and _DIGIT.search(text):
+            surface = self._compose(font, text, key[2])
+        else:
+            surface = font.render(text, antialias, color)
+        self._store(key, surface)
+        return surface
+
+    def _compose(self, font, text, color):
+        pieces = [self.get(font, piece, color) for piece in _DIGIT.split(text) if piece]
+        width = max(font.size(text)[0], sum(piece.get_width() for piece in pieces))
+        height = max(piece.get_height() for piece in pieces)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        # Transparent pixels already carry the text color, so glyph edges blend without dark fringes
+        surface.fill((*color[:3], 0))
+        x = 0
+        for piece in pieces:
+            surface.blit(piece, (x, 0))
+            x += piece.get_width()
+        return surface
+
+
+_DIGIT = re.compile(r"(\d)")
+
+def _surface_bytes(surface):
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+image_cache = ImageCache()
+
+# Which (path, size, alpha) each handed-out Surface was loaded as, so status variants can be cached
+# per asset rather than per Surface; weak, so it never keeps a Surface alive
+_image_keys = weakref.WeakKeyDictionary()
+
+def load_image(path, size=None, alpha=True):
+    """Returns the shared Surface for an image file, optionally scaled to size.
+
+    Sprites packed into the atlas come back as subsurfaces of an atlas page.
+    """
+    if alpha and size is not None:
+        handle = sprite_atlas.handles.get((path, tuple(size)))
+        if handle is not None:
+            _image_keys[handle] = (path, tuple(size), alpha)
+            return handle
+    surface = image_cache.get(path, size, alpha)
+    _image_keys[surface] = (path, tuple(size) if size is not None else None, alpha)
+    return surface
+
+
+# --- SPRITE ATLAS ---
+# Every sprite the game draws at a fixed size is packed into a few large pages when the window
+# opens. load_image then hands out subsurfaces of those pages, so world and UI sprites share a
+# handful of pixel buffers instead of two dozen, and shop icons are scaled once instead of per frame.
+
+ATLAS_SPRITES = [
+    (TOWER_SUNFIRE_SPIRE, TOWER_SIZE),
+    (TOWER_FROST_SPIRE, TOWER_SIZE),
+    (TOWER_STORM_SPIRE, TOWER_SIZE),
+    (TOWER_PLOT, PLOT_SIZE),
+    (TOWER_SUNFIRE_SPIRE, SHOP_CARD_ICON_SIZE),
+    (TOWER_FROST_SPIRE, SHOP_CARD_ICON_SIZE),
+    (TOWER_STORM_SPIRE, SHOP_CARD_ICON_SIZE),
+    (TOWER_PLOT, SHOP_CARD_ICON_SIZE),
+    (ENEMY_SHADOW_CRAWLER, SHADOW_CRAWLER_SIZE),
+    (ENEMY_SHADOW_FLYER, SHADOW_FLYER_SIZE),
+    (ENEMY_SHIELDING_SENTINEL, SHIELDING_SENTINEL_SIZE),
+    (ENEMY_SHIELDING_SENTINEL_NO_SHIELD, SHIELDING_SENTINEL_SIZE),
+    (ENEMY_CHRONO_WARPER, CHRONO_WARPER_SIZE),
+    (ENEMY_SABOTEUR, SABOTEUR_SIZE),
+    (ENEMY_HEALER, HEALER_SIZE),
+    (SPAWN_GATE_IMAGE, SPAWN_GATE_SIZE),
+    (CASTLE_IMAGE, CASTLE_SIZE),
+]
+
+class SpriteAtlas:
+    """Sprites packed into shared pages with a shelf packer; handles maps (path, size) to a subsurface."""
+
+    def __init__(self, page_size=ATLAS_PAGE_SIZE, padding=ATLAS_PADDING):
+        self.page_size = page_size
+        self.padding = padding
+        self.pages = []
+        self.handles = {}
+
+    def build(self, sprites):
+        self.pages = []
+        self.handles = {}
+        # Tallest first keeps each shelf close to full height
+        ordered = sorted(set((path, tuple(size)) for path, size in sprites), key=lambda entry: (-entry[1][1], -entry[1][0]))
+        sizes = [size for _, size in ordered]
+        placements = self._pack(sizes)
+        converted = pygame.display.get_init() and pygame.display.get_surface() is not None
+        for page_size in self._page_sizes(placements, sizes):
+            page = pygame.Surface(page_size, pygame.SRCALPHA)
+            self.pages.append(page.convert_alpha() if converted else page)
+        for (path, size), (page_index, x, y) in zip(ordered, placements):
+            page = self.pages[page_index]
+            page.blit(image_cache.get(path, size), (x, y))
+            self.handles[(path, size)] = page.subsurface(pygame.Rect((x, y), size))
+
+    def _pack(self, sizes):
+        # Returns (page, x, y) per size; a sprite larger than a page gets a page of its own
+        width, height = self.page_size
+        pad = self.padding
+        placements = []
+        page, x, y, shelf = 0, 0, 0, 0
+        for w, h in sizes:
+            if x > 0 and x + w > width: # Next shelf
+                x, y, shelf = 0, y + shelf + pad, 0
+            if y > 0 and y + h > height: # Next page
+                page, x, y, shelf = page + 1, 0, 0, 0
+            placements.append((page, x, y))
+            x = _align(x + w + pad)
+            shelf = max(shelf, h)
+        return placements
+
+    def _page_sizes(self, placements, sizes):
+        # Trim each page to what was actually placed on it
+        extents = {}
+        for (page, x, y), (w, h) in zip(placements, sizes):
+            right, bottom = extents.get(page, (0, 0))
+            extents[page] = (max(right, x + w), max(bottom, y + h))
+        return [(_align(right), bottom) for right, bottom in (extents[page] for page in sorted(extents))]
+
+    def stats(self):
+        return {
+            "pages": len(self.pages),
+            "sprites": len(self.handles),
+            "bytes": sum(_surface_bytes(page) for page in self.pages),
+        }
+
+
+def _align(x):
+    # Sprites start, and page rows end, on 16-byte boundaries; SDL's SIMD alpha blitter needs
+    # aligned rows and falls back to a path about half as fast on a subsurface without them
+    return (x + 3) & ~3
+
+sprite_atlas = SpriteAtlas()
+
+def build_sprite_atlas(sprites=ATLAS_SPRITES):
+    """Packs sprites into the atlas; call once the display mode is set so the pages are converted."""
+    sprite_atlas.build(sprites)
+    return sprite_atlas
+
+
+text_cache = TextCache()
+
+def render_text(font, text, color, antialias=True):
+    """Returns the shared Surface for a string rendered in font; treat it as read-only."""
+    return text_cache.get(font, text, color, antialias)
+
+
+# --- SOUND CACHE ---
+# Every tower of a type, and every hit or death, plays the same Sound rather than decoding the file again.
+
+_sounds = {}
+
+def load_sound(path):
+    """Returns the shared Sound for a file, or None when the mixer is off."""
+    # Headless simulations never initialise the mixer, so they simply go silent
+    if not pygame.mixer.get_init():
+        return None
+    sound = _sounds.get(path)
+    if sound is None:
+        sound = _sounds[path] = pygame.mixer.Sound(path)
+    return sound
+
+def install_sound(path, sound):
+    # For Sounds decoded by the preloader; the first one in wins
+    _sounds.setdefault(path, sound)
+
+def has_sound(path):
+    return path in _sounds
+
+
+
+# --- STATUS VARIANTS ---
+# Frosted enemies, disabled towers and the overcharge glow used to be built with copy() and fresh
+# SRCALPHA surfaces on every hit or every frame. Each variant is now built once per asset and size
+# and kept in the image cache, under its byte budget, so the atlas handle and the plain decode of a
+# sprite share one variant and an atlas rebuild adds nothing. Entities switch between them by reference.
+
+OVERCHARGE_GLOW_STEPS = 16 # Distinct frames of the overcharge pulse
+
+def _frosted(surface, step):
+    frosted = surface.copy()
+    tint = pygame.Surface(frosted.get_size(), pygame.SRCALPHA)
+    tint.fill((173, 216, 230, 128)) # Light blue at 50%
+    frosted.blit(tint, (0, 0))
+    return frosted
+
+def _disabled(surface, step):
+    # The red X is drawn on its own layer and blended over the sprite, not written into its pixels
+    cross = pygame.Surface((50, 50), pygame.SRCALPHA)
+    pygame.draw.line(cross, (255, 0, 0, 200), (0, 0), (50, 50), 5)
+    pygame.draw.line(cross, (255, 0, 0, 200), (50, 0), (0, 50), 5)
+    disabled = surface.copy()
+    disabled.blit(cross, (0, 0))
+    return disabled
+
+def _overcharged(width, step):
+    # The glow drawn around an overcharged tower; step picks how far into the pulse it is
+    pulse = step / (OVERCHARGE_GLOW_STEPS - 1)
+    radius = width // 2 + int(pulse * 5)
+    glow = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    pygame.draw.circle(glow, (255, 255, 0, 50 + int(pulse * 100)), (radius, radius), radius)
+    return glow
+
+_VARIANT_BUILDERS = {
+    "frosted": _frosted,
+    "disabled": _disabled,
+    "overcharged": _overcharged,
+}
+
+def get_variant(surface, variant, step=0):
+    """Returns the shared status variant of a Surface from load_image, building it on first use.
+
+    The overcharge glow only depends on the sprite's width, so every tower type shares it. The
+    unshielded Sentinel has its own art and is loaded like any other image.
+    """
+    build = _VARIANT_BUILDERS[variant]
+    if variant == "overcharged":
+        width = surface.get_width()
+        return image_cache.variant((variant, width, step), lambda: build(width, step))
+    image_key = _image_keys.get(surface)
+    if image_key is None: # Not from load_image, so there is no asset to file it under
+        return build(surface, step)
+    return image_cache.variant((image_key, variant, step), lambda: build(surface, step))
@@ -0,0 +1,74 @@
+import pygame
+import assets
+from settings import SFX_CHANNELS, SFX_MAX_VOICES
+
+# Sounds that fire in bursts get fewer voices than the default; anything not listed gets SFX_MAX_VOICES
+VOICE_LIMITS = {
+    assets.SFX_ENEMY_HIT: 2,
+    assets.SFX_ENEMY_DEATH: 3,
+    assets.SFX_TOWER_FIRE_STORM: 2,
+    assets.SFX_UI_CLICK: 1,
+}
+
+class SFXManager:
+    """Plays sound effects on a fixed pool of mixer channels.
+
+    Sounds are asked for by file path and decoded once through assets.load_sound. A request is
+    dropped if the same sound already played this tick, or if it is already sounding on its
+    voice limit of channels; when every channel is busy the longest-playing one is taken over.
+    So a late-wave volley costs one voice, not one per enemy hit. Without a mixer (headless
+    simulations) every call returns straight away.
+    """
+
+    def __init__(self, channels=SFX_CHANNELS, max_voices=SFX_MAX_VOICES, voice_limits=VOICE_LIMITS):
+        self.channel_count = channels
+        self.max_voices = max_voices
+        self.voice_limits = voice_limits
+        self.volume = 1.0
+        self.channels = None # Set up on first play, once the mixer is running
+        self.voices = {} # path -> channels it was last started on
+        self.played = set() # Paths already started this tick
+        self.dropped = 0
+
+    def new_tick(self):
+        self.played.clear()
+
+    def set_volume(self, volume):
+        # Applied to the channels, so every sample shares one setting
+        self.volume = volume
+        for channel in self.channels or ():
+            channel.set_volume(volume)
+
+    def play(self, path):
+        if path is None or not pygame.mixer.get_init():
+            return None
+        if path in self.played:
+            self.dropped += 1
+            return None
+        if self.channels is None:
+            pygame.mixer.set_num_channels(self.channel_count)
+            self.channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+        sound = assets.load_sound(path)
+        voices = [channel for channel in self.voices.get(path, ()) if channel.get_busy() and channel.get_sound() is sound]
+        if len(voices) >= self.voice_limits.get(path, self.max_voices):
+            self.voices[path] = voices
+            self.dropped += 1
+            return None
+        # force=True hands back the channel that has been playing longest when none is free
+        channel = pygame.mixer.find_channel(True)
+        channel.play(sound)
+        channel.set_volume(self.volume)
+        voices.append(channel)
+        self.voices[path] = voices
+        self.played.add(path)
+        return channel
+
+    def stats(self):
+        return {
+            "channels": self.channel_count,
+            "busy": sum(channel.get_busy() for channel in self.channels or ()),
+            "dropped": self.dropped,
+        }
+
+
+sfx = SFXManager()
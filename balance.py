@@ -0,0 +1,254 @@
+import os
+import sys
+import ast
+import csv
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+import settings
+import levels
+from simulation import run_headless, init_headless
+from towers import TOWER_TYPES
+
+# --- PLACEMENT PLANS ---
+# Each plan turns a level's map data into run_headless placements: (tower_type, spot) entries
+# built before the first wave, or (tower_type, spot, wave) entries built when that wave starts.
+
+PLANS = {}
+
+def plan(name):
+    def register(build):
+        PLANS[name] = build
+        return build
+    return register
+
+def _cycle_types(spots):
+    types = list(TOWER_TYPES)
+    return [(types[i % len(types)], spot) for i, spot in enumerate(spots)]
+
+@plan("initial")
+def _initial(map_data):
+    # Only the free plots, cycling through the spire types
+    return _cycle_types(map_data["initial_tower_spots"])
+
+@plan("fill")
+def _fill(map_data):
+    # Every plot the level offers, bought up front
+    return _cycle_types(map_data["initial_tower_spots"] + map_data["purchasable_tower_spots"])
+
+@plan("expand")
+def _expand(map_data):
+    # The free plots first, then one purchasable plot per wave from wave 2, as currency allows
+    placements = _initial(map_data)
+    for i, (tower_type, spot) in enumerate(_cycle_types(map_data["purchasable_tower_spots"])):
+        placements.append((tower_type, spot, i + 2))
+    return placements
+
+for _tower_type in TOWER_TYPES:
+    @plan(f"{_tower_type}-only")
+    def _single_type(map_data, tower_type=_tower_type):
+        return [(tower_type, spot) for spot in map_data["initial_tower_spots"] + map_data["purchasable_tower_spots"]]
+
+
+# --- SETTINGS OVERRIDES ---
+# Game modules take their constants with `from settings import *`, so an override is written into
+# settings and into every game module holding that name, where a run picks it up as it builds its
+# towers and enemies.
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _game_modules():
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) == GAME_DIR:
+            yield module
+
+def apply_overrides(overrides):
+    """Sets each settings constant in overrides across the game's modules; returns the previous values."""
+    previous = {}
+    modules = list(_game_modules())
+    for name, value in overrides.items():
+        previous[name] = getattr(settings, name)
+        for module in modules:
+            if name in vars(module):
+                setattr(module, name, value)
+    return previous
+
+def parse_override(text):
+    # "STORM_SPIRE_DAMAGE=10,15,20" -> ("STORM_SPIRE_DAMAGE", [10, 15, 20])
+    name, _, values = text.partition("=")
+    if not name.isupper() or not hasattr(settings, name):
+        raise argparse.ArgumentTypeError(f"'{name}' is not a constant in settings.py")
+    try:
+        parsed = [ast.literal_eval(value.strip()) for value in values.split(",")]
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f"values for {name} must be Python literals, e.g. {name}=10,15")
+    return name, parsed
+
+def expand_variants(overrides):
+    """Every combination of the swept values, as a list of {name: value} dicts; [{}] without overrides."""
+    names = [name for name, _ in overrides]
+    return [dict(zip(names, values)) for values in itertools.product(*(values for _, values in overrides))]
+
+
+# --- RUNNING ---
+# Jobs are plain tuples so they pickle cheaply; each worker process keeps the variant table it was
+# started with and only receives indexes into it.
+
+_variants = None
+
+def _init_worker(variants):
+    global _variants
+    _variants = variants
+    init_headless()
+
+def play_job(job):
+    """Runs one (level, plan, variant, seed) job in this process and returns its result row."""
+    level_index, plan_name, variant_index, seed, options = job
+    overrides = _variants[variant_index]
+    previous = apply_overrides(overrides)
+    try:
+        placements = PLANS[plan_name](levels.ALL_LEVELS[level_index]["map_data"])
+        result = run_headless(level_index, placements, options["waves"], options["currency"], options["max_ticks"], seed)
+    finally:
+        apply_overrides(previous)
+    return {
+        "level": result["level"],
+        "plan": plan_name,
+        "variant": variant_index,
+        "seed": seed,
+        "outcome": result["outcome"],
+        "waves_survived": result["waves_reached"] if result["outcome"] == "win" else max(result["waves_reached"] - 1, 0),
+        "crystal_lost": 100 - max(result["heartcrystal_health"], 0),
+        "meta_currency": result["meta_currency"],
+        "towers_built": len(result["towers_built"]),
+        "wave_curve": result["wave_curve"],
+        "ticks": result["ticks"],
+        "seconds": result["seconds"],
+    }
+
+def run_sweep(level_indexes, plan_names, variants, seeds, options, workers=None, progress=None):
+    """Plays every combination across a pool of worker processes and returns the result rows.
+
+    Rows arrive in whatever order the workers finish; progress(done, total) is called after each.
+    """
+    jobs = [(level_index, plan_name, variant_index, seed, options)
+            for level_index in level_indexes
+            for plan_name in plan_names
+            for variant_index in range(len(variants))
+            for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    # Several jobs per hand-off keeps the pipe quiet; small enough that the last chunks still balance
+    chunksize = max(1, len(jobs) // (workers * 8))
+    rows = []
+    # spawn rather than fork: workers start clean, with no window or mixer inherited from the parent
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(workers, initializer=_init_worker, initargs=(variants,))
+    try:
+        for row in pool.imap_unordered(play_job, jobs, chunksize):
+            rows.append(row)
+            if progress is not None:
+                progress(len(rows), len(jobs))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return rows
+
+
+# --- REPORTING ---
+
+def summarize(rows, variants):
+    """Merges result rows into one summary per (level, plan, variant), sorted by those."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["level"], row["plan"], row["variant"]), []).append(row)
+    summaries = []
+    for (level, plan_name, variant_index), group in sorted(groups.items(), key=lambda item: (item[0][0], item[0][1], item[0][2])):
+        count = len(group)
+        waves = sorted(row["waves_survived"] for row in group)
+        longest = max(len(row["wave_curve"]) for row in group)
+        # Mean (Aetherium, volatile, Heartcrystal) at the start of each wave, over the runs that reached it
+        curve = []
+        for wave in range(longest):
+            points = [row["wave_curve"][wave] for row in group if len(row["wave_curve"]) > wave]
+            curve.append([round(sum(point[i] for point in points) / len(points), 1) for i in range(3)])
+        summaries.append({
+            "level": level,
+            "plan": plan_name,
+            "overrides": variants[variant_index],
+            "runs": count,
+            "win_rate": sum(row["outcome"] == "win" for row in group) / count,
+            "waves_mean": sum(waves) / count,
+            "waves_min": waves[0],
+            "waves_p10": waves[max(0, -(-count // 10) - 1)],
+            "crystal_lost_mean": sum(row["crystal_lost"] for row in group) / count,
+            "meta_currency_mean": sum(row["meta_currency"] for row in group) / count,
+            "currency_curve": curve,
+        })
+    return summaries
+
+def format_overrides(overrides):
+    return " ".join(f"{name}={value}" for name, value in overrides.items()) or "(defaults)"
+
+def print_summary(summaries):
+    print(f"{'level':<10}{'plan':<14}{'runs':>6}{'win %':>8}{'waves':>7}{'min':>5}{'p10':>5}{'crystal -':>11}{'Aetherium':>11}  overrides")
+    for s in summaries:
+        print(f"{s['level']:<10}{s['plan']:<14}{s['runs']:>6}{s['win_rate'] * 100:>8.1f}{s['waves_mean']:>7.2f}{s['waves_min']:>5}{s['waves_p10']:>5}"
+              f"{s['crystal_lost_mean']:>11.1f}{s['meta_currency_mean']:>11.0f}  {format_overrides(s['overrides'])}")
+
+def write_results(path, rows, summaries, meta):
+    """Writes everything as JSON if path ends in .json, otherwise the summary table as CSV."""
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump({**meta, "summary": summaries, "runs": rows}, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["level", "plan", "overrides", "runs", "win_rate", "waves_mean", "waves_min", "waves_p10", "crystal_lost_mean", "meta_currency_mean"])
+        for s in summaries:
+            writer.writerow([s["level"], s["plan"], format_overrides(s["overrides"]), s["runs"], f"{s['win_rate']:.4f}", f"{s['waves_mean']:.3f}",
+                             s["waves_min"], s["waves_p10"], f"{s['crystal_lost_mean']:.2f}", f"{s['meta_currency_mean']:.1f}"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play many headless runs across all cores and summarize how each setup fares.")
+    parser.add_argument("--level", type=int, action="append", help="1-based level to include (repeatable; default all)")
+    parser.add_argument("--plan", action="append", choices=sorted(PLANS), help="placement plan to include (repeatable; default all)")
+    parser.add_argument("--set", type=parse_override, action="append", default=[], metavar="NAME=V1[,V2...]",
+                        help="sweep a settings.py constant over these values (repeatable; every combination is played)")
+    parser.add_argument("--seeds", type=int, default=20, help="runs per combination, seeded 0..N-1 from --seed-base")
+    parser.add_argument("--seed-base", type=int, default=0)
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--currency", type=int, default=800, help="starting Aetherium")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--out", metavar="FILE", help="write every run and the summary as JSON (.json), or the summary table as CSV")
+    args = parser.parse_args()
+
+    level_indexes = [level - 1 for level in args.level] if args.level else list(range(len(levels.ALL_LEVELS)))
+    if any(not 0 <= index < len(levels.ALL_LEVELS) for index in level_indexes):
+        parser.error(f"levels run from 1 to {len(levels.ALL_LEVELS)}")
+    plan_names = args.plan or list(PLANS)
+    variants = expand_variants(args.set)
+    seeds = range(args.seed_base, args.seed_base + args.seeds)
+    options = {"waves": args.waves, "currency": args.currency, "max_ticks": args.max_ticks}
+
+    def report(done, total):
+        if done == total or done % max(1, total // 20) == 0:
+            print(f"{done}/{total} runs", file=sys.stderr)
+
+    start = time.perf_counter()
+    rows = run_sweep(level_indexes, plan_names, variants, seeds, options, args.workers, report)
+    elapsed = time.perf_counter() - start
+    summaries = summarize(rows, variants)
+    print_summary(summaries)
+    ticks = sum(row["ticks"] for row in rows)
+    print(f"\n{len(rows)} runs, {ticks} ticks in {elapsed:.1f}s ({ticks / elapsed:.0f} ticks/s across {args.workers or os.cpu_count()} workers)", file=sys.stderr)
+
+    if args.out:
+        write_results(args.out, rows, summaries, {"options": options, "seeds": [seeds.start, seeds.stop], "seconds": elapsed})
+    sys.exit(0)
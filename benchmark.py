@@ -0,0 +1,284 @@
+import sys
+import gc
+import json
+import time
+import random
+import platform
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pygame
+from settings import *
+import levels
+from simulation import Simulation, init_headless
+from profiler import FrameProfiler
+from towers import TOWER_TYPES
+from targeting import TARGETING_POLICIES
+from enemies import ShadowCrawler
+from effects import create_aoe_explosion
+
+try:
+    import resource
+except ImportError: # Windows has no getrusage; peak RSS is reported as None there
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- SCENARIOS ---
+# Each scenario is (level index, setup(sim), max ticks). Setup runs after the level is reset and
+# prepares whatever the scenario stresses; the run then ticks until max ticks or the run ends.
+
+SCENARIOS = {}
+
+def scenario(name, level_index=0, ticks=600):
+    def register(setup):
+        SCENARIOS[name] = (level_index, setup, ticks)
+        return setup
+    return register
+
+def place_along_path(enemy, distance):
+    # Starts an enemy part-way along its path instead of at the spawn gate
+    enemy.distance_traveled = distance
+    enemy.path_index, enemy.pos = enemy.path.locate(distance)
+    enemy.prev_x, enemy.prev_y = enemy.pos
+    enemy.rect.center = enemy.pos
+
+def hold_wave(sim, count, health=None):
+    """Stands in for a wave of count crawlers that stays the same size for the whole run.
+
+    No real waves spawn, crawlers that die or leak are replaced at the spawn gate and leaks
+    never cost the Heartcrystal, so every tick does the same amount of work.
+    """
+    path = sim.level.path
+    sim.wave_timer = 10 ** 9
+
+    def spawn(distance):
+        crawler = ShadowCrawler(path)
+        if health is not None:
+            crawler.health = crawler.max_health = health
+        place_along_path(crawler, distance)
+        sim.spawn_enemy(crawler)
+
+    # Spread over the first 60% of the path to start with
+    for i in range(count):
+        spawn(path.total_length * 0.6 * i / count)
+
+    original_update = sim.update
+    def update():
+        original_update()
+        for _ in range(count - len(sim.enemies)):
+            spawn(0.0)
+        sim.heartcrystal_health = 100
+    sim.update = update
+
+def fill_level_spots(sim):
+    # Every plot the level offers, cycling through the spire types
+    types = list(TOWER_TYPES)
+    sim.meta_currency = 10 ** 6
+    spots = sim.level.initial_tower_spots + sim.level.purchasable_tower_spots
+    for i, spot in enumerate(spots):
+        sim.place_tower(types[i % len(types)], spot)
+
+for _index, _level_data in enumerate(levels.ALL_LEVELS):
+    # Each level through wave 10 with every plot filled
+    scenario(f"level-{_index + 1}", _index, ticks=30000)(fill_level_spots)
+
+for _count in (500, 2000, 5000):
+    @scenario(f"crawlers-{_count}", ticks=300)
+    def _crawlers(sim, count=_count):
+        fill_level_spots(sim)
+        hold_wave(sim, count)
+
+for _tower_type in TOWER_TYPES:
+    @scenario(f"grid-{_tower_type}", ticks=600)
+    def _grid(sim, tower_type=_tower_type):
+        # A tower every 160 pixels across the whole map, shooting at crawlers that never die
+        for x in range(80, SCREEN_WIDTH, 160):
+            for y in range(80, SCREEN_HEIGHT, 160):
+                sim.add_tower(TOWER_TYPES[tower_type]((x, y)))
+        hold_wave(sim, 300, health=10 ** 9)
+
+for _policy in TARGETING_POLICIES:
+    @scenario(f"target-{_policy}", ticks=600)
+    def _targeting(sim, policy=_policy):
+        # Sunfire and Frost Spires across the map, all on one policy, choosing among a crowd of crawlers
+        for i, x in enumerate(range(80, SCREEN_WIDTH, 160)):
+            for j, y in enumerate(range(80, SCREEN_HEIGHT, 160)):
+                tower = TOWER_TYPES["sunfire" if (i + j) % 2 else "frost"]((x, y))
+                tower.targeting = policy
+                sim.add_tower(tower)
+        hold_wave(sim, 1000)
+
+@scenario("aoe-spam", ticks=600)
+def _aoe_spam(sim):
+    hold_wave(sim, 200, health=10 ** 9)
+    rng = random.Random(0)
+    path = sim.level.path
+    original_update = sim.update
+
+    def update():
+        # Three Aetheric Bursts on the path every 5 ticks, as if the ability had no cost or cooldown
+        if sim.tick % 5 == 0:
+            for _ in range(3):
+                _, (x, y) = path.locate(rng.uniform(0, path.total_length))
+                create_aoe_explosion(x, y, sim.particles)
+                for enemy in sim.enemy_index.query_radius(x, y, AOE_ATTACK_RADIUS):
+                    enemy.take_damage(AOE_ATTACK_DAMAGE, None, None)
+        original_update()
+    sim.update = update
+
+
+# --- RUNNING ---
+
+def make_sim(level_index, render, seed):
+    # A fixed seed keeps the waves and spawns the same from run to run, so baselines compare one workload
+    level_data = levels.ALL_LEVELS[level_index]
+    if render:
+        # The full Game draws exactly what a player would see; importing it opens the dummy window
+        from main import Game
+        sim = Game()
+        # Simulation.reset_run rather than Game.reset_run: benchmarks never start the music
+        sim.ensure_assets()
+        Simulation.reset_run(sim, level_data, seed=seed)
+    else:
+        sim = Simulation(level_data["map_data"])
+        sim.reset_run(level_data, seed=seed)
+    return sim
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_scenario(name, render=True, seed=0):
+    """Runs one scenario in this process and returns its measurements as a dict."""
+    init_headless()
+    level_index, setup, max_ticks = SCENARIOS[name]
+    sim = make_sim(level_index, render, seed)
+    setup(sim)
+    profiler = FrameProfiler(capacity=max_ticks, enabled=True)
+    sim.profiler = profiler
+
+    collections = [0, 0, 0]
+    def count_collections(phase, info):
+        if phase == "start":
+            collections[info["generation"]] += 1
+    gc.callbacks.append(count_collections)
+    blocks_before = sys.getallocatedblocks()
+
+    update_seconds = 0.0
+    start = time.perf_counter()
+    while sim.game_state == "playing" and sim.tick < max_ticks:
+        profiler.start_frame()
+        tick_start = time.perf_counter()
+        sim.update()
+        update_seconds += time.perf_counter() - tick_start
+        if render:
+            sim.draw()
+            pygame.display.flip()
+            profiler.lap("flip")
+        profiler.end_frame()
+    elapsed = time.perf_counter() - start
+
+    gc.callbacks.remove(count_collections)
+    ticks = max(sim.tick, 1)
+    summary = profiler.summary()
+    return {
+        "seed": seed,
+        "outcome": sim.game_state,
+        "waves_reached": sim.wave_number,
+        "ticks": sim.tick,
+        "seconds": elapsed,
+        "ticks_per_second": sim.tick / update_seconds if update_seconds > 0 else 0.0,
+        "frame_ms": summary.pop("total"),
+        "phase_ms": {phase: stats for phase, stats in summary.items() if stats["p99"] > 0},
+        # Python exposes no allocation counter; GC passes and net block growth stand in for it
+        "gc_collections_per_1k_ticks": [count * 1000 / ticks for count in collections],
+        "net_blocks_per_tick": (sys.getallocatedblocks() - blocks_before) / ticks,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+def run_isolated(name, render, seed):
+    # A fresh process per scenario keeps peak RSS and the asset caches from carrying over
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_scenario, name, render, seed).result()
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__ if np is not None else None,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# --- REPORTING ---
+
+def print_results(results):
+    print(f"{'scenario':<16}{'ticks':>7}{'ticks/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'gc0/1k':>8}{'blk/tick':>10}{'RSS MB':>8}")
+    for name, r in results.items():
+        frame = r["frame_ms"]
+        rss = f"{r['peak_rss_kb'] / 1024:.0f}" if r["peak_rss_kb"] is not None else "-"
+        print(f"{name:<16}{r['ticks']:>7}{r['ticks_per_second']:>10.0f}{frame['p50']:>9.2f}{frame['p95']:>9.2f}{frame['p99']:>9.2f}"
+              f"{r['gc_collections_per_1k_ticks'][0]:>8.1f}{r['net_blocks_per_tick']:>10.1f}{rss:>8}")
+
+def compare(results, baseline, threshold):
+    """Prints each scenario against the baseline and returns the names that regressed by more than threshold."""
+    regressions = []
+    print(f"\n{'scenario':<16}{'ticks/s':>18}{'frame p95 ms':>22}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<16}  (not in baseline)")
+            continue
+        speed = r["ticks_per_second"] / base["ticks_per_second"] - 1 if base["ticks_per_second"] else 0.0
+        p95 = r["frame_ms"]["p95"] / base["frame_ms"]["p95"] - 1 if base["frame_ms"]["p95"] else 0.0
+        regressed = speed < -threshold or p95 > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<16}{r['ticks_per_second']:>10.0f} {speed:>+6.1%}{r['frame_ms']['p95']:>14.2f} {p95:>+6.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Aetheria's simulation and rendering under the SDL dummy drivers.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only this scenario (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    parser.add_argument("--no-render", action="store_true", help="time the simulation only, without drawing frames")
+    parser.add_argument("--seed", type=int, default=0, help="run seed for every scenario (default 0)")
+    parser.add_argument("--out", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against results written earlier with --out")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (level_index, _, ticks) in SCENARIOS.items():
+            print(f"{name:<16} level {level_index + 1}, up to {ticks} ticks")
+        sys.exit(0)
+
+    render = not args.no_render
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_isolated(name, render, args.seed)
+        print(f"{name}: {results[name]['ticks_per_second']:.0f} ticks/s", file=sys.stderr)
+    print_results(results)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"environment": environment(), "render": render, "seed": args.seed, "scenarios": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("render", True) != render:
+            print("warning: baseline was recorded with a different --no-render setting", file=sys.stderr)
+        if baseline.get("seed") != args.seed:
+            print(f"warning: baseline was recorded with seed {baseline.get('seed')}, not {args.seed}; the workloads differ", file=sys.stderr)
+        if compare(results, baseline["scenarios"], args.threshold):
+            sys.exit(1)
+    sys.exit(0)
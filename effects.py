@@ -2,94 +2,217 @@ import pygame
 import random
 from settings import *
 
-class Particle(pygame.sprite.Sprite):
-    def __init__(self, x, y, color, lifetime):
-        super().__init__()
-        self.x = x
-        self.y = y
-        self.color = color
-        self.lifetime = lifetime
-        self.size = random.randint(2, 5)
-        self.image = pygame.Surface((self.size, self.size))
-        self.image.fill(self.color)
-        self.rect = self.image.get_rect(center=(self.x, self.y))
-        self.vx = random.uniform(-2, 2)
-        self.vy = random.uniform(-2, 2)
+try:
+    import numpy as np
+except ImportError: # Without NumPy particles are stepped in a plain Python loop
+    np = None
+
+# Randomness that only changes how a frame looks, such as lightning jitter. Kept apart from the
+# simulation's RNG so drawing more or fewer frames never changes how a run plays out.
+visual_rng = random.Random()
 
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.rect.center = (self.x, self.y)
-        self.lifetime -= 1
-        if self.lifetime <= 0:
-            self.kill()
 
-class Shockwave(pygame.sprite.Sprite):
+class Shockwave:
     def __init__(self, x, y, max_radius, lifetime, color):
-        super().__init__()
+        self.max_radius = max_radius
+        # One surface for the whole animation, cleared and redrawn instead of reallocated
+        self.image = pygame.Surface((self.max_radius * 2, self.max_radius * 2), pygame.SRCALPHA)
+        self.rect = self.image.get_rect()
+        self.reset(x, y, lifetime, color)
+
+    def reset(self, x, y, lifetime, color):
         self.x = x
         self.y = y
-        self.max_radius = max_radius
         self.lifetime = lifetime
         self.start_lifetime = lifetime
         self.color = color
         self.current_radius = 0
-        self.image = pygame.Surface((self.max_radius * 2, self.max_radius * 2), pygame.SRCALPHA)
-        self.rect = self.image.get_rect(center=(self.x, self.y))
+        self.image.fill((0, 0, 0, 0))
+        self.rect.center = (x, y)
 
     def update(self):
         self.lifetime -= 1
         if self.lifetime <= 0:
-            self.kill()
-            return
+            return False
 
         progress = 1 - (self.lifetime / self.start_lifetime)
         self.current_radius = int(self.max_radius * progress)
-        
-        # Create a new surface each frame to handle changing alpha
-        self.image = pygame.Surface((self.max_radius * 2, self.max_radius * 2), pygame.SRCALPHA)
+
+        self.image.fill((0, 0, 0, 0))
         alpha = int(255 * (1 - progress))
-        
         pygame.draw.circle(self.image, (*self.color, alpha), (self.max_radius, self.max_radius), self.current_radius, 3)
-        self.rect = self.image.get_rect(center=(self.x, self.y))
+        return True
+
+
+class ParticleSystem:
+    """Fixed-capacity particle pool stepped as arrays and drawn with one batched blit.
+
+    Particles are plain rows (position, velocity, lifetime, stamp) rather than Sprites; each
+    stamp is a small pre-filled square Surface shared by every particle of that color and size.
+    Emissions beyond capacity are dropped.
+    """
+
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.shockwaves = []
+        self._spent_shockwaves = {} # max_radius -> finished Shockwaves, reused by shockwave()
+        self._stamps = [] # stamp id -> Surface
+        self._stamp_ids = {} # (color, size) -> stamp id
+        self._half_sizes = [] # stamp id -> offset from particle center to stamp top-left
+        if np is not None:
+            self._rng = np.random.default_rng()
+            self.x = np.zeros(capacity)
+            self.y = np.zeros(capacity)
+            self.vx = np.zeros(capacity)
+            self.vy = np.zeros(capacity)
+            self.life = np.zeros(capacity, dtype="int32")
+            self.stamp = np.zeros(capacity, dtype="int32")
+        else:
+            self._rng = random.Random()
+            self._rows = []
+
+    def __len__(self):
+        return self.count + len(self.shockwaves)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def _stamp_id(self, color, size):
+        key = (tuple(color), size)
+        stamp_id = self._stamp_ids.get(key)
+        if stamp_id is None:
+            stamp = pygame.Surface((size, size))
+            stamp.fill(color)
+            stamp_id = len(self._stamps)
+            self._stamps.append(stamp)
+            self._stamp_ids[key] = stamp_id
+            self._half_sizes.append(size // 2)
+        return stamp_id
+
+    def emit(self, x, y, count, colors, lifetime, speed=2, size=(2, 5)):
+        """Spawns count particles at (x, y) with random color, lifetime, velocity and size.
+
+        lifetime and size are inclusive (min, max) ranges; velocity components are uniform
+        in [-speed, speed].
+        """
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        stamp_table = [[self._stamp_id(color, s) for s in range(size[0], size[1] + 1)] for color in colors]
+        if np is None:
+            rng = self._rng
+            for _ in range(count):
+                stamp = rng.choice(rng.choice(stamp_table))
+                self._rows.append([x, y, rng.uniform(-speed, speed), rng.uniform(-speed, speed), rng.randint(*lifetime), stamp])
+            self.count += count
+            return
+
+        rng = self._rng
+        start, end = self.count, self.count + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = rng.uniform(-speed, speed, count)
+        self.vy[start:end] = rng.uniform(-speed, speed, count)
+        self.life[start:end] = rng.integers(lifetime[0], lifetime[1] + 1, count)
+        stamps = np.array(stamp_table, dtype="int32")
+        self.stamp[start:end] = stamps[rng.integers(0, len(colors), count), rng.integers(0, stamps.shape[1], count)]
+        self.count = end
+
+    def shockwave(self, x, y, max_radius, lifetime, color):
+        # Finished shockwaves keep their surface, so one of the same size is reset instead of built
+        spent = self._spent_shockwaves.get(max_radius)
+        if spent:
+            wave = spent.pop()
+            wave.reset(x, y, lifetime, color)
+        else:
+            wave = Shockwave(x, y, max_radius, lifetime, color)
+        self.shockwaves.append(wave)
+        return wave
+
+    def update(self):
+        if self.shockwaves:
+            live = []
+            for wave in self.shockwaves:
+                if wave.update():
+                    live.append(wave)
+                else:
+                    self._spent_shockwaves.setdefault(wave.max_radius, []).append(wave)
+            self.shockwaves = live
+        if self.count == 0:
+            return
+        if np is None:
+            rows = self._rows
+            for row in rows:
+                row[0] += row[2]
+                row[1] += row[3]
+                row[4] -= 1
+            self._rows = [row for row in rows if row[4] > 0]
+            self.count = len(self._rows)
+            return
+
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
+        # Compact the survivors to the front so the live rows stay contiguous
+        alive = self.life[:n] > 0
+        survivors = int(alive.sum())
+        if survivors < n:
+            for column in (self.x, self.y, self.vx, self.vy, self.life, self.stamp):
+                column[:survivors] = column[:n][alive]
+        self.count = survivors
+
+    def seed(self, seed):
+        # Particles are cosmetic, but seeding them with the run makes a replay look the same too
+        self._rng = np.random.default_rng(seed) if np is not None else random.Random(seed)
+
+    def empty(self):
+        self.count = 0
+        for wave in self.shockwaves:
+            self._spent_shockwaves.setdefault(wave.max_radius, []).append(wave)
+        self.shockwaves.clear()
+        if np is None:
+            self._rows.clear()
+
+    def draw(self, surface, offset):
+        ox, oy = offset
+        if self.count:
+            stamps = self._stamps
+            half_sizes = self._half_sizes
+            if np is None:
+                sequence = [(stamps[r[5]], (int(r[0]) - half_sizes[r[5]] + ox, int(r[1]) - half_sizes[r[5]] + oy)) for r in self._rows]
+            else:
+                n = self.count
+                ids = self.stamp[:n]
+                half = np.array(half_sizes, dtype="int32")[ids]
+                xs = (self.x[:n].astype("int32") - half + ox).tolist()
+                ys = (self.y[:n].astype("int32") - half + oy).tolist()
+                sequence = list(zip(map(stamps.__getitem__, ids.tolist()), zip(xs, ys)))
+            if hasattr(surface, "fblits"):
+                surface.fblits(sequence)
+            else:
+                surface.blits(sequence, doreturn=False)
+        for wave in self.shockwaves:
+            surface.blit(wave.image, wave.rect.move(offset))
 
 
 def create_explosion(x, y, particles_group):
-    for _ in range(20):
-        color = random.choice([ORANGE, YELLOW])
-        particle = Particle(x, y, color, random.randint(20, 40))
-        particles_group.add(particle)
+    particles_group.emit(x, y, 20, [ORANGE, YELLOW], (20, 40))
 
 def create_dissolve_effect(x, y, particles_group):
-    for _ in range(15):
-        particle = Particle(x, y, GREY, random.randint(10, 30))
-        particles_group.add(particle)
+    particles_group.emit(x, y, 15, [GREY], (10, 30))
 
 def create_frost_effect(x, y, particles_group):
-    for _ in range(15):
-        color = random.choice([LIGHT_BLUE, WHITE])
-        particle = Particle(x, y, color, random.randint(15, 35))
-        particles_group.add(particle)
+    particles_group.emit(x, y, 15, [LIGHT_BLUE, WHITE], (15, 35))
 
 def create_storm_effect(x, y, particles_group):
     # Lightning sparks
-    for _ in range(10):
-        color = random.choice([WHITE, YELLOW])
-        particle = Particle(x, y, color, random.randint(10, 20))
-        particle.vx = random.uniform(-4, 4)
-        particle.vy = random.uniform(-4, 4)
-        particle.size = random.randint(1, 3)
-        particles_group.add(particle)
+    particles_group.emit(x, y, 10, [WHITE, YELLOW], (10, 20), speed=4, size=(1, 3))
 
 def create_aoe_explosion(x, y, particles_group):
     # A bigger, more impactful explosion
-    for _ in range(50):
-        color = random.choice([RED, ORANGE, YELLOW])
-        particle = Particle(x, y, color, random.randint(30, 60))
-        particle.vx = random.uniform(-5, 5)
-        particle.vy = random.uniform(-5, 5)
-        particles_group.add(particle)
-    
+    particles_group.emit(x, y, 50, [RED, ORANGE, YELLOW], (30, 60), speed=5)
+
     # Add the shockwave
-    shockwave = Shockwave(x, y, AOE_ATTACK_RADIUS, 30, RED)
-    particles_group.add(shockwave)
\ No newline at end of file
+    particles_group.shockwave(x, y, AOE_ATTACK_RADIUS, 30, RED)
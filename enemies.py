@@ -1,195 +1,286 @@
 import pygame
 import assets
+import audio
 from settings import *
 from effects import create_dissolve_effect
+from enemy_store import StoreField
+from levels import LevelPath
 import math
 class Enemy(pygame.sprite.Sprite):
+    # Simulation state that an EnemyStore can hold in its arrays while the enemy is alive
+    x = StoreField()
+    y = StoreField()
+    prev_x = StoreField() # Position at the start of the last tick, for interpolated drawing
+    prev_y = StoreField()
+    distance_traveled = StoreField()
+    path_index = StoreField()
+    speed = StoreField()
+    original_speed = StoreField()
+    slow_timer = StoreField()
+    attack_timer = StoreField()
+    health = StoreField()
+    shield = StoreField()
+
+    _store = None
+    _slot = None
+    timers = None # The simulation's TimerWheel, set by on_spawn
+    pool = None # PoolSet the enemy came from, if any
+    retired = False
+    has_abilities = False # Subclasses with per-tick behaviour in update_abilities set this
+
     def __init__(self, health, speed, value, path):
+        # Subclasses set original_image and original_color before calling this
         super().__init__()
-        self.health = health
-        self.max_health = health
-        self.speed = speed
-        self.original_speed = speed
+        self.base_health = health
+        self.base_speed = speed
         self.value = value
-        self.path = path
-        self.path_index = 0
-        self.pos = list(self.path[self.path_index])
-        self.image = None # To be set by subclass
-        self.original_image = None
-        self.original_color = None
-        self.rect = None # Will be created in subclass
+        self.rect = None
+        self.reset(path)
+
+    def reset(self, path):
+        """Puts the enemy back at the start of path with full health, as if newly built."""
+        self.health = self.base_health
+        self.max_health = self.base_health
+        self.speed = self.base_speed
+        self.original_speed = self.base_speed
+        self.path = path if isinstance(path, LevelPath) else LevelPath(path)
+        self.path_index = 0 # Segment the enemy is currently on
+        self.distance_traveled = 0.0
+        self.pos = self.path[self.path_index]
+        self.prev_x, self.prev_y = self.pos
         self.slow_timer = 0
         self.last_hit_by = None
         self.attack_timer = 0
+        self.shield = 0
+        self.image = self.original_image
+        if self.rect is None:
+            self.rect = self.image.get_rect(center=self.pos)
+        else:
+            self.rect.center = self.pos
+
+    def release(self):
+        # Drop references into the finished wave so a pooled enemy keeps nothing alive
+        self.last_hit_by = None
+        self.timers = None
+
+    @property
+    def pos(self):
+        return [self.x, self.y]
+
+    @pos.setter
+    def pos(self, value):
+        self.x, self.y = value
+
+    @property
+    def remaining_distance(self):
+        return self.path.total_length - self.distance_traveled
+
+    def ticks_until_leak(self):
+        # At the current speed; used to rank threats without simulating ahead
+        return self.remaining_distance / self.speed if self.speed > 0 else float("inf")
 
     def take_damage(self, amount, tower, hit_sound=None):
-        if hit_sound:
-            hit_sound.play()
+        audio.sfx.play(hit_sound)
         self.health -= amount
         self.last_hit_by = tower
 
     def update(self, particles, barricades, all_enemies):
         # Death is now handled in the main game loop
+        self.move(barricades)
+        self.update_abilities(all_enemies)
+
+    def move(self, barricades):
+        # Per-sprite movement; EnemyStore.step does the same for every stored enemy at once
+        self.prev_x, self.prev_y = self.x, self.y
+
+        # Only the next barricade ahead on the path can stop the enemy. Its leading edge is half the
+        # body's extent along the current segment ahead: half the width going across, half the height going up or down
+        dx, dy = self.path.directions[self.path_index]
+        reach = abs(dx) * (self.rect.width / 2) + abs(dy) * (self.rect.height / 2)
+        blocking_barricade = barricades.blocker_at(self.distance_traveled + reach)
 
-        # Check for barricades
-        blocking_barricade = None
-        for barricade in barricades:
-            # Check a point slightly ahead of the enemy
-            look_ahead_pos = (self.pos[0] + (self.rect.width / 2), self.pos[1])
-            if barricade.rect.collidepoint(look_ahead_pos):
-                blocking_barricade = barricade
-                break
-        
         if blocking_barricade:
-            # Stop and attack
-            if self.attack_timer <= 0:
-                blocking_barricade.take_damage(ENEMY_ATTACK_DAMAGE)
-                self.attack_timer = ENEMY_ATTACK_RATE
-            else:
-                self.attack_timer -= 1
+            self.attack_barricade(blocking_barricade)
             return # Don't move
 
         if self.slow_timer > 0:
             self.slow_timer -= 1
             if self.slow_timer == 0:
-                self.speed = self.original_speed
-                self.image = self.original_image.copy()
+                self.clear_slow()
 
         if self.path_index < len(self.path) - 1:
-            target = self.path[self.path_index + 1]
-            dx = target[0] - self.pos[0]
-            dy = target[1] - self.pos[1]
-            dist = (dx**2 + dy**2)**0.5
-            if dist > self.speed:
-                self.pos[0] += dx / dist * self.speed
-                self.pos[1] += dy / dist * self.speed
-            else:
-                self.pos = list(target)
-                self.path_index += 1
+            self.distance_traveled += self.speed
+            self.path_index, self.pos = self.path.locate(self.distance_traveled, self.path_index)
             self.rect.center = self.pos
         else:
             self.kill() # Reached the end of the path
+
+    def attack_barricade(self, barricade):
+        # Stop and attack
+        if self.attack_timer <= 0:
+            barricade.take_damage(ENEMY_ATTACK_DAMAGE)
+            self.attack_timer = ENEMY_ATTACK_RATE
+        else:
+            self.attack_timer -= 1
+
+    def clear_slow(self):
+        self.speed = self.original_speed
+        self.refresh_image()
+
+    def refresh_image(self):
+        # Frosted while slowed; both looks are shared surfaces, so switching never copies pixels
+        self.image = assets.get_variant(self.original_image, "frosted") if self.slow_timer > 0 else self.original_image
+
+    def on_spawn(self, timers, enemy_index, ranges):
+        # Called once the enemy is in the simulation; abilities schedule their first pulse here
+        self.timers = timers
+
+    def update_abilities(self, all_enemies):
+        pass
     
     def kill(self):
         super().kill()
+        if self.pool is not None:
+            self.pool.retire(self)
 
 class ShadowCrawler(Enemy):
     def __init__(self, path):
-        super().__init__(SHADOW_CRAWLER_HEALTH, SHADOW_CRAWLER_SPEED, SHADOW_CRAWLER_VALUE, path)
-        self.image = pygame.transform.scale(pygame.image.load(assets.ENEMY_SHADOW_CRAWLER).convert_alpha(), SHADOW_CRAWLER_SIZE)
+        self.original_image = assets.load_image(assets.ENEMY_SHADOW_CRAWLER, SHADOW_CRAWLER_SIZE)
         self.original_color = GREY
-        self.original_image = self.image.copy()
-        self.rect = self.image.get_rect(center=self.pos)
+        super().__init__(SHADOW_CRAWLER_HEALTH, SHADOW_CRAWLER_SPEED, SHADOW_CRAWLER_VALUE, path)
 
 class ShadowFlyer(Enemy):
     def __init__(self, path):
-        super().__init__(SHADOW_FLYER_HEALTH, SHADOW_FLYER_SPEED, SHADOW_FLYER_VALUE, path)
-        self.image = pygame.transform.scale(pygame.image.load(assets.ENEMY_SHADOW_FLYER).convert_alpha(), SHADOW_FLYER_SIZE)
+        self.original_image = assets.load_image(assets.ENEMY_SHADOW_FLYER, SHADOW_FLYER_SIZE)
         self.original_color = WHITE
-        self.original_image = self.image.copy()
-        self.rect = self.image.get_rect(center=self.pos)
+        super().__init__(SHADOW_FLYER_HEALTH, SHADOW_FLYER_SPEED, SHADOW_FLYER_VALUE, path)
 
 class ShieldingSentinel(Enemy):
+    has_abilities = True
+
     def __init__(self, path):
+        self.image_shielded = assets.load_image(assets.ENEMY_SHIELDING_SENTINEL, SHIELDING_SENTINEL_SIZE)
+        self.image_no_shield = assets.load_image(assets.ENEMY_SHIELDING_SENTINEL_NO_SHIELD, SHIELDING_SENTINEL_SIZE)
+        self.original_image = self.image_shielded
+        self.max_shield = SHIELDING_SENTINEL_SHIELD
         super().__init__(SHIELDING_SENTINEL_HEALTH, SHIELDING_SENTINEL_SPEED, SHIELDING_SENTINEL_VALUE, path)
-        self.image_shielded = pygame.transform.scale(pygame.image.load(assets.ENEMY_SHIELDING_SENTINEL).convert_alpha(), SHIELDING_SENTINEL_SIZE)
-        self.image_no_shield = pygame.transform.scale(pygame.image.load(assets.ENEMY_SHIELDING_SENTINEL_NO_SHIELD).convert_alpha(), SHIELDING_SENTINEL_SIZE)
-        self.original_image = self.image_shielded.copy()
-        self.image = self.image_shielded.copy()
-        self.rect = self.image.get_rect(center=self.pos)
+
+    def reset(self, path):
+        self.original_image = self.image_shielded
+        super().reset(path)
         self.shield = SHIELDING_SENTINEL_SHIELD
-        self.max_shield = SHIELDING_SENTINEL_SHIELD
-        self.shield_cooldown = 0
+        self.shield_cooldown = None # Pending timer that lets the shield regenerate again
+        self.regenerating = False
+
+    def release(self):
+        if self.shield_cooldown:
+            self.shield_cooldown.cancel()
+            self.shield_cooldown = None
+        super().release()
 
     def take_damage(self, amount, tower, hit_sound=None):
-        if hit_sound:
-            hit_sound.play()
-        self.shield_cooldown = SHIELDING_SENTINEL_COOLDOWN
+        audio.sfx.play(hit_sound)
+        # Every hit pauses regeneration and restarts the cooldown
+        if self.shield_cooldown:
+            self.shield_cooldown.cancel()
+        self.shield_cooldown = self.timers.schedule(SHIELDING_SENTINEL_COOLDOWN, self.start_regen)
+        self.regenerating = False
         if self.shield > 0:
             damage_to_shield = min(self.shield, amount)
             self.shield -= damage_to_shield
             if self.shield <= 0:
-                self.image = self.image_no_shield.copy()
-                self.original_image = self.image_no_shield.copy()
+                self.original_image = self.image_no_shield
+                self.refresh_image()
             remaining_damage = amount - damage_to_shield
             if remaining_damage > 0:
                 super().take_damage(remaining_damage, tower, hit_sound=None) # Don't play sound twice
         else:
             super().take_damage(amount, tower, hit_sound)
 
-    def update(self, particles, barricades, all_enemies):
-        super().update(particles, barricades, all_enemies)
-        if self.shield_cooldown > 0:
-            self.shield_cooldown -= 1
-        elif self.shield < self.max_shield:
+    def start_regen(self):
+        self.shield_cooldown = None
+        self.regenerating = self.shield < self.max_shield
+
+    def update_abilities(self, all_enemies):
+        if self.regenerating:
             self.shield += 1 # Regenerate shield slowly
-            if self.shield > 0:
-                self.image = self.image_shielded.copy()
-                self.original_image = self.image_shielded.copy()
+            if self.shield > 0 and self.original_image is not self.image_shielded:
+                self.original_image = self.image_shielded
+                self.refresh_image()
+            if self.shield >= self.max_shield:
+                self.regenerating = False
 
 class ChronoWarper(Enemy):
     def __init__(self, path):
-        super().__init__(CHRONO_WARPER_HEALTH, CHRONO_WARPER_SPEED, CHRONO_WARPER_VALUE, path)
-        self.image = pygame.transform.scale(pygame.image.load(assets.ENEMY_CHRONO_WARPER).convert_alpha(), CHRONO_WARPER_SIZE)
+        self.original_image = assets.load_image(assets.ENEMY_CHRONO_WARPER, CHRONO_WARPER_SIZE)
         self.original_color = PURPLE
-        self.original_image = self.image.copy()
-        self.rect = self.image.get_rect(center=self.pos)
-        self.pulse_timer = CHRONO_WARPER_PULSE_RATE
-        self.pulse_vfx_timer = 0
+        super().__init__(CHRONO_WARPER_HEALTH, CHRONO_WARPER_SPEED, CHRONO_WARPER_VALUE, path)
 
-    def update(self, particles, barricades, all_enemies):
-        super().update(particles, barricades, all_enemies)
-        if self.pulse_timer > 0:
-            self.pulse_timer -= 1
-        
-        if self.pulse_vfx_timer > 0:
-            self.pulse_vfx_timer -= 1
+    def reset(self, path):
+        super().reset(path)
+        self.pulse_timer = None
+        self.pulse_vfx_until = 0 # Tick the pulse ring finishes drawing
 
-    def can_pulse(self):
-        return self.pulse_timer <= 0
+    def release(self):
+        if self.pulse_timer:
+            self.pulse_timer.cancel()
+            self.pulse_timer = None
+        super().release()
 
-    def reset_pulse_timer(self):
-        self.pulse_timer = CHRONO_WARPER_PULSE_RATE
-        self.pulse_vfx_timer = FPS // 2 # VFX lasts for half a second
+    def on_spawn(self, timers, enemy_index, ranges):
+        super().on_spawn(timers, enemy_index, ranges)
+        self.pulse_timer = timers.schedule(CHRONO_WARPER_PULSE_RATE, self.pulse, ranges)
+
+    def pulse(self, ranges):
+        if not self.alive():
+            return
+        self.pulse_vfx_until = self.timers.now + FPS // 2 # VFX lasts for half a second
+        # This tick's distance matrix already has the warper's column
+        for tower in ranges.towers_near(self, CHRONO_WARPER_PULSE_RADIUS):
+            tower.slow(CHRONO_WARPER_SLOW_DURATION)
+        self.pulse_timer = self.timers.schedule(CHRONO_WARPER_PULSE_RATE, self.pulse, ranges)
 
 class Saboteur(Enemy):
     def __init__(self, path):
-        super().__init__(SABOTEUR_HEALTH, SABOTEUR_SPEED, SABOTEUR_VALUE, path)
-        self.image = pygame.transform.scale(pygame.image.load(assets.ENEMY_SABOTEUR).convert_alpha(), SABOTEUR_SIZE)
+        self.original_image = assets.load_image(assets.ENEMY_SABOTEUR, SABOTEUR_SIZE)
         self.original_color = BROWN
-        self.original_image = self.image.copy()
-        self.rect = self.image.get_rect(center=self.pos)
+        super().__init__(SABOTEUR_HEALTH, SABOTEUR_SPEED, SABOTEUR_VALUE, path)
 
     def kill(self):
         if self.last_hit_by:
-            self.last_hit_by.disable_timer = SABOTEUR_DISABLE_DURATION
+            self.last_hit_by.disable(SABOTEUR_DISABLE_DURATION)
         super().kill()
 
 class Healer(Enemy):
     def __init__(self, path):
-        super().__init__(HEALER_HEALTH, HEALER_SPEED, HEALER_VALUE, path)
-        self.image = pygame.transform.scale(pygame.image.load(assets.ENEMY_HEALER).convert_alpha(), HEALER_SIZE)
+        self.original_image = assets.load_image(assets.ENEMY_HEALER, HEALER_SIZE)
         self.original_color = GREEN
-        self.original_image = self.image.copy()
-        self.rect = self.image.get_rect(center=self.pos)
-        self.heal_timer = HEALER_PULSE_RATE
-        self.heal_vfx_timer = 0
+        super().__init__(HEALER_HEALTH, HEALER_SPEED, HEALER_VALUE, path)
 
-    def update(self, particles, barricades, all_enemies):
-        super().update(particles, barricades, all_enemies)
-        if self.heal_timer > 0:
-            self.heal_timer -= 1
-        else:
-            self.heal_pulse(all_enemies)
-            self.heal_timer = HEALER_PULSE_RATE
-            self.heal_vfx_timer = FPS // 2
-        
-        if self.heal_vfx_timer > 0:
-            self.heal_vfx_timer -= 1
+    def reset(self, path):
+        super().reset(path)
+        self.heal_timer = None
+        self.heal_vfx_until = 0
+
+    def release(self):
+        if self.heal_timer:
+            self.heal_timer.cancel()
+            self.heal_timer = None
+        super().release()
+
+    def on_spawn(self, timers, enemy_index, ranges):
+        super().on_spawn(timers, enemy_index, ranges)
+        # The first pulse comes one tick after HEALER_PULSE_RATE, and every HEALER_PULSE_RATE + 1 ticks after that
+        self.heal_timer = timers.schedule(HEALER_PULSE_RATE + 1, self.pulse, enemy_index)
+
+    def pulse(self, enemy_index):
+        if not self.alive():
+            return
+        self.heal_pulse(enemy_index)
+        self.heal_vfx_until = self.timers.now + FPS // 2
+        self.heal_timer = self.timers.schedule(HEALER_PULSE_RATE + 1, self.pulse, enemy_index)
 
     def heal_pulse(self, all_enemies):
-        for enemy in all_enemies:
+        for enemy in all_enemies.query_radius(self.rect.centerx, self.rect.centery, HEALER_PULSE_RADIUS, inclusive=True):
             if enemy is not self and enemy.alive():
-                dist = ( (self.rect.centerx - enemy.rect.centerx) ** 2 + (self.rect.centery - enemy.rect.centery) ** 2 ) ** 0.5
-                if dist <= HEALER_PULSE_RADIUS:
-                    enemy.health = min(enemy.max_health, enemy.health + HEALER_HEAL_AMOUNT)
\ No newline at end of file
+                enemy.health = min(enemy.max_health, enemy.health + HEALER_HEAL_AMOUNT)
@@ -0,0 +1,248 @@
+import pygame
+
+try:
+    import numpy as np
+except ImportError: # The store is optional; without NumPy every enemy updates itself
+    np = None
+
+
+class StoreField:
+    """Enemy attribute that lives in an EnemyStore column while the enemy is in a store.
+
+    Detached enemies keep the value in their own __dict__, so the enemy classes read and
+    write these attributes the same way whether or not a store is in use.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        store = obj._store
+        if store is None:
+            return obj.__dict__[self.name]
+        return store.columns[self.name].item(obj._slot)
+
+    def __set__(self, obj, value):
+        store = obj._store
+        if store is None:
+            obj.__dict__[self.name] = value
+        else:
+            store.columns[self.name][obj._slot] = value
+
+
+class EnemyStore:
+    """Structure-of-arrays storage for every live enemy on one path.
+
+    Movement, slow expiry, end-of-path and death checks run as one vectorized step per tick;
+    the enemy sprites become thin views over their row for drawing and abilities.
+    """
+
+    available = np is not None
+
+    FIELDS = {
+        "x": "float64",
+        "y": "float64",
+        "prev_x": "float64",
+        "prev_y": "float64",
+        "distance_traveled": "float64",
+        "path_index": "int64",
+        "speed": "float64",
+        "original_speed": "float64",
+        "slow_timer": "int64",
+        "attack_timer": "int64",
+        "health": "float64",
+        "shield": "float64",
+        "half_width": "float64",
+        "half_height": "float64",
+        "sequence": "int64",
+    }
+    # Columns the store fills in itself rather than taking over from the enemy
+    INTERNAL = ("half_width", "half_height", "sequence")
+
+    def __init__(self, path, capacity=256):
+        self.count = 0
+        self.added = 0
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in self.FIELDS.items()}
+        self.members = []
+        # Only enemies with per-tick abilities (shields, pulses, heals) still get a Python call
+        self.ability_members = []
+        self._blocker_version = None # BarricadeGroup.version the cached edge arrays were built from
+        self.set_path(path)
+
+    def set_path(self, path):
+        # path is a levels.LevelPath; its arc-length tables are copied into arrays once
+        self.path_x = np.array([p[0] for p in path], dtype="float64")
+        self.path_y = np.array([p[1] for p in path], dtype="float64")
+        self.path_cumulative = np.array(path.cumulative, dtype="float64")
+        self.path_dir_x = np.array([d[0] for d in path.directions], dtype="float64")
+        self.path_dir_y = np.array([d[1] for d in path.directions], dtype="float64")
+        self.total_length = path.total_length
+        self.last_index = len(path) - 1
+
+    def __len__(self):
+        return self.count
+
+    def add(self, enemy):
+        if self.count == self.capacity:
+            self._grow()
+        slot = self.count
+        # Copy the enemy's own values into the new row before switching it over to the store
+        values = enemy.__dict__
+        for name, column in self.columns.items():
+            if name not in self.INTERNAL:
+                column[slot] = values.pop(name)
+        self.columns["half_width"][slot] = enemy.rect.width / 2
+        self.columns["half_height"][slot] = enemy.rect.height / 2
+        # Order of arrival, so per-enemy callbacks can run in the same order the sprite group iterates
+        self.columns["sequence"][slot] = self.added
+        self.added += 1
+        enemy._store = self
+        enemy._slot = slot
+        self.members.append(enemy)
+        if enemy.has_abilities:
+            self.ability_members.append(enemy)
+        self.count += 1
+
+    def remove(self, enemy):
+        slot = enemy._slot
+        last = self.count - 1
+        # Give the enemy its values back so it stays readable after it leaves the store
+        for name, column in self.columns.items():
+            if name not in self.INTERNAL:
+                enemy.__dict__[name] = column.item(slot)
+        enemy._store = None
+        enemy._slot = None
+
+        # Swap the last row into the freed slot to keep the arrays dense
+        if slot != last:
+            for column in self.columns.values():
+                column[slot] = column[last]
+            moved = self.members[last]
+            moved._slot = slot
+            self.members[slot] = moved
+        self.members.pop()
+        if enemy.has_abilities:
+            self.ability_members.remove(enemy)
+        self.count -= 1
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.zeros(self.capacity, column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def step(self, barricades):
+        n = self.count
+        if n == 0:
+            return
+        cols = self.columns
+        x = cols["x"][:n]
+        y = cols["y"][:n]
+        path_index = cols["path_index"][:n]
+        speed = cols["speed"][:n]
+        slow_timer = cols["slow_timer"][:n]
+        members = self.members
+        cols["prev_x"][:n] = x
+        cols["prev_y"][:n] = y
+
+        # Barricades: each enemy's front is checked against the next blocker ahead of it on the path
+        blocked = np.zeros(n, dtype=bool)
+        if barricades.blockers:
+            if self._blocker_version != barricades.version:
+                self._far_edges = np.array(barricades.far_edges, dtype="float64")
+                self._near_edges = np.array([b.path_span[0] for b in barricades.blockers], dtype="float64")
+                self._blocker_version = barricades.version
+            # Leading edge: half the body's extent along the segment each enemy is on, as Enemy.move works it out
+            reach = np.abs(self.path_dir_x[path_index]) * cols["half_width"][:n] + np.abs(self.path_dir_y[path_index]) * cols["half_height"][:n]
+            front = cols["distance_traveled"][:n] + reach
+            ahead = np.searchsorted(self._far_edges, front, side="right")
+            on_path = ahead < len(self._far_edges)
+            hit = np.zeros(n, dtype=bool)
+            hit[on_path] = front[on_path] >= self._near_edges[ahead[on_path]]
+            blockers = list(barricades.blockers) # Kills below shrink the live list
+            hits = np.flatnonzero(hit)
+            # Attack in arrival order, like the per-sprite path, so the same enemy lands a killing blow
+            hits = hits[np.argsort(cols["sequence"][:n][hits], kind="stable")]
+            for i in hits.tolist():
+                barricade = blockers[ahead[i]]
+                # A barricade destroyed earlier this tick no longer holds anyone back
+                if barricade.alive():
+                    members[i].attack_barricade(barricade)
+                    blocked[i] = True
+
+        # Slow expiry
+        free = ~blocked
+        slowing = free & (slow_timer > 0)
+        slow_timer[slowing] -= 1
+        for i in np.flatnonzero(slowing & (slow_timer == 0)).tolist():
+            members[i].clear_slow()
+
+        # Path following: advance along the path, then look up each position by arc length
+        moving = free & (path_index < self.last_index)
+        distance = cols["distance_traveled"][:n]
+        distance[moving] += speed[moving]
+        segment = np.minimum(np.searchsorted(self.path_cumulative, distance[moving], side="right") - 1, self.last_index)
+        along = distance[moving] - self.path_cumulative[segment]
+        x[moving] = self.path_x[segment] + self.path_dir_x[segment] * along
+        y[moving] = self.path_y[segment] + self.path_dir_y[segment] * along
+        path_index[moving] = segment
+
+        for enemy, cx, cy in zip(members, x.tolist(), y.tolist()):
+            enemy.rect.center = (cx, cy)
+
+    def interpolated(self, alpha):
+        n = self.count
+        cols = self.columns
+        prev_x, prev_y = cols["prev_x"][:n], cols["prev_y"][:n]
+        x = prev_x + (cols["x"][:n] - prev_x) * alpha
+        y = prev_y + (cols["y"][:n] - prev_y) * alpha
+        return list(zip(self.members, zip(x.tolist(), y.tolist())))
+
+    def arrival_order(self):
+        """Slot indexes of the stored enemies in the order they arrived (group order)."""
+        return np.argsort(self.columns["sequence"][:self.count], kind="stable")
+
+    def centers(self, order=None):
+        """The stored enemies' rect centers as an (n, 2) int64 array, in group order (or the slot order given)."""
+        n = self.count
+        if order is None:
+            order = self.arrival_order()
+        xy = np.stack((self.columns["x"][:n][order], self.columns["y"][:n][order]), axis=1)
+        # Rect rounds halves away from zero when step() assigns a float center
+        return (np.sign(xy) * np.floor(np.abs(xy) + 0.5)).astype(np.int64)
+
+    def reached_end(self):
+        n = self.count
+        return [self.members[i] for i in np.flatnonzero(self.columns["path_index"][:n] >= self.last_index).tolist()]
+
+    def by_progress(self):
+        """Returns the stored enemies ordered from furthest along the path to least."""
+        n = self.count
+        order = np.argsort(-self.columns["distance_traveled"][:n], kind="stable")
+        return [self.members[i] for i in order.tolist()]
+
+    def dead(self):
+        n = self.count
+        return [self.members[i] for i in np.flatnonzero(self.columns["health"][:n] <= 0).tolist()]
+
+
+class EnemyGroup(pygame.sprite.Group):
+    """Sprite group that keeps an optional EnemyStore in sync with its membership."""
+
+    def __init__(self, store=None):
+        super().__init__()
+        self.store = store
+
+    def add_internal(self, sprite, layer=None):
+        if self.store is not None and sprite not in self.spritedict:
+            self.store.add(sprite)
+        super().add_internal(sprite, layer)
+
+    def remove_internal(self, sprite):
+        if self.store is not None and sprite._store is self.store:
+            self.store.remove(sprite)
+        super().remove_internal(sprite)
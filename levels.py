@@ -48,20 +48,98 @@ ALL_LEVELS = [
     }
 ]
 
+class LevelPath(list):
+    """A level's waypoints plus arc-length data computed once at load.
+
+    Enemies only track how far along the path they are; positions come from the cumulative
+    segment lengths and unit directions here instead of a square root every tick.
+    """
+
+    def __init__(self, waypoints):
+        super().__init__(tuple(p) for p in waypoints)
+        self.cumulative = [0.0] # Distance from the start to each waypoint
+        self.directions = [] # Unit vector of each segment; zero-length segments get (0, 0)
+        for start, end in zip(self, self[1:]):
+            dx, dy = end[0] - start[0], end[1] - start[1]
+            length = math.hypot(dx, dy)
+            self.cumulative.append(self.cumulative[-1] + length)
+            self.directions.append((dx / length, dy / length) if length else (0.0, 0.0))
+        self.directions.append((0.0, 0.0)) # The last waypoint has nowhere further to go
+        self.total_length = self.cumulative[-1]
+        self.last_index = len(self) - 1
+
+    def locate(self, distance, segment=0):
+        """Returns (segment index, position) for a distance along the path.
+
+        segment is a cursor to resume from; enemies never move backwards, so the search only
+        walks forward and is O(1) per tick in practice.
+        """
+        cumulative = self.cumulative
+        last = self.last_index
+        while segment < last and distance >= cumulative[segment + 1]:
+            segment += 1
+        if segment >= last:
+            return last, self[last]
+        start = self[segment]
+        dx, dy = self.directions[segment]
+        along = distance - cumulative[segment]
+        return segment, (start[0] + dx * along, start[1] + dy * along)
+
+    def project(self, point):
+        """Returns (distance along the path, distance off it, segment index) for the closest path point."""
+        best = None
+        px, py = point
+        for segment in range(self.last_index):
+            (sx, sy), (dx, dy) = self[segment], self.directions[segment]
+            length = self.cumulative[segment + 1] - self.cumulative[segment]
+            along = min(max((px - sx) * dx + (py - sy) * dy, 0.0), length)
+            off = math.hypot(px - (sx + dx * along), py - (sy + dy * along))
+            if best is None or off < best[1]:
+                best = (self.cumulative[segment] + along, off, segment)
+        return best if best is not None else (0.0, math.hypot(px - self[0][0], py - self[0][1]), 0)
+
+def level_images(map_data):
+    """The images drawing a map needs, as (path, size, alpha), so a level can be prefetched before it is picked.
+
+    Ground at map size, then the path texture. A map may name its own art with "ground_image" and
+    "path_image"; the ones shipped today all use the shared tiles.
+    """
+    return (
+        (map_data.get("ground_image", assets.GROUND_TILE), (1280, 720), False),
+        (map_data.get("path_image", assets.PATH_TILE), (PATH_WIDTH, PATH_WIDTH), True),
+    )
+
 class Level:
     def __init__(self, level_data):
-        self.path = level_data["path"]
+        self.map_data = level_data
+        self.path = LevelPath(level_data["path"])
         self.initial_tower_spots = level_data["initial_tower_spots"]
         self.purchasable_tower_spots = level_data["purchasable_tower_spots"]
         self.barricade_spots = level_data.get("barricade_spots", [])
         self.background_colors = level_data["background_colors"]
         self.width = 1280 # Assuming fixed size for now
         self.height = 720
-        self.background_image = pygame.transform.scale(pygame.image.load(assets.GROUND_TILE).convert(), (self.width, self.height))
-        self.path_tile = pygame.transform.scale(pygame.image.load(assets.PATH_TILE).convert_alpha(), (PATH_WIDTH, PATH_WIDTH))
+
+    # The art is looked up when the level is first drawn, not when it is built, so building a Level
+    # reads nothing from disk; if the preloader already decoded it these are cache hits.
+    @property
+    def background_image(self):
+        return assets.load_image(*level_images(self.map_data)[0])
+
+    @property
+    def path_tile(self):
+        return assets.load_image(*level_images(self.map_data)[1])
+
+    def render_static_layer(self, size):
+        # Ground plus path for a window of the given size, with the map centered like the sprites
+        layer = pygame.Surface(size)
+        layer.blit(pygame.transform.scale(self.background_image, size), (0, 0))
+        offset = ((size[0] - self.width) // 2, (size[1] - self.height) // 2)
+        self.draw(layer, offset)
+        return layer.convert() if pygame.display.get_surface() is not None else layer
 
     def draw(self, surface, offset):
-        # The background is now drawn in the main game loop for responsive scaling
+        # The background is drawn by render_static_layer, scaled to the window
 
         # Draw the colored path shape
         for i in range(len(self.path) - 1):
@@ -70,6 +148,7 @@ class Level:
             pygame.draw.line(surface, self.background_colors[1], start + offset, end + offset, PATH_WIDTH + 20)
 
         # Tile the path texture on top
+        path_tile = self.path_tile
         for i in range(len(self.path) - 1):
             start = pygame.math.Vector2(self.path[i])
             end = pygame.math.Vector2(self.path[i+1])
@@ -78,7 +157,7 @@ class Level:
             if length == 0: continue
             direction = (end - start).normalize()
             
-            for j in range(0, int(length), self.path_tile.get_width()):
+            for j in range(0, int(length), path_tile.get_width()):
                 pos = start + direction * j
-                tile_rect = self.path_tile.get_rect(center = pos + offset)
-                surface.blit(self.path_tile, tile_rect)
\ No newline at end of file
+                tile_rect = path_tile.get_rect(center = pos + offset)
+                surface.blit(path_tile, tile_rect)
\ No newline at end of file
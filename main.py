@@ -1,92 +1,108 @@
 import pygame
 import sys
 import math
-import json
+import time
+import argparse
 import assets
+import audio
 from settings import *
 import levels
-from levels import Level, LEVEL_1_MAP, LEVEL_2_MAP
-from towers import SunfireSpire, FrostSpire, StormSpire
-from enemies import ShadowCrawler, ShadowFlyer, ShieldingSentinel, ChronoWarper, Saboteur
-from effects import create_explosion, create_dissolve_effect, create_aoe_explosion
-from waves import WaveManager
-from structures import Barricade, SpirePlot
-
-class Game:
+from levels import LEVEL_1_MAP
+from enemies import ChronoWarper
+from simulation import Simulation
+from targeting import next_policy
+from renderer import WorldRenderer, LAYER_GROUND, LAYER_WORLD, LAYER_EFFECTS
+from profiler import PHASES
+from sim_clock import SimClock
+from preload import StartupTimeline, AssetPreloader
+import persistence
+from replay import Recording, Player
+
+class Game(Simulation):
     def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-        pygame.display.set_caption("Aetheria: The Last Stand")
+        self.timeline = StartupTimeline()
+        with self.timeline.step("pygame.init"):
+            pygame.init()
+        with self.timeline.step("open window"):
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+            pygame.display.set_caption("Aetheria: The Last Stand")
         self.clock = pygame.time.Clock()
-        self.level = Level(LEVEL_1_MAP)
-        self.wave_manager = WaveManager(self.level.path)
-        # self.font = pygame.font.Font(assets.FONT_PRIMARY, 36)
-        self.font = pygame.font.Font(None, FONT_SIZE_NORMAL)
-        self.title_font = pygame.font.Font(None, FONT_SIZE_TITLE)
-        self.tooltip_font = pygame.font.Font(None, FONT_SIZE_TOOLTIP)
+        with self.timeline.step("simulation"):
+            super().__init__(LEVEL_1_MAP)
+        with self.timeline.step("fonts"):
+            # self.font = pygame.font.Font(assets.FONT_PRIMARY, 36)
+            self.font = pygame.font.Font(None, FONT_SIZE_NORMAL)
+            self.title_font = pygame.font.Font(None, FONT_SIZE_TITLE)
+            self.tooltip_font = pygame.font.Font(None, FONT_SIZE_TOOLTIP)
         
         # --- CURRENCY & PROGRESSION REFACTOR ---
         self.meta_currency = 500 # Default value
         self.volatile_currency = 0
-        self.load_progress()
-
-        # In-run variables
-        self.heartcrystal_health = 100
-        self.wave_number = 0
-        self.wave_timer = 5 * FPS
-        self.enemies = pygame.sprite.Group()
-        self.towers = pygame.sprite.Group()
-        self.projectiles = pygame.sprite.Group()
-        self.particles = pygame.sprite.Group()
-        self.barricades = pygame.sprite.Group()
-        self.spire_plots = pygame.sprite.Group()
+        # Saves are written by a background thread; the game loop only queues them
+        self.saves = persistence.SaveWriter()
+        with self.timeline.step("load progress"):
+            self.load_progress()
+
+        # UI state
         self.selected_tower = None
         self.selected_tower_instance = None
         self.placing_barricade = False
         self.placing_plot = False
         self.placing_aoe_attack = False
-        self.overcharge_timer = 0
         self.game_state = "main_menu" # Start in the main menu
         self.is_paused = False
-        self.game_speed = 1
+        self.sim_clock = SimClock()
         self.music_volume = 1.0
         self.sfx_volume = 0.4
-        self.ui_click_sound = None
-        self.enemy_hit_sound = None
-        self.enemy_death_sound = None
-        self.setup_level()
-        self.wave_took_damage = False
-
-        # UI Feedback timers
-        self.perm_currency_fx_timer = 0
-        self.temp_currency_fx_timer = 0
-        self.perm_fx_color = WHITE
-        self.temp_fx_color = WHITE
+        self.static_layer = None
+        self.static_layer_key = None
+        self.renderer = WorldRenderer()
+        self.show_profiler = False
+        self.profiler_font = None
+        self.profile_dump_path = None
+        self.profiler_lines = []
+        self.profiler_frames_drawn = 0
+        self.startup_report = False
+        # Input recording and replay; see replay.py
+        self.record_path = None
+        self.recording = None
+        self.playback = None
+        self.replay_speed = None # A fixed speed for playback; None follows the recorded speed changes
 
         # --- LOAD ASSETS ---
-        self.load_assets()
-
-        self.shop_towers = [
-            {"name": "Sunfire Spire", "cost": SUNFIRE_SPIRE_COST, "type": "sunfire", "image": self.tower_images["sunfire"], "damage": SUNFIRE_SPIRE_DAMAGE, "range": SUNFIRE_SPIRE_RANGE},
-            {"name": "Frost Spire", "cost": FROST_SPIRE_COST, "type": "frost", "image": self.tower_images["frost"], "damage": "Slows", "range": FROST_SPIRE_RANGE},
-            {"name": "Storm Spire", "cost": STORM_SPIRE_COST, "type": "storm", "image": self.tower_images["storm"], "damage": STORM_SPIRE_DAMAGE, "range": STORM_SPIRE_RANGE},
-            {"name": "Barricade", "cost": BARRICADE_COST, "type": "barricade", "color": BROWN, "damage": "Blocks", "range": "N/A"},
-            {"name": "Spire Plot", "cost": SPIRE_PLOT_COST, "type": "plot", "image": self.tower_images["plot"], "damage": "Build on it", "range": "N/A"},
-        ]
+        # The menu comes up straight away; everything else is decoded in the background and
+        # load_assets runs once it has all arrived, or as soon as a level is picked
+        self.assets_loaded = False
+        self.preloader = AssetPreloader(self.timeline)
+        self.request_assets()
 
     def run(self):
-        pygame.mixer.music.load(assets.MUSIC_MAIN_MENU)
+        # A replay started from the command line is already playing its level
+        pygame.mixer.music.load(assets.MUSIC_MAIN_MENU if self.game_state == "main_menu" else assets.MUSIC_LEVEL_GENERIC)
         pygame.mixer.music.play(-1) # Loop indefinitely
         running = True
+        profiler = self.profiler
+        first_frame = True
         while running:
+            profiler.start_frame()
+            # Waits out the rest of the frame at normal speeds; uncapped never sleeps
+            elapsed = self.clock.tick(0 if self.sim_clock.uncapped else FPS) / 1000.0
+            profiler.lap("idle")
+            audio.sfx.new_tick() # Clicks this frame dedupe against each other, not against the last tick
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if self.game_state in ("playing", "settings"):
+                        self.suspend_run()
+                        self.finish_recording()
                     running = False
                 elif event.type == pygame.VIDEORESIZE:
                     self.screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                    self.static_layer_key = None
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.toggle_profiler()
                 
                 if self.game_state == "playing":
-                    if event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.type == pygame.MOUSEBUTTONDOWN and self.playback is None: # A replay plays itself
                         if event.button == 1: # Left-click
                             self.handle_mouse_click(event.pos)
                         elif event.button == 3: # Right-click
@@ -97,11 +113,14 @@ class Game:
                 elif self.game_state in ["game_over", "win"]:
                     if event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_r:
+                            self.end_playback()
                             self.game_state = "main_menu"
                 elif self.game_state == "main_menu":
                     if event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_SPACE:
                             self.game_state = "level_select"
+                        elif event.key == pygame.K_c and self.suspended_run:
+                            self.resume_run()
                 elif self.game_state == "settings":
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         if event.button == 1:
@@ -110,11 +129,12 @@ class Game:
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         if event.button == 1:
                             self.handle_level_select_click(event.pos)
+            self.update_loading()
+            profiler.lap("events")
 
             if self.game_state == "playing":
                 if not self.is_paused:
-                    for _ in range(self.game_speed):
-                        self.update()
+                    self.step_simulation(elapsed)
                 self.draw()
                 if self.is_paused:
                     self.draw_pause_menu()
@@ -128,34 +148,51 @@ class Game:
                 self.draw_level_select_menu()
             elif self.game_state == "settings":
                 self.draw_settings_menu()
+            if self.show_profiler:
+                self.draw_profiler_overlay()
+            profiler.lap("menus")
 
             pygame.display.flip()
-            self.clock.tick(FPS)
-
+            profiler.lap("flip")
+            profiler.end_frame()
+            if first_frame:
+                self.timeline.mark("first frame")
+                first_frame = False
+
+        if self.profile_dump_path:
+            profiler.dump(self.profile_dump_path)
+        self.preloader.shutdown()
+        self.saves.flush()
         pygame.quit()
         sys.exit()
 
-    def update(self):
-        if self.game_state != "playing":
-            return
-        
-        if self.overcharge_timer > 0:
-            self.overcharge_timer -= 1
-        damage_multiplier = OVERCHARGE_MULTIPLIER if self.overcharge_timer > 0 else 1.0
-        
-        self.enemies.update(self.particles, self.barricades, self.enemies)
-        self.towers.update(self.enemies, self.projectiles, self.particles, self.screen, damage_multiplier)
-        self.particles.update()
-        self.barricades.update()
-        
-        self.handle_wave_spawning()
-        self.check_collisions()
-        self.handle_enemy_deaths()
-        self.handle_enemy_abilities()
-        self.check_win_loss()
+    def step_simulation(self, elapsed):
+        # Runs the ticks the clock owes. When ticks take longer than real time, frames are drawn
+        # less often rather than skipping ticks, up to SIM_MAX_FRAME_SECONDS between frames.
+        clock = self.sim_clock
+        clock.advance(elapsed)
+        budget = 1.0 / FPS if clock.uncapped else SIM_MAX_FRAME_SECONDS
+        deadline = time.perf_counter() + budget
+        recording, playback = self.recording, self.playback
+        while clock.due() and self.game_state == "playing":
+            if playback is not None:
+                playback.apply_due(self)
+            self.update()
+            clock.consume()
+            if recording is not None:
+                recording.add_tick(self)
+                if self.game_state != "playing":
+                    self.finish_recording() # Written once the final tick is in
+            if playback is not None:
+                playback.check(self)
+                if playback.divergence == self.tick:
+                    print(f"Replay diverged from the recording at tick {self.tick}", file=sys.stderr)
+            if time.perf_counter() >= deadline:
+                break
 
     def draw(self):
-        self.screen.blit(pygame.transform.scale(self.level.background_image, self.screen.get_size()), (0,0))
+        # Ground and path never change during a run, so they come from one pre-rendered layer
+        self.screen.blit(self.get_static_layer(), (0,0))
 
         # --- Centered Map Drawing ---
         # Calculate the offset to center the map
@@ -164,35 +201,36 @@ class Game:
         offset_y = (self.screen.get_height() - map_height) // 2
         camera_offset = (offset_x, offset_y)
 
-        # Create a temporary surface for the game world
-        game_surface = pygame.Surface((self.screen.get_width(), self.screen.get_height()), pygame.SRCALPHA)
-
-        self.level.draw(game_surface, camera_offset)
-        
-        # Adjust drawing positions for all game objects
-        for group in [self.spire_plots, self.enemies, self.towers, self.barricades, self.particles]:
-            for sprite in group:
-                new_rect = sprite.rect.move(camera_offset)
-                game_surface.blit(sprite.image, new_rect)
+        # The world goes through the render queue: off-screen sprites are dropped, and each layer
+        # is sorted by foot y and drawn with one blits call, so sprites lower on the map overlap
+        # the ones behind them (towers stand 180 px tall over the path)
+        renderer = self.renderer
+        renderer.begin(self.screen.get_rect())
+        renderer.submit_sprites(self.spire_plots, camera_offset, LAYER_GROUND)
+        # Enemies are drawn between their last two tick positions, by how far the next tick is due
+        renderer.submit_many(((enemy.image, (int(x + offset_x) - enemy.rect.width // 2, int(y + offset_y) - enemy.rect.height // 2), y + enemy.rect.height / 2)
+                              for enemy, (x, y) in self.interpolated_enemies(self.sim_clock.alpha)), LAYER_WORLD)
+        for tower in self.towers:
+            renderer.submit(tower.image, tower.rect.move(camera_offset), LAYER_WORLD, tower.rect.bottom)
+            tower.submit_vfx(renderer, camera_offset, self.overcharge_timer)
+        renderer.submit_sprites(self.barricades, camera_offset, LAYER_WORLD)
 
-        # Draw Castle
         if self.level.path:
-            # Draw spawn gate
+            # Spawn gate and main castle
             start_pos = self.level.path[0]
-            gate_rect = self.spawn_gate_image.get_rect(center=(start_pos[0] + offset_x, start_pos[1] + offset_y))
-            game_surface.blit(self.spawn_gate_image, gate_rect)
-
-            # Draw main castle
+            gate_rect = self.spawn_gate_image.get_rect(center=start_pos)
+            renderer.submit(self.spawn_gate_image, gate_rect.move(camera_offset), LAYER_WORLD, gate_rect.bottom)
             end_pos = self.level.path[-1]
-            castle_rect = self.castle_image.get_rect(center=(end_pos[0] + offset_x, end_pos[1] + offset_y + CASTLE_Y_OFFSET))
-            game_surface.blit(self.castle_image, castle_rect)
-
-        for tower in self.towers:
-            tower.draw_vfx(game_surface, camera_offset, self.overcharge_timer)
+            castle_rect = self.castle_image.get_rect(center=(end_pos[0], end_pos[1] + CASTLE_Y_OFFSET))
+            renderer.submit(self.castle_image, castle_rect.move(camera_offset), LAYER_WORLD, castle_rect.bottom)
 
-        self.screen.blit(game_surface, (0,0))
+        renderer.submit_draw(lambda surface: self.particles.draw(surface, camera_offset), LAYER_EFFECTS)
+        self.submit_enemy_abilities(camera_offset)
+        renderer.flush(self.screen)
+        self.profiler.lap("world")
 
         self.draw_left_hud()
+        self.profiler.lap("hud")
         self.draw_right_shop()
         
         if self.selected_tower or self.placing_barricade or self.placing_plot:
@@ -201,7 +239,15 @@ class Game:
         elif self.placing_aoe_attack:
             self.draw_ghost_aoe()
             
-        self.draw_enemy_abilities()
+        self.profiler.lap("shop")
+
+    def get_static_layer(self):
+        # Rebuilt only when the level or the window size changes
+        key = (self.level, self.screen.get_size())
+        if self.static_layer_key != key:
+            self.static_layer = self.level.render_static_layer(self.screen.get_size())
+            self.static_layer_key = key
+        return self.static_layer
 
     def draw_left_hud(self):
         # hud_panel = pygame.Surface((HUD_PANEL_WIDTH, self.screen.get_height()), pygame.SRCALPHA)
@@ -209,19 +255,19 @@ class Game:
         # self.screen.blit(hud_panel, (0, 0))
 
         # Wave number
-        wave_text = self.font.render(f"Wave: {self.wave_number} / {self.wave_manager.total_waves}", True, WHITE)
+        wave_text = assets.render_text(self.font, f"Wave: {self.wave_number} / {self.wave_manager.total_waves}", WHITE)
         self.screen.blit(wave_text, (HUD_PADDING, HUD_PADDING))
 
         # Fast-forward button
         ff_button_rect = pygame.Rect(HUD_PADDING, self.screen.get_height() - FF_BUTTON_Y_OFFSET, BUTTON_WIDTH, BUTTON_HEIGHT)
         pygame.draw.rect(self.screen, GREY, ff_button_rect, border_radius=5)
-        ff_text = self.font.render(f"{self.game_speed}x", True, BLACK)
+        ff_text = assets.render_text(self.font, self.sim_clock.label, BLACK)
         self.screen.blit(ff_text, (ff_button_rect.centerx - ff_text.get_width() // 2, ff_button_rect.centery - ff_text.get_height() // 2))
 
         # Settings button
         settings_button_rect = pygame.Rect(HUD_PADDING, self.screen.get_height() - SETTINGS_BUTTON_Y_OFFSET, BUTTON_WIDTH, BUTTON_HEIGHT)
         pygame.draw.rect(self.screen, GREY, settings_button_rect, border_radius=5)
-        settings_text = self.font.render("Settings", True, BLACK)
+        settings_text = assets.render_text(self.font, "Settings", BLACK)
         self.screen.blit(settings_text, (settings_button_rect.centerx - settings_text.get_width() // 2, settings_button_rect.centery - settings_text.get_height() // 2))
 
         # Health bar
@@ -237,7 +283,7 @@ class Game:
         pygame.draw.rect(self.screen, (50, 50, 50), health_bar_rect, border_radius=5)
         pygame.draw.rect(self.screen, health_color, current_health_rect, border_radius=5)
         
-        health_text = self.font.render(f"{self.heartcrystal_health} / 100", True, WHITE)
+        health_text = assets.render_text(self.font, f"{self.heartcrystal_health} / 100", WHITE)
         self.screen.blit(health_text, (health_bar_rect.centerx - health_text.get_width() // 2, health_bar_rect.centery - health_text.get_height() // 2))
 
 
@@ -251,7 +297,7 @@ class Game:
             tower = self.selected_tower_instance
             
             # Tower Name
-            name_text = self.font.render(f"{type(tower).__name__} (Lvl {tower.level})", True, WHITE)
+            name_text = assets.render_text(self.font, f"{type(tower).__name__} (Lvl {tower.level})", WHITE)
             self.screen.blit(name_text, (self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, SHOP_PADDING))
 
             # Stats
@@ -262,7 +308,7 @@ class Game:
                 f"Fire Rate: {tower.fire_rate / 1000.0:.2f}s"
             ]
             for i, stat in enumerate(stats):
-                stat_text = self.font.render(stat, True, WHITE)
+                stat_text = assets.render_text(self.font, stat, WHITE)
                 self.screen.blit(stat_text, (self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, stats_y + i * 30))
 
             # Upgrade Button
@@ -276,7 +322,7 @@ class Game:
             else:
                 color = GREEN
             pygame.draw.rect(self.screen, color if can_afford_upgrade else GREY, upgrade_button_rect, border_radius=5)
-            upgrade_text = self.font.render(f"Upgrade ({upgrade_cost})", True, BLACK)
+            upgrade_text = assets.render_text(self.font, f"Upgrade ({upgrade_cost})", BLACK)
             self.screen.blit(upgrade_text, (upgrade_button_rect.centerx - upgrade_text.get_width() // 2, upgrade_button_rect.centery - upgrade_text.get_height() // 2))
 
             # Sell Button
@@ -289,9 +335,17 @@ class Game:
             else:
                 color = RED
             pygame.draw.rect(self.screen, color, sell_button_rect, border_radius=5)
-            sell_text = self.font.render(f"Sell ({sell_value})", True, BLACK)
+            sell_text = assets.render_text(self.font, f"Sell ({sell_value})", BLACK)
             self.screen.blit(sell_text, (sell_button_rect.centerx - sell_text.get_width() // 2, sell_button_rect.centery - sell_text.get_height() // 2))
 
+            # Targeting Button (cycles through the policies)
+            if tower.has_targeting:
+                target_button_rect = pygame.Rect(self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, stats_y + 220, SHOP_PANEL_WIDTH - SHOP_PADDING * 2, BUTTON_HEIGHT)
+                color = LIGHT_BLUE if target_button_rect.collidepoint(pygame.mouse.get_pos()) else GREY
+                pygame.draw.rect(self.screen, color, target_button_rect, border_radius=5)
+                target_text = assets.render_text(self.font, f"Target: {tower.targeting.capitalize()}", BLACK)
+                self.screen.blit(target_text, (target_button_rect.centerx - target_text.get_width() // 2, target_button_rect.centery - target_text.get_height() // 2))
+
         # --- Draw Shop UI ---
         else:
             # Currency display
@@ -300,8 +354,8 @@ class Game:
             perm_color = self.perm_fx_color if self.perm_currency_fx_timer > 0 else WHITE
             temp_color = self.temp_fx_color if self.temp_currency_fx_timer > 0 else WHITE
 
-            perm_currency_text = self.font.render(f"Aetherium: {self.meta_currency}", True, perm_color)
-            temp_currency_text = self.font.render(f"Shards: {self.volatile_currency}", True, temp_color)
+            perm_currency_text = assets.render_text(self.font, f"Aetherium: {self.meta_currency}", perm_color)
+            temp_currency_text = assets.render_text(self.font, f"Shards: {self.volatile_currency}", temp_color)
             
             self.screen.blit(perm_currency_text, (self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, SHOP_PADDING))
             self.screen.blit(temp_currency_text, (self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, 60))
@@ -326,19 +380,19 @@ class Game:
 
                 icon_rect = pygame.Rect(card_rect.left + 5, card_rect.top + 5, SHOP_CARD_ICON_SIZE[0], SHOP_CARD_ICON_SIZE[1])
                 if "image" in tower_data:
-                    self.screen.blit(pygame.transform.scale(tower_data["image"], SHOP_CARD_ICON_SIZE), icon_rect)
+                    self.screen.blit(tower_data["image"], icon_rect)
                 else: # Fallback for non-tower items
                     pygame.draw.rect(self.screen, tower_data["color"], icon_rect, border_radius=5)
 
-                name_text = self.font.render(tower_data["name"], True, WHITE)
-                cost_text = self.font.render(str(tower_data["cost"]), True, WHITE if can_afford else RED)
+                name_text = assets.render_text(self.font, tower_data["name"], WHITE)
+                cost_text = assets.render_text(self.font, str(tower_data["cost"]), WHITE if can_afford else RED)
                 self.screen.blit(name_text, (card_rect.left + 55, card_rect.top + 5))
                 self.screen.blit(cost_text, (card_rect.left + 55, card_rect.top + 30))
 
                 # Tooltip
                 if card_rect.collidepoint(pygame.mouse.get_pos()):
                     tooltip_text = f"Damage: {tower_data.get('damage', 'N/A')}, Range: {tower_data.get('range', 'N/A')}"
-                    tooltip_surface = self.font.render(tooltip_text, True, BLACK)
+                    tooltip_surface = assets.render_text(self.font, tooltip_text, BLACK)
                     tooltip_rect = tooltip_surface.get_rect(midbottom=card_rect.midtop)
                     pygame.draw.rect(self.screen, WHITE, tooltip_rect.inflate(10, 10))
                     self.screen.blit(tooltip_surface, tooltip_rect)
@@ -346,23 +400,23 @@ class Game:
             # --- Draw Abilities ---
             overcharge_icon = pygame.Rect(self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, self.screen.get_height() - OVERCHARGE_Y_OFFSET, ABILITY_ICON_SIZE[0], ABILITY_ICON_SIZE[1])
             pygame.draw.rect(self.screen, YELLOW, overcharge_icon)
-            overcharge_text = self.font.render(f"Overcharge", True, BLACK)
+            overcharge_text = assets.render_text(self.font, "Overcharge", BLACK)
             self.screen.blit(overcharge_text, (overcharge_icon.right + BUTTON_MARGIN, overcharge_icon.top))
-            overcharge_cost_text = self.font.render(f"Cost: {OVERCHARGE_COST}", True, BLACK if self.volatile_currency >= OVERCHARGE_COST else RED)
+            overcharge_cost_text = assets.render_text(self.font, f"Cost: {OVERCHARGE_COST}", BLACK if self.volatile_currency >= OVERCHARGE_COST else RED)
             self.screen.blit(overcharge_cost_text, (overcharge_icon.right + BUTTON_MARGIN, overcharge_icon.top + 20))
 
             aoe_icon = pygame.Rect(self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, self.screen.get_height() - AOE_Y_OFFSET, ABILITY_ICON_SIZE[0], ABILITY_ICON_SIZE[1])
             pygame.draw.rect(self.screen, RED, aoe_icon)
-            aoe_text = self.font.render(f"AOE Attack", True, BLACK)
+            aoe_text = assets.render_text(self.font, "AOE Attack", BLACK)
             self.screen.blit(aoe_text, (aoe_icon.right + BUTTON_MARGIN, aoe_icon.top))
-            aoe_cost_text = self.font.render(f"Cost: {AOE_ATTACK_COST}", True, BLACK if self.volatile_currency >= AOE_ATTACK_COST else RED)
+            aoe_cost_text = assets.render_text(self.font, f"Cost: {AOE_ATTACK_COST}", BLACK if self.volatile_currency >= AOE_ATTACK_COST else RED)
             self.screen.blit(aoe_cost_text, (aoe_icon.right + BUTTON_MARGIN, aoe_icon.top + 20))
 
             # --- Tooltips for Abilities ---
             mouse_pos = pygame.mouse.get_pos()
             if overcharge_icon.collidepoint(mouse_pos):
                 tooltip_lines = [
-                    f"Overcharge",
+                    "Overcharge",
                     f"Cost: {OVERCHARGE_COST} Shards",
                     f"Duration: {OVERCHARGE_DURATION / FPS}s",
                     f"Effect: +{int((OVERCHARGE_MULTIPLIER - 1) * 100)}% damage"
@@ -371,7 +425,7 @@ class Game:
 
             if aoe_icon.collidepoint(mouse_pos):
                 tooltip_lines = [
-                    f"Aetheric Burst",
+                    "Aetheric Burst",
                     f"Cost: {AOE_ATTACK_COST} Shards",
                     f"Damage: {AOE_ATTACK_DAMAGE}",
                     f"Radius: {AOE_ATTACK_RADIUS}px"
@@ -453,9 +507,6 @@ class Game:
         self.screen.blit(overlay, (mouse_pos[0] - AOE_ATTACK_RADIUS, mouse_pos[1] - AOE_ATTACK_RADIUS))
 
     def handle_mouse_click(self, pos):
-        panel_width = 300
-        icon_x = self.screen.get_width() - panel_width + 20
-        
         # --- New Shop Click Handling ---
         panel_width = 300
         start_y = 120
@@ -466,24 +517,21 @@ class Game:
             # Handle upgrade/sell clicks
             upgrade_button_rect = pygame.Rect(self.screen.get_width() - panel_width + 20, 160, panel_width - 40, 50)
             sell_button_rect = pygame.Rect(self.screen.get_width() - panel_width + 20, 220, panel_width - 40, 50)
+            target_button_rect = pygame.Rect(self.screen.get_width() - panel_width + 20, 280, panel_width - 40, 50)
 
             if upgrade_button_rect.collidepoint(pos):
                 clicked_ui = True
-                if self.meta_currency >= self.selected_tower_instance.upgrade_cost:
-                    self.meta_currency -= self.selected_tower_instance.upgrade_cost
-                    self.selected_tower_instance.upgrade()
-                    if self.ui_click_sound: self.ui_click_sound.play()
+                if self.command("upgrade", *self.selected_tower_instance.pos):
+                    audio.sfx.play(self.ui_click_sound)
             elif sell_button_rect.collidepoint(pos):
                 clicked_ui = True
-                self.meta_currency += int(self.selected_tower_instance.cost * 0.65)
-                # Find the plot this tower was on and mark it as unoccupied
-                for plot in self.spire_plots:
-                    if plot.pos == self.selected_tower_instance.pos:
-                        plot.is_occupied = False
-                        break
-                self.selected_tower_instance.kill()
+                self.command("sell", *self.selected_tower_instance.pos)
                 self.selected_tower_instance = None
-                if self.ui_click_sound: self.ui_click_sound.play()
+                audio.sfx.play(self.ui_click_sound)
+            elif target_button_rect.collidepoint(pos) and self.selected_tower_instance.has_targeting:
+                clicked_ui = True
+                tower = self.selected_tower_instance
+                self.command("target", *tower.pos, next_policy(tower.targeting))
 
         else:
             # Handle shop tower clicks
@@ -491,46 +539,40 @@ class Game:
                 card_rect = pygame.Rect(self.screen.get_width() - panel_width + 10, start_y + i * card_height, panel_width - 20, card_height - 10)
                 if card_rect.collidepoint(pos):
                     self.set_placing_state(tower_data["type"])
-                    if self.ui_click_sound: self.ui_click_sound.play()
+                    audio.sfx.play(self.ui_click_sound)
                     clicked_ui = True
                     break
         
-        if clicked_ui and self.ui_click_sound:
-            self.ui_click_sound.play()
+        if clicked_ui:
+            audio.sfx.play(self.ui_click_sound)
 
         # --- Abilities ---
         overcharge_icon = pygame.Rect(self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, self.screen.get_height() - OVERCHARGE_Y_OFFSET, ABILITY_ICON_SIZE[0], ABILITY_ICON_SIZE[1])
         aoe_icon = pygame.Rect(self.screen.get_width() - SHOP_PANEL_WIDTH + SHOP_PADDING, self.screen.get_height() - AOE_Y_OFFSET, ABILITY_ICON_SIZE[0], ABILITY_ICON_SIZE[1])
 
         if overcharge_icon.collidepoint(pos):
-            if self.volatile_currency >= OVERCHARGE_COST:
-                self.volatile_currency -= OVERCHARGE_COST; self.temp_fx_color = ORANGE; self.temp_currency_fx_timer = 15
-                self.overcharge_timer = OVERCHARGE_DURATION
-                if self.ui_click_sound: self.ui_click_sound.play()
+            if self.command("overcharge"):
+                self.temp_fx_color = ORANGE; self.temp_currency_fx_timer = 15
+                audio.sfx.play(self.ui_click_sound)
         elif aoe_icon.collidepoint(pos):
             if self.volatile_currency >= AOE_ATTACK_COST:
                 self.set_placing_state("aoe")
-                if self.ui_click_sound: self.ui_click_sound.play()
+                audio.sfx.play(self.ui_click_sound)
         
         # Map clicks
         elif not clicked_ui:
             # Check for fast-forward button click
             ff_button_rect = pygame.Rect(20, self.screen.get_height() - 70, 100, 50)
             if ff_button_rect.collidepoint(pos):
-                if self.game_speed == 1:
-                    self.game_speed = 2
-                elif self.game_speed == 2:
-                    self.game_speed = 4
-                else:
-                    self.game_speed = 1
-                if self.ui_click_sound: self.ui_click_sound.play()
+                self.command("speed")
+                audio.sfx.play(self.ui_click_sound)
                 return
 
             # Check for settings button click
             settings_button_rect = pygame.Rect(20, self.screen.get_height() - 140, 100, 50)
             if settings_button_rect.collidepoint(pos):
                 self.game_state = "settings"
-                if self.ui_click_sound: self.ui_click_sound.play()
+                audio.sfx.play(self.ui_click_sound)
                 return
 
             # Adjust mouse position for camera offset
@@ -540,42 +582,28 @@ class Game:
             map_pos = (pos[0] - offset_x, pos[1] - offset_y)
 
             if self.placing_aoe_attack:
-                if self.volatile_currency >= AOE_ATTACK_COST:
-                    self.volatile_currency -= AOE_ATTACK_COST
+                if self.command("burst", *map_pos):
                     self.temp_fx_color = ORANGE
                     self.temp_currency_fx_timer = 15
-                    create_aoe_explosion(map_pos[0], map_pos[1], self.particles)
-                    for enemy in list(self.enemies):
-                        if math.hypot(map_pos[0] - enemy.rect.centerx, map_pos[1] - enemy.rect.centery) < AOE_ATTACK_RADIUS:
-                            enemy.take_damage(AOE_ATTACK_DAMAGE, self.enemy_hit_sound)
                 self.set_placing_state(None)
             elif self.selected_tower:
                 for plot in self.spire_plots:
                     if not plot.is_occupied and plot.rect.collidepoint(map_pos):
-                        if self.selected_tower == "sunfire" and self.meta_currency >= SUNFIRE_SPIRE_COST:
-                            self.towers.add(SunfireSpire(plot.pos)); plot.is_occupied = True; self.meta_currency -= SUNFIRE_SPIRE_COST
-                            self.perm_fx_color = ORANGE; self.perm_currency_fx_timer = 15
-                        elif self.selected_tower == "frost" and self.meta_currency >= FROST_SPIRE_COST:
-                            self.towers.add(FrostSpire(plot.pos)); plot.is_occupied = True; self.meta_currency -= FROST_SPIRE_COST
-                            self.perm_fx_color = ORANGE; self.perm_currency_fx_timer = 15
-                        elif self.selected_tower == "storm" and self.meta_currency >= STORM_SPIRE_COST:
-                            self.towers.add(StormSpire(plot.pos)); plot.is_occupied = True; self.meta_currency -= STORM_SPIRE_COST
+                        if self.command("build", self.selected_tower, *plot.pos):
                             self.perm_fx_color = ORANGE; self.perm_currency_fx_timer = 15
                         self.set_placing_state(None)
                         break
             elif self.placing_barricade:
                 for spot in self.level.barricade_spots:
                     if pygame.Rect(spot[0]-20, spot[1]-20, 40, 40).collidepoint(map_pos):
-                        if not any(b.rect.center == spot for b in self.barricades) and self.volatile_currency >= BARRICADE_COST:
-                            self.barricades.add(Barricade(spot)); self.volatile_currency -= BARRICADE_COST
+                        if self.command("barricade", *spot):
                             self.temp_fx_color = ORANGE; self.temp_currency_fx_timer = 15
                         self.set_placing_state(None)
                         break
             elif self.placing_plot:
                 for spot in self.level.purchasable_tower_spots:
                     if pygame.Rect(spot[0]-PLOT_SIZE[0]//2, spot[1]-PLOT_SIZE[1]//2, PLOT_SIZE[0], PLOT_SIZE[1]).collidepoint(map_pos):
-                        if not any(p.rect.center == spot for p in self.spire_plots) and self.meta_currency >= SPIRE_PLOT_COST:
-                            self.spire_plots.add(SpirePlot(spot)); self.meta_currency -= SPIRE_PLOT_COST
+                        if self.command("plot", *spot):
                             self.perm_fx_color = ORANGE; self.perm_currency_fx_timer = 15
                         self.set_placing_state(None)
                         break
@@ -588,108 +616,81 @@ class Game:
                 # If no tower was clicked, deselect
                 self.selected_tower_instance = None
 
-    def handle_enemy_deaths(self):
-        for enemy in list(self.enemies):
-            if enemy.health <= 0:
-                self.volatile_currency += 50
-                self.temp_fx_color = GREEN
-                self.temp_currency_fx_timer = 15
-                create_dissolve_effect(enemy.rect.centerx, enemy.rect.centery, self.particles)
-                if self.enemy_death_sound:
-                    self.enemy_death_sound.play()
-                enemy.kill()
-
-    def handle_enemy_abilities(self):
-        for enemy in self.enemies:
-            if isinstance(enemy, ChronoWarper) and enemy.can_pulse():
-                enemy.reset_pulse_timer()
-                for tower in self.towers:
-                    dist = math.hypot(enemy.rect.centerx - tower.rect.centerx, enemy.rect.centery - tower.rect.centery)
-                    if dist < CHRONO_WARPER_PULSE_RADIUS:
-                        tower.slow_effect_timer = CHRONO_WARPER_SLOW_DURATION
-
-    def draw_enemy_abilities(self):
+    def submit_enemy_abilities(self, camera_offset):
         for enemy in self.enemies:
-            if isinstance(enemy, ChronoWarper) and enemy.pulse_vfx_timer > 0:
-                progress = 1 - (enemy.pulse_vfx_timer / (FPS / 2))
+            if isinstance(enemy, ChronoWarper) and enemy.pulse_vfx_until > self.tick:
+                progress = 1 - ((enemy.pulse_vfx_until - self.tick) / (FPS / 2))
                 radius = int(CHRONO_WARPER_PULSE_RADIUS * progress)
                 alpha = int(255 * (1 - progress))
                 
                 overlay = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
                 pygame.draw.circle(overlay, (255, 0, 255, alpha), (radius, radius), radius, 3)
-                self.screen.blit(overlay, (enemy.rect.centerx - radius, enemy.rect.centery - radius))
-
-    def handle_wave_spawning(self):
-        if not self.enemies and self.wave_timer <= 0:
-            if self.wave_number > 0:
-                converted_amount = int(self.volatile_currency * VOLATILE_TO_META_CONVERSION_RATIO)
-                self.meta_currency += converted_amount
-                self.volatile_currency = 0
-                self.perm_fx_color = GREEN
-                self.perm_currency_fx_timer = 15
-            
-            self.wave_number += 1
-            self.wave_timer = 10 * FPS
-            self.wave_took_damage = False
-            new_enemies = self.wave_manager.get_wave(self.wave_number)
-            for enemy in new_enemies:
-                self.enemies.add(enemy)
-        elif not self.enemies:
-            self.wave_timer -= 1
-
-    def check_collisions(self):
-        for enemy in list(self.enemies):
-            if enemy.path_index >= len(enemy.path) - 1:
-                self.heartcrystal_health -= 10
-                self.wave_took_damage = True
-                enemy.kill()
+                dest = (enemy.rect.centerx - radius + camera_offset[0], enemy.rect.centery - radius + camera_offset[1])
+                self.renderer.submit(overlay, dest, LAYER_EFFECTS)
 
     def draw_game_over(self):
         self.screen.fill(BLACK)
-        game_over_text = self.font.render("Game Over", True, WHITE)
-        restart_text = self.font.render("Press 'R' to return to Main Menu", True, WHITE)
+        game_over_text = assets.render_text(self.font, "Game Over", WHITE)
+        restart_text = assets.render_text(self.font, "Press 'R' to return to Main Menu", WHITE)
         self.screen.blit(game_over_text, (self.screen.get_width() // 2 - game_over_text.get_width() // 2, self.screen.get_height() // 2 - 50))
         self.screen.blit(restart_text, (self.screen.get_width() // 2 - restart_text.get_width() // 2, self.screen.get_height() // 2 + 50))
 
     def draw_win_screen(self):
         self.screen.fill(BLACK)
-        win_text = self.font.render("You Win!", True, WHITE)
-        restart_text = self.font.render("Press 'R' to return to Main Menu", True, WHITE)
+        win_text = assets.render_text(self.font, "You Win!", WHITE)
+        restart_text = assets.render_text(self.font, "Press 'R' to return to Main Menu", WHITE)
         self.screen.blit(win_text, (self.screen.get_width() // 2 - win_text.get_width() // 2, self.screen.get_height() // 2 - 50))
         self.screen.blit(restart_text, (self.screen.get_width() // 2 - restart_text.get_width() // 2, self.screen.get_height() // 2 + 50))
 
-    def check_win_loss(self):
-        if self.heartcrystal_health <= 0:
-            self.save_progress()
-            self.game_state = "game_over"
-        
-        if self.wave_number >= 10 and not self.enemies:
-            self.save_progress()
-            self.game_state = "win"
-
-    def reset_run(self, level_data):
-        self.level = Level(level_data["map_data"])
-        self.wave_manager = WaveManager(self.level.path)
+    def reset_run(self, level_data, seed=None):
+        self.ensure_assets()
         pygame.mixer.music.load(assets.MUSIC_LEVEL_GENERIC)
         pygame.mixer.music.play(-1)
-        self.heartcrystal_health = 100
-        self.volatile_currency = level_data["starting_volatile_currency"]
-        self.wave_number = 0
-        self.wave_timer = 5 * FPS
-        self.enemies.empty()
-        self.towers.empty()
-        self.projectiles.empty()
-        self.particles.empty()
-        self.barricades.empty()
-        self.setup_level()
+        self.finish_recording()
+        self.end_playback()
+        super().reset_run(level_data, seed)
+        self.sim_clock.reset()
         self.set_placing_state(None)
-        self.overcharge_timer = 0
-        self.game_state = "playing"
-
-    def setup_level(self):
-        self.spire_plots.empty()
-        for spot in self.level.initial_tower_spots:
-            self.spire_plots.add(SpirePlot(spot))
+        self.selected_tower_instance = None # Its tower may be handed out again by the pool
+        if self.record_path:
+            self.recording = Recording.start(self)
+
+    # --- INPUT RECORDING ---
+
+    def command(self, *command):
+        # Every player action on the run goes through here, so a recording sees exactly what happened
+        if self.recording is not None:
+            self.recording.add_command(self.tick, command)
+        return self.apply(command)
+
+    def apply(self, command):
+        if command[0] == "speed":
+            if self.playback is None or self.replay_speed is None:
+                self.sim_clock.cycle_speed()
+            return True
+        return super().apply(command)
+
+    def finish_recording(self):
+        # Queued like any other save; a run that is resumed later is not recorded
+        if self.recording is not None:
+            self.saves.write(self.record_path, self.recording.encode())
+            self.recording = None
+
+    def start_replay(self, recording, speed=None):
+        """Plays a recording back in the window, following its commands instead of the mouse."""
+        playback = Player(recording)
+        playback.begin(self)
+        self.recording = None # A replay is not recorded again
+        self.playback = playback
+        self.replay_speed = speed
+        if speed is not None:
+            self.sim_clock.set_speed(speed)
+
+    def end_playback(self):
+        # Leaving a replay: back to the player's own Aetherium
+        if self.playback is not None:
+            self.playback = None
+            self.meta_currency = self.progress["meta_currency"]
 
     def set_placing_state(self, state):
         self.selected_tower = state if state in ["sunfire", "frost", "storm"] else None
@@ -701,30 +702,32 @@ class Game:
         font = self.tooltip_font
         padding = 5
         
-        # Find max width
-        max_width = 0
-        for line in lines:
-            text_surface = font.render(line, True, BLACK)
-            if text_surface.get_width() > max_width:
-                max_width = text_surface.get_width()
+        # Render each line once and reuse it for both the width pass and the blit
+        line_surfaces = [assets.render_text(font, line, BLACK) for line in lines]
+        max_width = max((text_surface.get_width() for text_surface in line_surfaces), default=0)
 
         total_height = len(lines) * (font.get_height() + 2)
         
         tooltip_surface = pygame.Surface((max_width + padding * 2, total_height + padding * 2))
         tooltip_surface.fill(WHITE)
         
-        for i, line in enumerate(lines):
-            text_surface = font.render(line, True, BLACK)
+        for i, text_surface in enumerate(line_surfaces):
             tooltip_surface.blit(text_surface, (padding, padding + i * (font.get_height() + 2)))
             
         tooltip_rect = tooltip_surface.get_rect(midbottom=pos)
         self.screen.blit(tooltip_surface, tooltip_rect)
 
     def draw_main_menu(self):
-        self.screen.blit(pygame.transform.scale(self.bg_main_menu, self.screen.get_size()), (0,0))
-        title_text = self.title_font.render("Aetheria: The Last Stand", True, WHITE)
-        currency_text = self.font.render(f"Aetherium: {self.meta_currency}", True, WHITE)
-        start_text = self.font.render("Press SPACE to Select Level", True, WHITE)
+        if self.preloader.is_pending(assets.BG_MAIN_MENU, self.screen.get_size(), alpha=False):
+            self.screen.fill(BLACK) # The menu works without its background while that is still decoding
+        else:
+            self.screen.blit(assets.load_image(assets.BG_MAIN_MENU, self.screen.get_size(), alpha=False), (0,0))
+        title_text = assets.render_text(self.title_font, "Aetheria: The Last Stand", WHITE)
+        currency_text = assets.render_text(self.font, f"Aetherium: {self.meta_currency}", WHITE)
+        start_text = assets.render_text(self.font, "Press SPACE to Select Level", WHITE)
+        if self.suspended_run:
+            resume_text = assets.render_text(self.font, "Press C to Resume Your Last Run", WHITE)
+            self.screen.blit(resume_text, (self.screen.get_width() // 2 - resume_text.get_width() // 2, self.screen.get_height() // 2 + 85))
         
         self.screen.blit(title_text, (self.screen.get_width() // 2 - title_text.get_width() // 2, self.screen.get_height() // 2 - 150))
         self.screen.blit(currency_text, (self.screen.get_width() // 2 - currency_text.get_width() // 2, self.screen.get_height() // 2 - 50))
@@ -738,66 +741,163 @@ class Game:
         # Armory Button (Placeholder)
         armory_button = pygame.Rect(self.screen.get_width() // 2 - 150, self.screen.get_height() // 2 + 120, 300, 50)
         pygame.draw.rect(self.screen, GREY, armory_button)
-        armory_text = self.font.render("Armory (Coming Soon)", True, BLACK)
+        armory_text = assets.render_text(self.font, "Armory (Coming Soon)", BLACK)
         self.screen.blit(armory_text, (armory_button.centerx - armory_text.get_width() // 2, armory_button.centery - armory_text.get_height() // 2))
+        self.draw_loading_bar()
 
     def draw_level_select_menu(self):
         self.screen.fill(BLACK)
-        title_text = self.title_font.render("Select a Level", True, WHITE)
+        title_text = assets.render_text(self.title_font, "Select a Level", WHITE)
         self.screen.blit(title_text, (self.screen.get_width() // 2 - title_text.get_width() // 2, 100))
 
+        mouse_pos = pygame.mouse.get_pos()
         for i, level_data in enumerate(levels.ALL_LEVELS):
             level_button = pygame.Rect(self.screen.get_width() // 2 - 150, 250 + i * 70, 300, 50)
             pygame.draw.rect(self.screen, GREY, level_button)
-            level_text = self.font.render(f"{level_data['name']} ({level_data['difficulty']})", True, BLACK)
+            if level_button.collidepoint(mouse_pos):
+                # Highlighted: start decoding its art so picking it doesn't wait on the disk
+                pygame.draw.rect(self.screen, WHITE, level_button, 3)
+                self.prefetch_level(level_data)
+            level_text = assets.render_text(self.font, f"{level_data['name']} ({level_data['difficulty']})", BLACK)
             self.screen.blit(level_text, (level_button.centerx - level_text.get_width() // 2, level_button.centery - level_text.get_height() // 2))
 
     def save_progress(self):
-        try:
-            with open("savegame.json", "r") as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {"unlocks": []} # Start fresh if file is bad
-        
-        data["meta_currency"] = self.meta_currency
-        
-        with open("savegame.json", "w") as f:
-            json.dump(data, f, indent=4)
+        if self.playback is not None:
+            return # Watching a replay doesn't change the player's own progress
+        # The run is over, so any suspended copy of it goes too
+        self.progress["meta_currency"] = self.meta_currency
+        self.saves.write(persistence.SAVE_FILE, persistence.encode_progress(self.progress))
+        self.saves.discard(persistence.SNAPSHOT_FILE)
 
     def load_progress(self):
+        self.progress = persistence.load_progress(persistence.SAVE_FILE)
+        self.meta_currency = self.progress["meta_currency"]
         try:
-            with open("savegame.json", "r") as f:
-                data = json.load(f)
-                self.meta_currency = 800
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.meta_currency = 800 # Default value if no save exists
+            self.suspended_run = persistence.load_snapshot(persistence.SNAPSHOT_FILE)
+        except persistence.SaveError:
+            self.suspended_run = None # A damaged snapshot just means there is nothing to resume
+
+    def suspend_run(self):
+        if self.playback is not None:
+            return # A replay is not the player's run, so it must not replace their suspended one
+        # Keeps the run in progress so the main menu can offer to resume it next time
+        self.saves.write(persistence.SNAPSHOT_FILE, persistence.encode_snapshot(persistence.capture_run(self)))
+
+    def resume_run(self):
+        persistence.restore_run(self, self.suspended_run)
+        self.suspended_run = None
+        self.recording = None # Its recording would be missing the part played before the suspend
+
+    def draw_loading_bar(self):
+        # Shown on the menus until the background preload has finished
+        if self.assets_loaded:
+            return
+        bar = pygame.Rect(self.screen.get_width() // 2 - 150, self.screen.get_height() - 60, 300, 12)
+        pygame.draw.rect(self.screen, GREY, bar, 1)
+        pygame.draw.rect(self.screen, WHITE, (bar.x, bar.y, int(bar.width * self.preloader.progress), bar.height))
+        loading_text = assets.render_text(self.tooltip_font, f"Loading assets {self.preloader.finished}/{self.preloader.requested}", WHITE)
+        self.screen.blit(loading_text, (bar.centerx - loading_text.get_width() // 2, bar.y - loading_text.get_height() - 4))
+
+    def request_assets(self):
+        # Menu background first, so it is the first thing a worker picks up
+        self.preloader.request_image(assets.BG_MAIN_MENU, self.screen.get_size(), alpha=False)
+        for path, size in assets.ATLAS_SPRITES:
+            self.preloader.request_image(path, size)
+        for path in (assets.SFX_UI_CLICK, assets.SFX_ENEMY_HIT, assets.SFX_ENEMY_DEATH,
+                     assets.SFX_TOWER_FIRE_SUNFIRE, assets.SFX_TOWER_FIRE_FROST, assets.SFX_TOWER_FIRE_STORM):
+            self.preloader.request_sound(path)
+
+    def prefetch_level(self, level_data):
+        for path, size, alpha in levels.level_images(level_data["map_data"]):
+            self.preloader.request_image(path, size, alpha)
+
+    def update_loading(self):
+        # Called every frame: takes in finished decodes and sets the game up once they are all in
+        self.preloader.poll()
+        if not self.assets_loaded and self.preloader.done:
+            self.load_assets()
+
+    def ensure_assets(self):
+        # A level was picked; whatever hasn't arrived yet is waited for rather than decoded twice
+        if not self.assets_loaded:
+            self.preloader.wait()
+            self.load_assets()
 
     def load_assets(self):
-        self.bg_main_menu = pygame.image.load(assets.BG_MAIN_MENU).convert()
-        self.castle_image = pygame.transform.scale(pygame.image.load(assets.CASTLE_IMAGE).convert_alpha(), CASTLE_SIZE)
-        self.spawn_gate_image = pygame.transform.scale(pygame.image.load(assets.SPAWN_GATE_IMAGE).convert_alpha(), SPAWN_GATE_SIZE)
+        with self.timeline.step("load_assets"):
+            self.build_assets()
+        self.assets_loaded = True
+        self.timeline.mark("assets ready")
+        if self.startup_report:
+            print(self.timeline.report())
+
+    def build_assets(self):
+        # Pack the sprite art first so everything below gets atlas handles
+        assets.build_sprite_atlas()
+        self.castle_image = assets.load_image(assets.CASTLE_IMAGE, CASTLE_SIZE)
+        self.spawn_gate_image = assets.load_image(assets.SPAWN_GATE_IMAGE, SPAWN_GATE_SIZE)
         
         # Load tower images for shop and placement preview
         self.tower_images = {
-            "sunfire": pygame.transform.scale(pygame.image.load(assets.TOWER_SUNFIRE_SPIRE).convert_alpha(), TOWER_SIZE),
-            "frost": pygame.transform.scale(pygame.image.load(assets.TOWER_FROST_SPIRE).convert_alpha(), TOWER_SIZE),
-            "storm": pygame.transform.scale(pygame.image.load(assets.TOWER_STORM_SPIRE).convert_alpha(), TOWER_SIZE),
-            "plot": pygame.transform.scale(pygame.image.load(assets.TOWER_PLOT).convert_alpha(), PLOT_SIZE),
+            "sunfire": assets.load_image(assets.TOWER_SUNFIRE_SPIRE, TOWER_SIZE),
+            "frost": assets.load_image(assets.TOWER_FROST_SPIRE, TOWER_SIZE),
+            "storm": assets.load_image(assets.TOWER_STORM_SPIRE, TOWER_SIZE),
+            "plot": assets.load_image(assets.TOWER_PLOT, PLOT_SIZE),
+        }
+        # The same art at shop card size, scaled once rather than on every frame
+        self.shop_icons = {
+            "sunfire": assets.load_image(assets.TOWER_SUNFIRE_SPIRE, SHOP_CARD_ICON_SIZE),
+            "frost": assets.load_image(assets.TOWER_FROST_SPIRE, SHOP_CARD_ICON_SIZE),
+            "storm": assets.load_image(assets.TOWER_STORM_SPIRE, SHOP_CARD_ICON_SIZE),
+            "plot": assets.load_image(assets.TOWER_PLOT, SHOP_CARD_ICON_SIZE),
         }
 
-        self.ui_click_sound = pygame.mixer.Sound(assets.SFX_UI_CLICK)
-        self.enemy_hit_sound = pygame.mixer.Sound(assets.SFX_ENEMY_HIT)
-        self.enemy_death_sound = pygame.mixer.Sound(assets.SFX_ENEMY_DEATH)
+        self.shop_towers = [
+            {"name": "Sunfire Spire", "cost": SUNFIRE_SPIRE_COST, "type": "sunfire", "image": self.shop_icons["sunfire"], "damage": SUNFIRE_SPIRE_DAMAGE, "range": SUNFIRE_SPIRE_RANGE},
+            {"name": "Frost Spire", "cost": FROST_SPIRE_COST, "type": "frost", "image": self.shop_icons["frost"], "damage": "Slows", "range": FROST_SPIRE_RANGE},
+            {"name": "Storm Spire", "cost": STORM_SPIRE_COST, "type": "storm", "image": self.shop_icons["storm"], "damage": STORM_SPIRE_DAMAGE, "range": STORM_SPIRE_RANGE},
+            {"name": "Barricade", "cost": BARRICADE_COST, "type": "barricade", "color": BROWN, "damage": "Blocks", "range": "N/A"},
+            {"name": "Spire Plot", "cost": SPIRE_PLOT_COST, "type": "plot", "image": self.shop_icons["plot"], "damage": "Build on it", "range": "N/A"},
+        ]
+
+        self.ui_click_sound = assets.SFX_UI_CLICK
+        self.enemy_hit_sound = assets.SFX_ENEMY_HIT
+        self.enemy_death_sound = assets.SFX_ENEMY_DEATH
         self.set_sfx_volume(self.sfx_volume) # Set initial volume
 
     def set_sfx_volume(self, volume):
         self.sfx_volume = volume
-        if self.ui_click_sound: self.ui_click_sound.set_volume(volume)
-        if self.enemy_hit_sound: self.enemy_hit_sound.set_volume(volume)
-        if self.enemy_death_sound: self.enemy_death_sound.set_volume(volume)
-        for tower in self.towers:
-            if tower.fire_sound:
-                tower.fire_sound.set_volume(volume)
+        audio.sfx.set_volume(volume)
+
+    def toggle_profiler(self):
+        # Timings are only collected while the overlay is up, unless a dump was requested at startup
+        self.show_profiler = not self.show_profiler
+        was_enabled = self.profiler.enabled
+        self.profiler.enabled = self.show_profiler or bool(self.profile_dump_path)
+        if self.profiler.enabled and not was_enabled:
+            self.profiler.start_frame()
+        if self.profiler_font is None:
+            # Monospace so the columns line up; looked up on first use since SysFont scans the system fonts
+            self.profiler_font = pygame.font.SysFont("monospace", FONT_SIZE_TOOLTIP)
+        self.profiler_lines = []
+        self.profiler_frames_drawn = 0
+
+    def draw_profiler_overlay(self):
+        # Percentiles are recomputed every few frames rather than every frame
+        if self.profiler_frames_drawn % PROFILER_OVERLAY_REFRESH == 0:
+            summary = self.profiler.summary()
+            self.profiler_lines = [f"{'phase':<10}{'p50':>7}{'p95':>7}{'p99':>7}  ms ({self.profiler.count} frames)"]
+            for phase in (*PHASES, "total"):
+                stats = summary[phase]
+                self.profiler_lines.append(f"{phase:<10}{stats['p50']:>7.2f}{stats['p95']:>7.2f}{stats['p99']:>7.2f}")
+        self.profiler_frames_drawn += 1
+
+        line_height = self.profiler_font.get_height()
+        panel = pygame.Surface((300, line_height * len(self.profiler_lines) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for i, line in enumerate(self.profiler_lines):
+            panel.blit(assets.render_text(self.profiler_font, line, WHITE), (5, 5 + i * line_height))
+        self.screen.blit(panel, panel.get_rect(midtop=(self.screen.get_width() // 2, HUD_PADDING)))
 
     def toggle_pause(self):
         self.is_paused = not self.is_paused
@@ -807,17 +907,17 @@ class Game:
         overlay.fill((0, 0, 0, 150))
         self.screen.blit(overlay, (0,0))
         
-        pause_text = self.title_font.render("Paused", True, WHITE)
+        pause_text = assets.render_text(self.title_font, "Paused", WHITE)
         self.screen.blit(pause_text, (self.screen.get_width() // 2 - pause_text.get_width() // 2, self.screen.get_height() // 2 - 50))
 
     def draw_settings_menu(self):
         self.screen.fill(BLACK)
-        title_text = self.title_font.render("Settings", True, WHITE)
+        title_text = assets.render_text(self.title_font, "Settings", WHITE)
         self.screen.blit(title_text, (self.screen.get_width() // 2 - title_text.get_width() // 2, 100))
 
         # Music Volume
         # Music Volume
-        music_text = self.font.render(f"Music Volume: {int(self.music_volume * 100)}%", True, WHITE)
+        music_text = assets.render_text(self.font, f"Music Volume: {int(self.music_volume * 100)}%", WHITE)
         music_text_rect = music_text.get_rect(center=(self.screen.get_width() // 2, SETTINGS_MUSIC_Y))
         self.screen.blit(music_text, music_text_rect)
         
@@ -827,7 +927,7 @@ class Game:
         pygame.draw.rect(self.screen, GREY, music_down_button)
 
         # SFX Volume
-        sfx_text = self.font.render(f"SFX Volume: {int(self.sfx_volume * 100)}%", True, WHITE)
+        sfx_text = assets.render_text(self.font, f"SFX Volume: {int(self.sfx_volume * 100)}%", WHITE)
         sfx_text_rect = sfx_text.get_rect(center=(self.screen.get_width() // 2, SETTINGS_SFX_Y))
         self.screen.blit(sfx_text, sfx_text_rect)
         
@@ -839,30 +939,34 @@ class Game:
         # Back Button
         back_button = pygame.Rect(self.screen.get_width() // 2 - BUTTON_WIDTH, SETTINGS_BACK_BUTTON_Y, BUTTON_WIDTH * 2, BUTTON_HEIGHT)
         pygame.draw.rect(self.screen, GREY, back_button)
-        back_text = self.font.render("Back", True, BLACK)
+        back_text = assets.render_text(self.font, "Back", BLACK)
         self.screen.blit(back_text, (back_button.centerx - back_text.get_width() // 2, back_button.centery - back_text.get_height() // 2))
 
         # Level Select Button
         level_select_button = pygame.Rect(self.screen.get_width() // 2 - BUTTON_WIDTH, SETTINGS_LEVEL_SELECT_Y, BUTTON_WIDTH * 2, BUTTON_HEIGHT)
         pygame.draw.rect(self.screen, GREY, level_select_button)
-        level_select_text = self.font.render("Level Select", True, BLACK)
+        level_select_text = assets.render_text(self.font, "Level Select", BLACK)
         self.screen.blit(level_select_text, (level_select_button.centerx - level_select_text.get_width() // 2, level_select_button.centery - level_select_text.get_height() // 2))
 
     def handle_level_select_click(self, pos):
         for i, level_data in enumerate(levels.ALL_LEVELS):
             level_button = pygame.Rect(self.screen.get_width() // 2 - 150, 250 + i * 70, 300, 50)
             if level_button.collidepoint(pos):
+                # Starting a new run abandons the suspended one
+                if self.suspended_run:
+                    self.suspended_run = None
+                    self.saves.discard(persistence.SNAPSHOT_FILE)
                 self.reset_run(level_data)
                 break
 
     def handle_settings_click(self, pos):
         # Recreate the rects here to ensure they match the drawing code
-        music_text = self.font.render(f"Music Volume: {int(self.music_volume * 100)}%", True, WHITE)
+        music_text = assets.render_text(self.font, f"Music Volume: {int(self.music_volume * 100)}%", WHITE)
         music_text_rect = music_text.get_rect(center=(self.screen.get_width() // 2, SETTINGS_MUSIC_Y))
         music_up_button = pygame.Rect(music_text_rect.right + SETTINGS_BUTTON_SPACING, music_text_rect.centery - SETTINGS_BUTTON_SIZE[1] // 2, SETTINGS_BUTTON_SIZE[0], SETTINGS_BUTTON_SIZE[1])
         music_down_button = pygame.Rect(music_text_rect.left - SETTINGS_BUTTON_SIZE[0] - SETTINGS_BUTTON_SPACING, music_text_rect.centery - SETTINGS_BUTTON_SIZE[1] // 2, SETTINGS_BUTTON_SIZE[0], SETTINGS_BUTTON_SIZE[1])
 
-        sfx_text = self.font.render(f"SFX Volume: {int(self.sfx_volume * 100)}%", True, WHITE)
+        sfx_text = assets.render_text(self.font, f"SFX Volume: {int(self.sfx_volume * 100)}%", WHITE)
         sfx_text_rect = sfx_text.get_rect(center=(self.screen.get_width() // 2, SETTINGS_SFX_Y))
         sfx_up_button = pygame.Rect(sfx_text_rect.right + SETTINGS_BUTTON_SPACING, sfx_text_rect.centery - SETTINGS_BUTTON_SIZE[1] // 2, SETTINGS_BUTTON_SIZE[0], SETTINGS_BUTTON_SIZE[1])
         sfx_down_button = pygame.Rect(sfx_text_rect.left - SETTINGS_BUTTON_SIZE[0] - SETTINGS_BUTTON_SPACING, sfx_text_rect.centery - SETTINGS_BUTTON_SIZE[1] // 2, SETTINGS_BUTTON_SIZE[0], SETTINGS_BUTTON_SIZE[1])
@@ -892,5 +996,20 @@ class Game:
             self.game_state = "level_select"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aetheria: The Last Stand")
+    parser.add_argument("--profile-dump", metavar="FILE", help="record per-phase frame timings and write them to FILE (.csv or .json) on exit; F3 toggles the overlay")
+    parser.add_argument("--startup-report", action="store_true", help="print how long each startup load step took once every asset is in")
+    parser.add_argument("--record", metavar="FILE", help="record each run's seed and inputs to FILE, for replay.py or --replay")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded run instead of playing")
+    parser.add_argument("--replay-speed", type=float, metavar="X", help="play the replay at X times normal speed (0 for as fast as possible) instead of its recorded speed changes")
+    args = parser.parse_args()
+
     game = Game()
+    game.startup_report = args.startup_report
+    game.record_path = args.record
+    if args.profile_dump:
+        game.profile_dump_path = args.profile_dump
+        game.profiler.enabled = True
+    if args.replay:
+        game.start_replay(Recording.load(args.replay), args.replay_speed)
     game.run()
\ No newline at end of file
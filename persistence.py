@@ -0,0 +1,292 @@
+import os
+import json
+import zlib
+import struct
+import tempfile
+import threading
+from settings import DEFAULT_META_CURRENCY
+import levels
+from structures import SpirePlot, Barricade
+from towers import TOWER_TYPES
+from waves import ENEMY_CLASSES, SpawnEntry
+
+# --- FILES ---
+# Absolute, so saves land next to the game whatever directory it was started from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAVE_FILE = os.path.join(BASE_DIR, "savegame.json")
+SNAPSHOT_FILE = os.path.join(BASE_DIR, "suspended_run.bin")
+
+
+class SaveError(ValueError):
+    """A save or snapshot file that exists but can't be read back."""
+
+
+def write_atomic(path, data):
+    """Replaces path with data so that a crash at any point leaves the old file or the new one.
+
+    The bytes go to a temp file in the same directory, are flushed to disk, and only then renamed
+    over the target; os.replace is atomic on the same filesystem.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable; not possible (or needed) on Windows
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class SaveWriter:
+    """Writes files on a background thread so saving never holds up a frame.
+
+    write() only queues the bytes. Writes to the same path that are still waiting collapse into
+    the newest one, and each is committed with write_atomic; discard() queues a delete the same
+    way. Call flush() before exiting so queued saves reach the disk.
+    """
+
+    def __init__(self):
+        self.errors = [] # (path, exception) for writes that failed
+        self._pending = {} # path -> bytes, or None to delete it, in the order first queued
+        self._writing = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def write(self, path, data):
+        with self._condition:
+            self._pending[path] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def discard(self, path):
+        # Deletes the file, e.g. a snapshot whose run has ended, replacing any write still queued for it
+        self.write(path, None)
+
+    def flush(self, timeout=None):
+        """Waits until every queued write is on disk; returns False if timeout ran out first."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                path = next(iter(self._pending))
+                data = self._pending.pop(path)
+                self._writing = True
+            try:
+                if data is not None:
+                    write_atomic(path, data)
+                elif os.path.exists(path):
+                    os.remove(path)
+            except OSError as error:
+                self.errors.append((path, error))
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+
+# --- PROGRESS ---
+# Meta currency and unlocks, kept between runs as readable JSON
+
+def default_progress():
+    return {"meta_currency": DEFAULT_META_CURRENCY, "unlocks": []}
+
+def load_progress(path=SAVE_FILE):
+    """Returns the saved progress, or the defaults if there is no save or it can't be read."""
+    progress = default_progress()
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return progress
+    if isinstance(data, dict):
+        if isinstance(data.get("meta_currency"), int):
+            progress["meta_currency"] = data["meta_currency"]
+        if isinstance(data.get("unlocks"), list):
+            progress["unlocks"] = data["unlocks"]
+    return progress
+
+def encode_progress(progress):
+    return json.dumps(progress, indent=4).encode("utf-8")
+
+
+# --- RUN SNAPSHOTS ---
+# A whole run in progress, for suspend and resume. The state is gathered into plain lists and
+# numbers, then stored as zlib-compressed JSON behind a short magic/version header. Particles and
+# other visuals are not kept; every timer is saved as the ticks it had left.
+
+SNAPSHOT_MAGIC = b"AETR"
+SNAPSHOT_VERSION = 3 # 2 added the run seed and RNG state, 3 tower targeting policies
+_HEADER = struct.Struct("<4sH")
+
+RUN_FIELDS = ("seed", "tick", "heartcrystal_health", "volatile_currency", "meta_currency", "wave_number", "wave_timer",
+              "wave_start_tick", "wave_took_damage", "overcharge_timer")
+ENEMY_FIELDS = ("x", "y", "prev_x", "prev_y", "distance_traveled", "path_index", "speed", "original_speed",
+                "slow_timer", "attack_timer", "health", "max_health", "shield")
+ENEMY_EXTRA_FIELDS = ("regenerating", "pulse_vfx_until", "heal_vfx_until") # Only on the types that have them
+ENEMY_TIMERS = ("shield_cooldown", "pulse_timer", "heal_timer")
+TOWER_FIELDS = ("level", "cost", "upgrade_cost", "damage", "range", "fire_rate", "last_shot_time", "vfx_timer", "targeting")
+
+ENEMY_TYPES = {enemy_type.__name__: enemy_type for enemy_type in ENEMY_CLASSES}
+TOWER_NAMES = {tower_type: name for name, tower_type in TOWER_TYPES.items()}
+
+def _remaining(timer):
+    return timer.remaining if timer is not None and not timer.cancelled else None
+
+def _index(obj, indices):
+    return indices.get(obj) if obj is not None else None
+
+def capture_run(sim):
+    """Returns the state of sim's current run as plain data that restore_run can rebuild it from."""
+    # The rest of the wave is drawn out of its stream so it survives; the sim carries on from a copy
+    spawns = [sim.next_spawn] + list(sim.wave_spawns) if sim.next_spawn is not None else []
+    sim.wave_spawns = iter(spawns[1:])
+
+    enemies = list(sim.enemies)
+    towers = list(sim.towers)
+    enemy_indices = {enemy: i for i, enemy in enumerate(enemies)}
+    tower_indices = {tower: i for i, tower in enumerate(towers)}
+    level_index = next(i for i, level_data in enumerate(levels.ALL_LEVELS) if level_data["map_data"] is sim.level.map_data)
+
+    state = {field: getattr(sim, field) for field in RUN_FIELDS}
+    state["level"] = level_index
+    state["rng"] = sim.rng.getstate()
+    state["spawns"] = [[entry.offset, entry.enemy_type.__name__, entry.modifiers] for entry in spawns]
+    state["plots"] = [[list(plot.pos), plot.is_occupied] for plot in sim.spire_plots]
+    state["enemies"] = [{
+        "type": type(enemy).__name__,
+        **{field: getattr(enemy, field) for field in ENEMY_FIELDS},
+        **{field: getattr(enemy, field) for field in ENEMY_EXTRA_FIELDS if hasattr(enemy, field)},
+        "timers": {name: _remaining(getattr(enemy, name)) for name in ENEMY_TIMERS if hasattr(enemy, name)},
+        "last_hit_by": _index(enemy.last_hit_by, tower_indices),
+    } for enemy in enemies]
+    state["towers"] = [{
+        "type": TOWER_NAMES[type(tower)],
+        "pos": list(tower.pos),
+        **{field: getattr(tower, field) for field in TOWER_FIELDS},
+        "disabled": _remaining(tower.disable_timer),
+        "slowed": _remaining(tower.slow_effect_timer),
+        "target": _index(tower.target, enemy_indices),
+        "locked_target": _index(getattr(tower, "locked_target", None), enemy_indices),
+        "targets_hit": [enemy_indices[enemy] for enemy in getattr(tower, "targets_hit", ()) if enemy in enemy_indices],
+    } for tower in towers]
+    state["barricades"] = [[list(barricade.pos), barricade.health, _remaining(barricade.expiry)] for barricade in sim.barricades]
+    return state
+
+def restore_run(sim, state):
+    """Replaces sim's run with one captured by capture_run."""
+    sim.reset_run(levels.ALL_LEVELS[state["level"]], seed=state["seed"])
+    version, internal, gauss = state["rng"]
+    sim.rng.setstate((version, tuple(internal), gauss)) # JSON hands the tuples back as lists
+    timers = sim.timers
+    for field in RUN_FIELDS:
+        setattr(sim, field, state[field])
+    timers.now = sim.tick
+
+    spawns = [SpawnEntry(offset, ENEMY_TYPES[name], modifiers) for offset, name, modifiers in state["spawns"]]
+    sim.next_spawn = spawns[0] if spawns else None
+    sim.wave_spawns = iter(spawns[1:])
+
+    sim.spire_plots.empty()
+    for pos, occupied in state["plots"]:
+        plot = SpirePlot(tuple(pos))
+        plot.is_occupied = occupied
+        sim.spire_plots.add(plot)
+
+    towers = []
+    for data in state["towers"]:
+        tower = sim.pools.acquire(TOWER_TYPES[data["type"]], tuple(data["pos"]))
+        for field in TOWER_FIELDS:
+            setattr(tower, field, data[field])
+        sim.add_tower(tower)
+        if data["disabled"] is not None:
+            tower.disable(data["disabled"])
+        if data["slowed"] is not None:
+            tower.slow(data["slowed"])
+        towers.append(tower)
+
+    enemies = []
+    for data in state["enemies"]:
+        enemy = sim.pools.acquire(ENEMY_TYPES[data["type"]], sim.level.path)
+        for field in ENEMY_FIELDS + ENEMY_EXTRA_FIELDS:
+            if field in data:
+                setattr(enemy, field, data[field])
+        if hasattr(enemy, "image_shielded"):
+            enemy.original_image = enemy.image_shielded if enemy.shield > 0 else enemy.image_no_shield
+        enemy.refresh_image()
+        enemy.rect.center = (enemy.x, enemy.y)
+        enemy.last_hit_by = towers[data["last_hit_by"]] if data["last_hit_by"] is not None else None
+        sim.spawn_enemy(enemy)
+        _restore_timers(enemy, data["timers"], timers)
+        enemies.append(enemy)
+
+    for tower, data in zip(towers, state["towers"]):
+        tower.target = enemies[data["target"]] if data["target"] is not None else None
+        if hasattr(tower, "locked_target"):
+            tower.locked_target = enemies[data["locked_target"]] if data["locked_target"] is not None else None
+        if hasattr(tower, "targets_hit"):
+            tower.targets_hit[:] = [enemies[i] for i in data["targets_hit"]]
+
+    for pos, health, expiry in state["barricades"]:
+        barricade = sim.pools.acquire(Barricade, tuple(pos))
+        barricade.health = health
+        if expiry is not None:
+            barricade.expiry = timers.schedule(expiry, barricade.kill)
+        sim.barricades.add(barricade)
+
+    sim.enemy_index.rebuild(sim.enemies)
+    sim.ranges.rebuild(sim.towers, sim.enemies)
+
+def _restore_timers(enemy, remaining, timers):
+    # on_spawn has already scheduled each ability at its full period; move it to where it was
+    for name, ticks in remaining.items():
+        timer = getattr(enemy, name)
+        if timer is not None:
+            timer.cancel()
+            setattr(enemy, name, None)
+        if ticks is None:
+            continue
+        if timer is not None:
+            setattr(enemy, name, timers.schedule(ticks, timer.callback, *timer.args))
+        elif name == "shield_cooldown":
+            enemy.shield_cooldown = timers.schedule(ticks, enemy.start_regen)
+
+def encode_snapshot(state):
+    payload = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), 9)
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION) + payload
+
+def decode_snapshot(data):
+    if len(data) < _HEADER.size:
+        raise SaveError("snapshot is truncated")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise SaveError(f"not a version {SNAPSHOT_VERSION} run snapshot")
+    try:
+        return json.loads(zlib.decompress(data[_HEADER.size:]))
+    except (zlib.error, ValueError) as error:
+        raise SaveError(f"snapshot is damaged: {error}") from error
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """Returns the suspended run's state, or None if there isn't one."""
+    try:
+        with open(path, "rb") as f:
+            return decode_snapshot(f.read())
+    except FileNotFoundError:
+        return None
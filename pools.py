@@ -0,0 +1,52 @@
+from settings import POOL_MAX_PER_TYPE
+
+class PoolSet:
+    """Free lists of released sprites, one per class, so waves and runs reuse objects instead of building new ones.
+
+    Pooled classes take their constructor arguments again in reset(*args) and drop their
+    references to the run in release(). A sprite leaving play is retired first and only released
+    into its free list by flush(), which the simulation calls at points where nothing can still
+    hold a reference to it: the start of a wave and the start of a run.
+    """
+
+    def __init__(self, max_per_type=POOL_MAX_PER_TYPE):
+        self.max_per_type = max_per_type
+        self.free = {} # class -> released instances
+        self.retired = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, cls, *args):
+        free = self.free.get(cls)
+        if free:
+            obj = free.pop()
+            obj.reset(*args)
+            self.reused += 1
+        else:
+            obj = cls(*args)
+            self.created += 1
+        obj.pool = self
+        obj.retired = False
+        return obj
+
+    def retire(self, obj):
+        # Safe to call more than once, e.g. from both kill() and a run reset
+        if obj.pool is self and not obj.retired:
+            obj.retired = True
+            self.retired.append(obj)
+
+    def flush(self):
+        for obj in self.retired:
+            obj.release()
+            free = self.free.setdefault(type(obj), [])
+            if len(free) < self.max_per_type:
+                free.append(obj)
+        self.retired.clear()
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "free": sum(len(free) for free in self.free.values()),
+            "retired": len(self.retired),
+        }
@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+import pygame
+import assets
+from settings import PRELOAD_WORKERS
+
+class StartupTimeline:
+    """Start and end of every load step, in milliseconds since the timeline was created.
+
+    Steps may be recorded from any thread; report() lists them in the order they started.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.steps = [] # (label, start ms, end ms, thread name)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, start, time.perf_counter())
+
+    def record(self, label, start, end):
+        step = (label, (start - self.origin) * 1000.0, (end - self.origin) * 1000.0, threading.current_thread().name)
+        with self._lock:
+            self.steps.append(step)
+
+    def mark(self, label):
+        # A zero-length step, for milestones such as the first frame on screen
+        now = time.perf_counter()
+        self.record(label, now, now)
+
+    def report(self):
+        lines = [f"{'start ms':>9}{'took ms':>9}  {'thread':<12}step"]
+        for label, start, end, thread in sorted(self.steps, key=lambda step: step[1]):
+            lines.append(f"{start:>9.1f}{end - start:>9.1f}  {thread:<12}{label}")
+        return "\n".join(lines)
+
+
+class AssetPreloader:
+    """Decodes images and sounds on a thread pool while the game keeps drawing frames.
+
+    Workers only read files into new Surfaces and Sounds, scaling images to their requested size
+    on the way. Each file is decoded once however many sizes are asked for. poll() hands finished
+    ones to the shared caches on the main thread, which also does the display-dependent
+    convert(). Anything asked for before it arrives is simply loaded on demand by
+    assets.load_image / load_sound as before.
+    """
+
+    def __init__(self, timeline, workers=PRELOAD_WORKERS):
+        self.timeline = timeline
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preload")
+        self._pending = {} # key -> Future
+        self._sources = {} # path -> decoded full-size Surface, kept while its sizes are still being scaled
+        self._source_locks = {} # path -> Lock; one worker at a time decodes or scales from a file
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.finished = 0
+        self.failed = []
+
+    @property
+    def done(self):
+        return not self._pending
+
+    @property
+    def progress(self):
+        return self.finished / self.requested if self.requested else 1.0
+
+    def request_image(self, path, size=None, alpha=True):
+        size = tuple(size) if size is not None else None
+        key = ("image", path, size, alpha)
+        if key in self._pending or assets.image_cache.contains(path, size, alpha):
+            return
+        self._submit(key, self._decode_image, path, size)
+
+    def request_sound(self, path):
+        key = ("sound", path)
+        if key in self._pending or assets.has_sound(path) or not pygame.mixer.get_init():
+            return
+        self._submit(key, self._decode_sound, path)
+
+    def is_pending(self, path, size=None, alpha=True):
+        return ("image", path, tuple(size) if size is not None else None, alpha) in self._pending
+
+    def _submit(self, key, decode, *args):
+        self._pending[key] = self._executor.submit(decode, *args)
+        self.requested += 1
+
+    def _decode_image(self, path, size):
+        with self._lock:
+            source_lock = self._source_locks.setdefault(path, threading.Lock())
+        with source_lock:
+            source = self._sources.get(path)
+            if source is None:
+                with self.timeline.step(f"decode {os.path.basename(path)}"):
+                    source = self._sources[path] = pygame.image.load(path)
+            if size is None:
+                return source.copy()
+            with self.timeline.step(f"scale {os.path.basename(path)} to {size[0]}x{size[1]}"):
+                # Same nearest-neighbour scale the cache would do, so the pixels match an on-demand load
+                return pygame.transform.scale(source, size)
+
+    def _decode_sound(self, path):
+        with self.timeline.step(f"decode {os.path.basename(path)}"):
+            return pygame.mixer.Sound(path)
+
+    def poll(self):
+        """Installs whatever the workers have finished; call once per frame from the main thread."""
+        ready = [key for key, future in self._pending.items() if future.done()]
+        if not ready:
+            return 0
+        with self.timeline.step(f"install {len(ready)} asset{'s' if len(ready) > 1 else ''}"):
+            for key in ready:
+                self._install(key, self._pending.pop(key))
+        if not self._pending:
+            # Nothing left that could scale from them
+            self._sources.clear()
+            self._source_locks.clear()
+        return len(ready)
+
+    def wait(self):
+        """Blocks until everything requested so far is decoded and installed."""
+        if self._pending:
+            with self.timeline.step(f"wait for {len(self._pending)} pending"):
+                wait(list(self._pending.values()))
+        self.poll()
+
+    def _install(self, key, future):
+        self.finished += 1
+        try:
+            result = future.result()
+        except (pygame.error, OSError) as error:
+            # Left for the on-demand load to report if the game ever actually needs it
+            self.failed.append((key, error))
+            return
+        if key[0] == "image":
+            _, path, size, alpha = key
+            assets.image_cache.install(path, size, alpha, result)
+        else:
+            assets.install_sound(key[1], result)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+        self._sources.clear()
+        self._source_locks.clear()
@@ -0,0 +1,115 @@
+import csv
+import json
+import math
+import time
+from settings import PROFILER_FRAMES
+
+# Phases in the order they happen within one frame. Game.run and Simulation.update call lap()
+# right after each phase finishes, so every lap covers the time since the previous one.
+PHASES = (
+    "events",
+    "enemies",
+    "towers",
+    "particles",
+    "waves",
+    "deaths",
+    "abilities",
+    "world",
+    "hud",
+    "shop",
+    "menus",
+    "flip",
+    "idle",
+)
+
+
+class FrameProfiler:
+    """Per-phase frame timings kept in a fixed-size ring buffer of the most recent frames.
+
+    Disabled by default; while disabled every call returns straight away, so the hooks can
+    stay in the game loop permanently. Times are recorded in milliseconds.
+    """
+
+    def __init__(self, capacity=PROFILER_FRAMES, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self._slot = {phase: i for i, phase in enumerate(PHASES)}
+        self._frames = [[0.0] * len(PHASES) for _ in range(capacity)]
+        self._current = [0.0] * len(PHASES)
+        self._next = 0 # Ring buffer row the next finished frame is written to
+        self.count = 0 # Frames recorded, capped at capacity
+        self._last = 0.0
+        self._summary = None
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        current = self._current
+        for i in range(len(current)):
+            current[i] = 0.0
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap (or start_frame) to phase."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._current[self._slot[phase]] += (now - self._last) * 1000.0
+        self._last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self._frames[self._next][:] = self._current
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._summary = None
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+        self._summary = None
+
+    def frames(self):
+        """Returns the recorded frames oldest first, one list of per-phase times each."""
+        start = (self._next - self.count) % self.capacity
+        return [list(self._frames[(start + i) % self.capacity]) for i in range(self.count)]
+
+    def summary(self):
+        """Returns {phase: {"p50", "p95", "p99", "mean"}} over the recorded frames, plus a "total" row."""
+        if self._summary is None:
+            frames = self.frames()
+            columns = {phase: [frame[i] for frame in frames] for i, phase in enumerate(PHASES)}
+            columns["total"] = [sum(frame) for frame in frames]
+            self._summary = {phase: _describe(values) for phase, values in columns.items()}
+        return self._summary
+
+    def dump(self, path):
+        """Writes the buffer to path as JSON if it ends in .json, otherwise as CSV."""
+        frames = self.frames()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": list(PHASES), "frames": frames, "summary": self.summary()}, f, indent=2)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", *PHASES])
+                for i, frame in enumerate(frames):
+                    writer.writerow([i, *(f"{value:.4f}" for value in frame)])
+
+
+def _describe(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    ordered = sorted(values)
+    return {
+        "p50": _percentile(ordered, 50),
+        "p95": _percentile(ordered, 95),
+        "p99": _percentile(ordered, 99),
+        "mean": sum(ordered) / len(ordered),
+    }
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile of an already sorted list
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
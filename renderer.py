@@ -0,0 +1,71 @@
+from operator import itemgetter
+
+# --- LAYERS ---
+# Drawn in this order. Within a layer, entries go back to front by sort key, the y of their foot
+# in map coordinates, so a sprite standing lower on the map covers the ones behind it.
+LAYER_GROUND = 0 # Flat on the map: spire plots
+LAYER_WORLD = 1 # Standing on it: enemies, towers, barricades, the spawn gate and the castle
+LAYER_EFFECTS = 2 # Over everything: particles, beams and pulses
+LAYER_COUNT = 3
+
+_sort_key = itemgetter(0)
+
+
+class WorldRenderer:
+    """Render queue for the game world, refilled and flushed once per frame.
+
+    Surfaces are submitted with where they go on screen, a layer and a sort key; anything wholly
+    outside the viewport is dropped on submission. flush() sorts each layer and hands it to the
+    target in a single blits call, then runs the layer's draw callbacks (lines and other
+    primitives that are not surfaces). Entries with equal keys keep their submission order.
+    """
+
+    def __init__(self):
+        self.layers = [[] for _ in range(LAYER_COUNT)]
+        self.draws = [[] for _ in range(LAYER_COUNT)]
+        self.bounds = (0, 0, 0, 0)
+
+    def begin(self, viewport):
+        for entries in self.layers:
+            entries.clear()
+        for draws in self.draws:
+            draws.clear()
+        self.bounds = (viewport.left, viewport.top, viewport.right, viewport.bottom)
+
+    def visible(self, x, y, width, height):
+        left, top, right, bottom = self.bounds
+        return x < right and y < bottom and x + width > left and y + height > top
+
+    def submit(self, surface, dest, layer, sort_key=0):
+        x, y = dest[0], dest[1]
+        if self.visible(x, y, surface.get_width(), surface.get_height()):
+            self.layers[layer].append((sort_key, surface, (x, y)))
+
+    def submit_many(self, entries, layer):
+        """Submits each (surface, (x, y), sort_key) in entries, as submit() would."""
+        visible = self.visible
+        queued = self.layers[layer]
+        for surface, (x, y), sort_key in entries:
+            if visible(x, y, surface.get_width(), surface.get_height()):
+                queued.append((sort_key, surface, (x, y)))
+
+    def submit_sprites(self, sprites, offset, layer):
+        """Submits each sprite's image at its rect moved by offset, keyed by the rect's bottom edge."""
+        ox, oy = offset
+        self.submit_many(((sprite.image, (sprite.rect.x + ox, sprite.rect.y + oy), sprite.rect.bottom) for sprite in sprites), layer)
+
+    def submit_draw(self, draw, layer):
+        # draw(target) runs after the layer's surfaces are blitted
+        self.draws[layer].append(draw)
+
+    def flush(self, target):
+        for entries, draws in zip(self.layers, self.draws):
+            if entries:
+                entries.sort(key=_sort_key)
+                batch = [(surface, dest) for _, surface, dest in entries]
+                if hasattr(target, "fblits"):
+                    target.fblits(batch)
+                else:
+                    target.blits(batch, doreturn=False)
+            for draw in draws:
+                draw(target)
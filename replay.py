@@ -0,0 +1,157 @@
+import sys
+import json
+import zlib
+import time
+import struct
+import argparse
+from array import array
+import levels
+from simulation import Simulation, init_headless
+
+# --- RECORDINGS ---
+# A run is fully determined by its level, seed, starting Aetherium and the commands the player
+# issued, each stamped with the tick it was applied after. The recording also keeps a CRC of the
+# simulation state after every tick, so a replay can say exactly where it stopped matching.
+
+REPLAY_MAGIC = b"AETP"
+REPLAY_VERSION = 1
+_HEADER = struct.Struct("<4sHI") # magic, version, length of the JSON part
+
+def state_hash(sim):
+    """CRC32 of the state that decides how a run goes: counters, enemies, towers and barricades."""
+    crc = zlib.crc32(struct.pack("<7q", sim.tick, int(sim.heartcrystal_health), int(sim.volatile_currency),
+                                 int(sim.meta_currency), sim.wave_number, len(sim.enemies), len(sim.towers)))
+    crc = zlib.crc32(array("d", [value for enemy in sim.enemies for value in (enemy.x, enemy.y, enemy.health)]).tobytes(), crc)
+    crc = zlib.crc32(array("d", [value for tower in sim.towers for value in (tower.last_shot_time, tower.damage)]).tobytes(), crc)
+    return zlib.crc32(array("d", [barricade.health for barricade in sim.barricades]).tobytes(), crc)
+
+
+class Recording:
+    """One run's starting conditions, tick-stamped commands and per-tick state hashes."""
+
+    def __init__(self, level, seed, meta_currency, total_waves, use_enemy_store, commands=None, hashes=None):
+        self.level = level # Index into levels.ALL_LEVELS
+        self.seed = seed
+        self.meta_currency = meta_currency
+        self.total_waves = total_waves
+        self.use_enemy_store = use_enemy_store # Which movement path the hashes were taken on
+        self.commands = commands if commands is not None else [] # [tick, command]
+        self.hashes = hashes if hashes is not None else array("I") # hashes[i] is the state after tick i + 1
+
+    @classmethod
+    def start(cls, sim):
+        """Begins recording sim's run; call right after reset_run, before any command or tick."""
+        level = next(i for i, level_data in enumerate(levels.ALL_LEVELS) if level_data["map_data"] is sim.level.map_data)
+        return cls(level, sim.seed, sim.meta_currency, sim.total_waves, sim.enemy_store is not None)
+
+    def add_command(self, tick, command):
+        self.commands.append([tick, list(command)])
+
+    def add_tick(self, sim):
+        self.hashes.append(state_hash(sim))
+
+    def encode(self):
+        header = json.dumps({
+            "level": self.level,
+            "seed": self.seed,
+            "meta_currency": self.meta_currency,
+            "total_waves": self.total_waves,
+            "use_enemy_store": self.use_enemy_store,
+            "commands": self.commands,
+        }, separators=(",", ":")).encode("utf-8")
+        hashes = array("I", self.hashes)
+        if sys.byteorder == "big":
+            hashes.byteswap() # Stored little-endian
+        return _HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(header)) + zlib.compress(header + hashes.tobytes(), 9)
+
+    @classmethod
+    def decode(cls, data):
+        magic, version, header_length = _HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"not a version {REPLAY_VERSION} Aetheria recording")
+        payload = zlib.decompress(data[_HEADER.size:])
+        header = json.loads(payload[:header_length])
+        hashes = array("I")
+        hashes.frombytes(payload[header_length:])
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        return cls(header["level"], header["seed"], header["meta_currency"], header["total_waves"],
+                   header["use_enemy_store"], header["commands"], hashes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.decode(f.read())
+
+
+class Player:
+    """Feeds a recording's commands into a simulation and checks each tick against its hashes.
+
+    Call apply_due() before every update() and check() after it; divergence holds the first tick
+    whose state differed from the recording, or None.
+    """
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.next_command = 0
+        self.divergence = None
+
+    def begin(self, sim):
+        # Puts sim at the start of the recorded run
+        level_data = levels.ALL_LEVELS[self.recording.level]
+        sim.reset_run(level_data, seed=self.recording.seed)
+        sim.meta_currency = self.recording.meta_currency
+
+    @property
+    def finished(self):
+        return self.next_command >= len(self.recording.commands)
+
+    def apply_due(self, sim):
+        commands = self.recording.commands
+        while self.next_command < len(commands) and commands[self.next_command][0] <= sim.tick:
+            sim.apply(tuple(commands[self.next_command][1]))
+            self.next_command += 1
+
+    def check(self, sim):
+        hashes = self.recording.hashes
+        if self.divergence is None and sim.tick <= len(hashes) and state_hash(sim) != hashes[sim.tick - 1]:
+            self.divergence = sim.tick
+
+
+def play_headless(recording):
+    """Replays a recording with no rendering, as fast as the simulation runs; returns a summary dict."""
+    init_headless()
+    level_data = levels.ALL_LEVELS[recording.level]
+    sim = Simulation(level_data["map_data"], total_waves=recording.total_waves, use_enemy_store=recording.use_enemy_store)
+    player = Player(recording)
+    player.begin(sim)
+    recorded_ticks = len(recording.hashes)
+    start = time.perf_counter()
+    # A recording cut short by quitting ends where it stopped; one that ran to the end ends with the run
+    while sim.game_state == "playing" and sim.tick < recorded_ticks:
+        player.apply_due(sim)
+        sim.update()
+        player.check(sim)
+    elapsed = time.perf_counter() - start
+    return {
+        "level": level_data["name"],
+        "seed": recording.seed,
+        "outcome": sim.game_state,
+        "waves_reached": sim.wave_number,
+        "ticks": sim.tick,
+        "recorded_ticks": recorded_ticks,
+        "commands": len(recording.commands),
+        "divergence": player.divergence,
+        "seconds": elapsed,
+        "ticks_per_second": sim.tick / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded run headless at full speed and check it against its state hashes.")
+    parser.add_argument("recording", help="file written by main.py --record")
+    args = parser.parse_args()
+
+    result = play_headless(Recording.load(args.recording))
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["divergence"] is not None else 0)
@@ -140,7 +140,34 @@ AOE_ATTACK_COST = 75
 AOE_ATTACK_RADIUS = 100
 AOE_ATTACK_DAMAGE = 150
 
+# --- PERFORMANCE ---
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024 # Budget for decoded/scaled images kept by assets.image_cache
+ATLAS_PAGE_SIZE = (1024, 1024) # Largest sprite atlas page; sprites that don't fit start another
+ATLAS_PADDING = 1 # Transparent pixels between packed sprites
+TEXT_CACHE_MAX_BYTES = 4 * 1024 * 1024 # Budget for rendered strings kept by assets.text_cache
+SPATIAL_HASH_CELL_SIZE = 128 # Grid cell size for enemy/tower proximity queries
+SPATIAL_HASH_MARGIN = 4 # Furthest an enemy can move in one tick (fastest enemy speed, rounded up)
+PARTICLE_CAPACITY = 4096 # Max live particles; extra emissions are dropped
+USE_ENEMY_STORE = True # Vectorized enemy movement via NumPy; falls back to per-sprite updates without it
+USE_RANGE_MATRIX = True # Tower-by-enemy distance matrix (NumPy) for targeting on busy ticks; spatial hash queries otherwise
+RANGE_MATRIX_MIN_QUERIES = 4 # Range queries a tick answers from the spatial hashes before building the matrix
+SIM_SPEEDS = (1, 2, 4, 8, 16, None) # Fast-forward steps; None runs as many ticks as fit in each frame
+SIM_MAX_DEBT_SECONDS = 0.5 # Real seconds of ticks the clock may owe before it stops banking more
+SIM_MAX_FRAME_SECONDS = 0.25 # Longest the sim may catch up before a frame must be drawn
+PROFILER_FRAMES = 600 # Frames of per-phase timings kept by the profiler (10 seconds at 60 FPS)
+SFX_CHANNELS = 16 # Mixer channels shared by all sound effects
+SFX_MAX_VOICES = 3 # Default copies of one sound that may play at once; see audio.VOICE_LIMITS
+PRELOAD_WORKERS = 4 # Threads decoding images and sounds in the background while the main menu is up
+POOL_MAX_PER_TYPE = 512 # Released enemies, towers and barricades kept per class for reuse
+PROFILER_OVERLAY_REFRESH = 30 # Frames between percentile refreshes on the profiler overlay
+
+# Wave spawning
+WAVE_SQUAD_SPACING = 15 # Ticks between members of one squad
+WAVE_SQUAD_INTERVAL = 75 # Ticks between the first members of consecutive squads
+WAVE_MAX_LIVE_ENEMIES = 400 # Spawning pauses while this many enemies are on the map
+
 # Currency settings
 VOLATILE_TO_META_CONVERSION_RATIO = 1.0
+DEFAULT_META_CURRENCY = 800 # Aetherium a new save starts with
 
 # Level data is now in levels.py
\ No newline at end of file
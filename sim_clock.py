@@ -0,0 +1,56 @@
+from settings import FPS, SIM_SPEEDS, SIM_MAX_DEBT_SECONDS
+
+class SimClock:
+    """Fixed-timestep accumulator that turns real elapsed time into simulation ticks.
+
+    Every tick is 1/FPS seconds of game time regardless of speed; higher speeds just bank time
+    faster. A speed of None is uncapped: the game loop runs as many ticks as fit in each frame.
+    """
+
+    def __init__(self, tick_rate=FPS, speeds=SIM_SPEEDS, max_debt_seconds=SIM_MAX_DEBT_SECONDS):
+        self.tick_seconds = 1.0 / tick_rate
+        self.speeds = speeds
+        self.speed = speeds[0]
+        self.max_debt_seconds = max_debt_seconds
+        self.accumulator = 0.0
+
+    @property
+    def uncapped(self):
+        return self.speed is None
+
+    @property
+    def label(self):
+        return "Max" if self.speed is None else f"{self.speed}x"
+
+    @property
+    def alpha(self):
+        """How far the next tick is due, from 0 to 1; drawing blends the last two ticks by this."""
+        if self.speed is None:
+            return 1.0
+        return min(self.accumulator / self.tick_seconds, 1.0)
+
+    def cycle_speed(self):
+        index = self.speeds.index(self.speed) if self.speed in self.speeds else -1
+        self.speed = self.speeds[(index + 1) % len(self.speeds)]
+        self.accumulator = 0.0
+
+    def set_speed(self, speed):
+        # Any multiplier, not just the ones cycle_speed steps through; 0 or None is uncapped
+        self.speed = speed or None
+        self.accumulator = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        # Game time owed for elapsed real seconds; capped so a long stall can't snowball
+        if self.speed is None:
+            return
+        self.accumulator = min(self.accumulator + elapsed * self.speed, self.max_debt_seconds * self.speed)
+
+    def due(self):
+        return self.speed is None or self.accumulator >= self.tick_seconds
+
+    def consume(self):
+        if self.speed is not None:
+            self.accumulator -= self.tick_seconds
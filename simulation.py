@@ -0,0 +1,446 @@
+import os
+import sys
+import time
+import random
+import argparse
+import pygame
+from settings import *
+import levels
+import audio
+from levels import Level, LEVEL_1_MAP
+from towers import TOWER_TYPES, get_tower_cost
+from targeting import TARGETING_POLICIES
+from effects import create_dissolve_effect, create_aoe_explosion, ParticleSystem
+from waves import WaveManager
+from structures import SpirePlot, Barricade, BarricadeGroup
+from spatial import SpatialHash, RangeMatrix, IndexedRanges
+from enemy_store import EnemyStore, EnemyGroup
+from profiler import FrameProfiler
+from timers import TimerWheel
+from pools import PoolSet
+
+class Simulation:
+    """The rules of a single run, stepped one tick at a time with no window, rendering or audio.
+
+    Game builds its UI on top of this class; batch tools drive it directly through run_headless.
+    """
+
+    def __init__(self, map_data=LEVEL_1_MAP, total_waves=10, use_enemy_store=USE_ENEMY_STORE, use_range_matrix=USE_RANGE_MATRIX):
+        self.level = Level(map_data)
+        self.total_waves = total_waves
+        # Every random choice that affects the run comes from here, reseeded per run, so a seed and
+        # the player's commands reproduce it exactly. Visual-only randomness has its own generators.
+        self.seed = None
+        self.rng = random.Random()
+        # Enemies, towers and barricades are recycled across waves and runs rather than rebuilt
+        self.pools = PoolSet()
+        self.wave_manager = WaveManager(self.level.path, self.total_waves, self.pools, self.rng)
+
+        self.meta_currency = 0
+        self.volatile_currency = 0
+
+        # In-run variables
+        self.tick = 0
+        # Status effects, ability pulses and barricade lifetimes expire through the wheel, not per-entity countdowns
+        self.timers = TimerWheel()
+        self.heartcrystal_health = 100
+        self.wave_number = 0
+        self.wave_timer = 5 * FPS
+        self.wave_spawns = iter(()) # SpawnEntry stream of the current wave
+        self.next_spawn = None
+        self.wave_start_tick = 0
+        # With NumPy available, enemy movement runs as one vectorized step over an EnemyStore
+        self.enemy_store = EnemyStore(self.level.path) if use_enemy_store and EnemyStore.available else None
+        self.enemies = EnemyGroup(self.enemy_store)
+        self.towers = pygame.sprite.Group()
+        self.projectiles = pygame.sprite.Group()
+        self.particles = ParticleSystem()
+        self.barricades = BarricadeGroup(self.level.path)
+        self.spire_plots = pygame.sprite.Group()
+        # Proximity indexes shared by targeting, healer pulses, warper pulses and the AOE ability
+        self.enemy_index = SpatialHash(margin=SPATIAL_HASH_MARGIN)
+        self.tower_index = SpatialHash()
+        # Tower-to-enemy distances for targeting and the Chrono Warper pulse, rebuilt once enemies have moved
+        self.ranges = RangeMatrix(self.enemy_index, self.tower_index) if use_range_matrix and RangeMatrix.available else IndexedRanges(self.enemy_index, self.tower_index)
+        # Off unless a front end or tool turns it on; update() reports its phases to it
+        self.profiler = FrameProfiler()
+        self.overcharge_timer = 0
+        self.game_state = "playing"
+        self.wave_took_damage = False
+
+        # Sound paths for audio.sfx; they stay None unless a front end sets them
+        self.ui_click_sound = None
+        self.enemy_hit_sound = None
+        self.enemy_death_sound = None
+
+        # UI Feedback timers
+        self.perm_currency_fx_timer = 0
+        self.temp_currency_fx_timer = 0
+        self.perm_fx_color = WHITE
+        self.temp_fx_color = WHITE
+        # The spire plots are laid out by reset_run, so building a Simulation loads no art
+
+    @property
+    def sim_time(self):
+        # Milliseconds of game time; tower fire rates are measured against this, not the wall clock
+        return self.tick * 1000 // FPS
+
+    def update(self):
+        if self.game_state != "playing":
+            return
+
+        self.tick += 1
+        self.timers.advance()
+        audio.sfx.new_tick()
+        if self.overcharge_timer > 0:
+            self.overcharge_timer -= 1
+        damage_multiplier = OVERCHARGE_MULTIPLIER if self.overcharge_timer > 0 else 1.0
+        profiler = self.profiler
+
+        # Healers query the previous tick's index; the margin covers how far enemies moved since
+        if self.enemy_store is not None:
+            self.enemy_store.step(self.barricades)
+            for enemy in self.enemy_store.ability_members:
+                enemy.update_abilities(self.enemy_index)
+        else:
+            self.enemies.update(self.particles, self.barricades, self.enemy_index)
+        self.enemy_index.rebuild(self.enemies)
+        self.ranges.rebuild(self.towers, self.enemies)
+        profiler.lap("enemies")
+        self.towers.update(self.ranges, self.projectiles, self.particles, self.sim_time, damage_multiplier)
+        profiler.lap("towers")
+        self.particles.update()
+        profiler.lap("particles")
+
+        self.handle_wave_spawning()
+        profiler.lap("waves")
+        self.check_collisions()
+        self.handle_enemy_deaths()
+        profiler.lap("deaths")
+        # Expiries land after deaths, so an enemy that died or leaked this tick no longer pulses
+        self.timers.run_due()
+        self.check_win_loss()
+        profiler.lap("abilities")
+
+    def enemies_by_progress(self):
+        # Furthest along the path first; the basis for first/last targeting and leak prediction
+        if self.enemy_store is not None:
+            return self.enemy_store.by_progress()
+        return sorted(self.enemies, key=lambda enemy: enemy.distance_traveled, reverse=True)
+
+    def interpolated_enemies(self, alpha):
+        """Returns (enemy, (x, y)) pairs with each position alpha of the way from the previous tick to this one."""
+        if self.enemy_store is not None:
+            return self.enemy_store.interpolated(alpha)
+        return [(enemy, (enemy.prev_x + (enemy.x - enemy.prev_x) * alpha, enemy.prev_y + (enemy.y - enemy.prev_y) * alpha))
+                for enemy in self.enemies]
+
+    def handle_enemy_deaths(self):
+        if self.enemy_store is not None:
+            dead = self.enemy_store.dead()
+        else:
+            dead = [enemy for enemy in self.enemies if enemy.health <= 0]
+        for enemy in dead:
+            self.volatile_currency += 50
+            self.temp_fx_color = GREEN
+            self.temp_currency_fx_timer = 15
+            create_dissolve_effect(enemy.rect.centerx, enemy.rect.centery, self.particles)
+            audio.sfx.play(self.enemy_death_sound)
+            enemy.kill()
+
+    def handle_wave_spawning(self):
+        if self.wave_spawning:
+            self.spawn_due_enemies()
+        elif not self.enemies and self.wave_timer <= 0:
+            if self.wave_number > 0:
+                converted_amount = int(self.volatile_currency * VOLATILE_TO_META_CONVERSION_RATIO)
+                self.meta_currency += converted_amount
+                self.volatile_currency = 0
+                self.perm_fx_color = GREEN
+                self.perm_currency_fx_timer = 15
+
+            # Nothing from the last wave is still referenced, so its enemies can go back in the pools
+            self.pools.flush()
+            self.wave_number += 1
+            self.wave_timer = 10 * FPS
+            self.wave_took_damage = False
+            self.wave_spawns = self.wave_manager.wave_stream(self.wave_number)
+            self.next_spawn = next(self.wave_spawns, None)
+            self.wave_start_tick = self.tick
+            self.spawn_due_enemies()
+        elif not self.enemies:
+            self.wave_timer -= 1
+
+    def spawn_due_enemies(self):
+        # Enemies are only built when their offset comes up, so no tick pays for a whole wave
+        while self.next_spawn is not None and self.wave_start_tick + self.next_spawn.offset <= self.tick:
+            if len(self.enemies) >= WAVE_MAX_LIVE_ENEMIES:
+                self.wave_start_tick += 1 # Hold the rest of the wave back a tick
+                return
+            self.spawn_enemy(self.wave_manager.spawn(self.next_spawn))
+            self.next_spawn = next(self.wave_spawns, None)
+
+    @property
+    def wave_spawning(self):
+        return self.next_spawn is not None
+
+    def spawn_enemy(self, enemy):
+        self.enemies.add(enemy)
+        enemy.on_spawn(self.timers, self.enemy_index, self.ranges)
+
+    def add_tower(self, tower):
+        tower.timers = self.timers
+        self.towers.add(tower)
+
+    def check_collisions(self):
+        if self.enemy_store is not None:
+            reached_end = self.enemy_store.reached_end()
+        else:
+            reached_end = [enemy for enemy in self.enemies if enemy.path_index >= len(enemy.path) - 1]
+        for enemy in reached_end:
+            self.heartcrystal_health -= 10
+            self.wave_took_damage = True
+            enemy.kill()
+
+    def check_win_loss(self):
+        if self.heartcrystal_health <= 0:
+            self.save_progress()
+            self.game_state = "game_over"
+
+        if self.wave_number >= self.total_waves and not self.enemies and not self.wave_spawning:
+            self.save_progress()
+            self.game_state = "win"
+
+    def save_progress(self):
+        # Headless runs never touch the save file; Game overrides this
+        pass
+
+    def reset_run(self, level_data, seed=None):
+        # Replaying the same map keeps its Level, and with it the path tables and the cached static layer
+        if self.level.map_data is not level_data["map_data"]:
+            self.level = Level(level_data["map_data"])
+            self.wave_manager = WaveManager(self.level.path, self.total_waves, self.pools, self.rng)
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng.seed(self.seed)
+        self.particles.seed(self.seed)
+        self.tick = 0
+        self.timers = TimerWheel()
+        self.heartcrystal_health = 100
+        self.volatile_currency = level_data["starting_volatile_currency"]
+        self.wave_number = 0
+        self.wave_timer = 5 * FPS
+        self.wave_spawns = iter(())
+        self.next_spawn = None
+        self.wave_start_tick = 0
+        for group in (self.enemies, self.towers, self.barricades):
+            for sprite in group:
+                self.pools.retire(sprite)
+        self.enemies.empty()
+        self.towers.empty()
+        self.projectiles.empty()
+        self.particles.empty()
+        self.barricades.set_path(self.level.path)
+        self.pools.flush()
+        if self.enemy_store is not None:
+            self.enemy_store.set_path(self.level.path)
+        self.enemy_index.rebuild(self.enemies)
+        self.ranges.rebuild(self.towers, self.enemies)
+        self.setup_level()
+        self.overcharge_timer = 0
+        self.game_state = "playing"
+
+    def setup_level(self):
+        self.spire_plots.empty()
+        for spot in self.level.initial_tower_spots:
+            self.spire_plots.add(SpirePlot(spot))
+
+    # --- PLAYER ACTIONS ---
+    # Shared by the mouse handlers in Game and by scripted placement plans. Game routes every
+    # input through apply() so it can be recorded; tools may call the methods directly.
+
+    def apply(self, command):
+        """Carries out one player command, a tuple of a name and plain values; returns whether it took effect.
+
+        ("build", type, x, y) builds on the plot at (x, y); ("plot", x, y) buys a plot;
+        ("barricade", x, y); ("upgrade", x, y) and ("sell", x, y) act on the tower on (x, y);
+        ("target", x, y, policy) sets that tower's targeting policy;
+        ("overcharge",); ("burst", x, y) fires the Aetheric Burst; ("speed",) is only meaningful
+        to a front end and does nothing here.
+        """
+        name, *args = command
+        if name == "build":
+            plot = self.plot_at(args[1:])
+            return plot is not None and self.build_tower(args[0], plot)
+        if name == "plot":
+            return self.buy_plot(tuple(args))
+        if name == "barricade":
+            return self.place_barricade(tuple(args))
+        if name in ("upgrade", "sell"):
+            tower = self.tower_at(args)
+            if tower is None:
+                return False
+            return self.upgrade_tower(tower) if name == "upgrade" else self.sell_tower(tower)
+        if name == "target":
+            tower = self.tower_at(args[:2])
+            return tower is not None and self.set_targeting(tower, args[2])
+        if name == "overcharge":
+            return self.activate_overcharge()
+        if name == "burst":
+            return self.aetheric_burst(*args)
+        if name == "speed":
+            return False
+        raise ValueError(f"unknown command {name!r}")
+
+    def plot_at(self, spot):
+        spot = tuple(spot)
+        return next((plot for plot in self.spire_plots if plot.pos == spot), None)
+
+    def tower_at(self, spot):
+        spot = tuple(spot)
+        return next((tower for tower in self.towers if tuple(tower.pos) == spot), None)
+
+    def buy_plot(self, spot):
+        if any(p.rect.center == spot for p in self.spire_plots) or self.meta_currency < SPIRE_PLOT_COST:
+            return False
+        self.spire_plots.add(SpirePlot(spot)); self.meta_currency -= SPIRE_PLOT_COST
+        return True
+
+    def build_tower(self, tower_type, plot):
+        cost = get_tower_cost(tower_type)
+        if plot.is_occupied or self.meta_currency < cost:
+            return False
+        self.add_tower(self.pools.acquire(TOWER_TYPES[tower_type], plot.pos)); plot.is_occupied = True; self.meta_currency -= cost
+        return True
+
+    def place_barricade(self, spot):
+        if any(b.rect.center == spot for b in self.barricades) or self.volatile_currency < BARRICADE_COST:
+            return False
+        barricade = self.pools.acquire(Barricade, spot)
+        barricade.expiry = self.timers.schedule(BARRICADE_DURATION, barricade.kill)
+        self.barricades.add(barricade); self.volatile_currency -= BARRICADE_COST
+        return True
+
+    def upgrade_tower(self, tower):
+        if self.meta_currency < tower.upgrade_cost:
+            return False
+        self.meta_currency -= tower.upgrade_cost
+        tower.upgrade()
+        return True
+
+    def sell_tower(self, tower):
+        self.meta_currency += int(tower.cost * 0.65)
+        # Free the plot the tower was on
+        plot = self.plot_at(tower.pos)
+        if plot is not None:
+            plot.is_occupied = False
+        tower.kill()
+        return True
+
+    def set_targeting(self, tower, policy):
+        if not tower.has_targeting or policy not in TARGETING_POLICIES or policy == tower.targeting:
+            return False
+        tower.targeting = policy
+        if hasattr(tower, "locked_target"):
+            tower.locked_target = None # A Sunfire Spire picks its next lock by the new policy
+        return True
+
+    def activate_overcharge(self):
+        if self.volatile_currency < OVERCHARGE_COST:
+            return False
+        self.volatile_currency -= OVERCHARGE_COST
+        self.overcharge_timer = OVERCHARGE_DURATION
+        return True
+
+    def aetheric_burst(self, x, y):
+        if self.volatile_currency < AOE_ATTACK_COST:
+            return False
+        self.volatile_currency -= AOE_ATTACK_COST
+        create_aoe_explosion(x, y, self.particles)
+        for enemy in self.enemy_index.query_radius(x, y, AOE_ATTACK_RADIUS):
+            if enemy.alive():
+                enemy.take_damage(AOE_ATTACK_DAMAGE, None, self.enemy_hit_sound)
+        return True
+
+    def place_tower(self, tower_type, spot):
+        # Buys the plot first when the spot is one of the level's purchasable spots
+        spot = tuple(spot)
+        if spot in self.level.purchasable_tower_spots:
+            self.buy_plot(spot)
+        for plot in self.spire_plots:
+            if plot.rect.center == spot:
+                return self.build_tower(tower_type, plot)
+        return False
+
+
+# --- HEADLESS RUNS ---
+
+def init_headless():
+    # The dummy drivers let pygame load images without a real display or sound card
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.display.init()
+
+def run_headless(level_index, placements, waves=10, meta_currency=800, max_ticks=None, seed=None):
+    """Plays one run to completion without rendering and returns a summary dict.
+
+    placements is a list of (tower_type, spot) or (tower_type, spot, wave) entries; entries
+    without a wave are built before the first wave spawns. The same seed and placements always
+    play out the same way.
+    """
+    init_headless()
+    level_data = levels.ALL_LEVELS[level_index]
+    sim = Simulation(level_data["map_data"], total_waves=waves)
+    sim.reset_run(level_data, seed=seed)
+    sim.meta_currency = meta_currency
+
+    pending = sorted((entry[2] if len(entry) > 2 else 0, i, entry[0], entry[1]) for i, entry in enumerate(placements))
+    placed = []
+    curve = [] # (Aetherium, volatile currency, Heartcrystal health) as each wave starts
+    start = time.perf_counter()
+    while sim.game_state == "playing" and (max_ticks is None or sim.tick < max_ticks):
+        while pending and pending[0][0] <= sim.wave_number:
+            _, _, tower_type, spot = pending.pop(0)
+            if sim.place_tower(tower_type, spot):
+                placed.append((tower_type, tuple(spot)))
+        sim.update()
+        if sim.wave_number > len(curve):
+            curve.append((sim.meta_currency, sim.volatile_currency, sim.heartcrystal_health))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "level": level_data["name"],
+        "seed": sim.seed,
+        "outcome": sim.game_state,
+        "waves_reached": sim.wave_number,
+        "heartcrystal_health": sim.heartcrystal_health,
+        "meta_currency": sim.meta_currency,
+        "towers_built": placed,
+        "wave_curve": curve,
+        "ticks": sim.tick,
+        "seconds": elapsed,
+        "ticks_per_second": sim.tick / elapsed if elapsed > 0 else 0.0,
+    }
+
+def parse_placement(text):
+    # "sunfire:200,350" or "storm:500,350@3" (build when wave 3 starts)
+    tower_type, _, rest = text.partition(":")
+    spot, _, wave = rest.partition("@")
+    x, y = (int(v) for v in spot.split(","))
+    if tower_type not in TOWER_TYPES:
+        raise argparse.ArgumentTypeError(f"unknown tower type '{tower_type}'")
+    return (tower_type, (x, y), int(wave)) if wave else (tower_type, (x, y))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Aetheria levels headless at full speed.")
+    parser.add_argument("--level", type=int, default=1, help="1-based index into levels.ALL_LEVELS")
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--currency", type=int, default=800, help="starting Aetherium")
+    parser.add_argument("--place", type=parse_placement, action="append", default=[], metavar="TYPE:X,Y[@WAVE]")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for the run (random if omitted)")
+    args = parser.parse_args()
+
+    result = run_headless(args.level - 1, args.place, args.waves, args.currency, args.max_ticks, args.seed)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    sys.exit(0)
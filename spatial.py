@@ -0,0 +1,262 @@
+from settings import SPATIAL_HASH_CELL_SIZE, RANGE_MATRIX_MIN_QUERIES
+
+try:
+    import numpy as np
+except ImportError: # Without NumPy, towers query the spatial hashes through IndexedRanges
+    np = None
+
+class SpatialHash:
+    """Uniform grid of sprites bucketed by rect center, rebuilt once per tick.
+
+    Queries always measure against each sprite's live rect, so results stay exact for sprites
+    that moved up to `margin` pixels since the last rebuild. Sprites added after the rebuild
+    are not seen until the next one.
+    """
+
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE, margin=0):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cells = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def rebuild(self, sprites):
+        cells = {}
+        cell_size = self.cell_size
+        count = 0
+        for sprite in sprites:
+            x, y = sprite.rect.center
+            key = (x // cell_size, y // cell_size)
+            # The running count keeps nearest() tie-breaks in group order, like a plain scan
+            entry = (count, sprite)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [entry]
+            else:
+                bucket.append(entry)
+            count += 1
+        self.cells = cells
+        self.count = count
+
+    def _candidates(self, x, y, radius):
+        cell_size = self.cell_size
+        reach = radius + self.margin
+        min_cx, max_cx = int((x - reach) // cell_size), int((x + reach) // cell_size)
+        min_cy, max_cy = int((y - reach) // cell_size), int((y + reach) // cell_size)
+        cells = self.cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def query_radius(self, x, y, radius, inclusive=False, ordered=False):
+        """Returns the sprites whose center is within radius of (x, y); in group order if ordered, else in no particular order."""
+        limit = radius * radius
+        found = []
+        for order, sprite in self._candidates(x, y, radius):
+            cx, cy = sprite.rect.center
+            dist_sq = (cx - x) ** 2 + (cy - y) ** 2
+            if dist_sq < limit or (inclusive and dist_sq == limit):
+                found.append((order, sprite) if ordered else sprite)
+        if ordered:
+            found.sort(key=lambda entry: entry[0])
+            return [sprite for _, sprite in found]
+        return found
+
+    def nearest(self, x, y, radius):
+        """Returns the closest sprite strictly inside radius of (x, y), or None."""
+        best = None
+        best_dist_sq = radius * radius
+        best_order = 0
+        for order, sprite in self._candidates(x, y, radius):
+            cx, cy = sprite.rect.center
+            dist_sq = (cx - x) ** 2 + (cy - y) ** 2
+            if dist_sq < best_dist_sq or (best is not None and dist_sq == best_dist_sq and order < best_order):
+                best = sprite
+                best_dist_sq = dist_sq
+                best_order = order
+        return best
+
+
+
+class IndexedRanges:
+    """Tower-to-enemy range queries answered from the enemy and tower spatial hashes.
+
+    The simulation rebuilds it once enemies have moved each tick; towers target through it and
+    Chrono Warpers find the towers they slow. Without NumPy it is used as is.
+    """
+
+    def __init__(self, enemy_index, tower_index):
+        self.enemy_index = enemy_index
+        self.tower_index = tower_index
+        self._last_query = (None, None) # (tower, enemies in its range), so a count then a volley scan once
+
+    def rebuild(self, towers, enemies):
+        # The simulation keeps enemy_index current itself, since healers query it between rebuilds
+        self.tower_index.rebuild(towers)
+        self._last_query = (None, None)
+
+    def nearest(self, tower):
+        """Returns the closest enemy strictly inside tower's range, or None."""
+        return self.enemy_index.nearest(tower.rect.centerx, tower.rect.centery, tower.range)
+
+    def enemies_in_range(self, tower):
+        """Returns the enemies strictly inside tower's range, in group order."""
+        last_tower, found = self._last_query
+        if last_tower is not tower:
+            found = self.enemy_index.query_radius(tower.rect.centerx, tower.rect.centery, tower.range, ordered=True)
+            self._last_query = (tower, found)
+        return found
+
+    def count_in_range(self, tower):
+        return len(self.enemies_in_range(tower))
+
+    def best_in_range(self, tower, field, sign=1):
+        """Returns the live enemy in tower's range with the highest sign * its field, or None.
+
+        Ties go to the enemy furthest along the path, then to the one first in group order.
+        """
+        best = None
+        best_key = None
+        for enemy in self.enemies_in_range(tower):
+            if enemy.health <= 0:
+                continue
+            key = (sign * getattr(enemy, field), enemy.distance_traveled)
+            if best is None or key > best_key:
+                best = enemy
+                best_key = key
+        return best
+
+    def distance_sq(self, tower, enemy):
+        return (tower.rect.centerx - enemy.rect.centerx) ** 2 + (tower.rect.centery - enemy.rect.centery) ** 2
+
+    def towers_near(self, enemy, radius):
+        """Returns the towers whose center is strictly within radius of enemy's."""
+        return self.tower_index.query_radius(enemy.rect.centerx, enemy.rect.centery, radius)
+
+
+def _centers(sprites):
+    # (n, 2) array of rect centers, in the order given
+    return np.fromiter((value for sprite in sprites for value in sprite.rect.center), np.int64, 2 * len(sprites)).reshape(-1, 2)
+
+class RangeMatrix(IndexedRanges):
+    """IndexedRanges that switches to one NumPy tower-by-enemy squared-distance matrix on busy ticks.
+
+    Rows are towers and columns enemies, both in group order, measured between rect centers the
+    same way SpatialHash measures. From it every tower's in-range mask, enemy count and nearest
+    enemy are read off without further distance math, and enemy pulses read a column. The matrix
+    has a fixed cost, so the first min_queries queries of a tick still go to the spatial hashes
+    and only a tick that asks for more builds it; the answers are the same either way.
+    """
+
+    available = np is not None
+
+    def __init__(self, enemy_index, tower_index, min_queries=RANGE_MATRIX_MIN_QUERIES):
+        super().__init__(enemy_index, tower_index)
+        self.min_queries = min_queries
+        self.rebuild((), ())
+
+    def rebuild(self, towers, enemies):
+        super().rebuild(towers, enemies)
+        self.towers = list(towers)
+        self.enemies = list(enemies)
+        self.queries = 0
+        self.distances = None
+        self._columns = None
+        self._slots = None
+        # An EnemyStore already holds the positions as arrays, usable while no enemy has joined or left it
+        self._store = getattr(enemies, "store", None)
+        self._store_state = (self._store.count, self._store.added) if self._store is not None else None
+
+    def _dense(self):
+        # True once this tick's matrix exists, building it when the spatial queries run out
+        if self.distances is None:
+            self.queries += 1
+            if self.queries <= self.min_queries:
+                return False
+            self._build()
+        return True
+
+    def _build(self):
+        self.rows = {tower: row for row, tower in enumerate(self.towers)}
+        store = self._store
+        if store is not None and (store.count, store.added) == self._store_state and store.count == len(self.enemies):
+            self._slots = store.arrival_order() # Store slot of each column
+            enemy_centers = store.centers(self._slots)
+        else:
+            enemy_centers = _centers(self.enemies)
+        tower_centers = _centers(self.towers)
+        self.tower_x = tower_centers[:, 0]
+        self.tower_y = tower_centers[:, 1]
+        dx = self.tower_x[:, None] - enemy_centers[:, 0]
+        dy = self.tower_y[:, None] - enemy_centers[:, 1]
+        self.distances = dx * dx + dy * dy
+        ranges = np.fromiter((tower.range for tower in self.towers), np.float64, len(self.towers))
+        self.masks = self.distances < (ranges * ranges)[:, None]
+        self.counts = self.masks.sum(axis=1)
+        if self.enemies:
+            # Pairs out of range sort last; argmin takes the first of equal distances, so ties go to group order
+            self.nearest_columns = np.where(self.masks, self.distances, np.iinfo(np.int64).max).argmin(axis=1)
+        else:
+            self.nearest_columns = np.zeros(len(self.towers), np.int64)
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = {enemy: column for column, enemy in enumerate(self.enemies)}
+        return self._columns
+
+    def nearest(self, tower):
+        if not self._dense():
+            return super().nearest(tower)
+        row = self.rows[tower]
+        return self.enemies[self.nearest_columns[row]] if self.counts[row] else None
+
+    def enemies_in_range(self, tower):
+        if not self._dense():
+            return super().enemies_in_range(tower)
+        return [self.enemies[column] for column in np.flatnonzero(self.masks[self.rows[tower]]).tolist()]
+
+    def count_in_range(self, tower):
+        if not self._dense():
+            return super().count_in_range(tower)
+        return int(self.counts[self.rows[tower]])
+
+    def best_in_range(self, tower, field, sign=1):
+        # Scored straight from the store's columns, which damage earlier in the tick has already updated
+        store = self._store
+        if not self._dense() or self._slots is None or (store.count, store.added) != self._store_state:
+            return super().best_in_range(tower, field, sign)
+        columns = np.flatnonzero(self.masks[self.rows[tower]])
+        slots = self._slots[columns]
+        live = store.columns["health"][slots] > 0
+        columns, slots = columns[live], slots[live]
+        if not columns.size:
+            return None
+        scores = store.columns[field][slots] * sign
+        progress = store.columns["distance_traveled"][slots]
+        best = scores == scores.max()
+        best &= progress == progress[best].max()
+        # argmax takes the first True, so remaining ties go to group order
+        return self.enemies[columns[best.argmax()]]
+
+    def distance_sq(self, tower, enemy):
+        # A single pair is cheaper to work out than to build the matrix for
+        column = self.columns.get(enemy) if self.distances is not None else None
+        if column is None:
+            return super().distance_sq(tower, enemy)
+        return int(self.distances[self.rows[tower], column])
+
+    def towers_near(self, enemy, radius):
+        if not self._dense():
+            return super().towers_near(enemy, radius)
+        column = self.columns.get(enemy)
+        if column is not None:
+            distances = self.distances[:, column]
+        else: # Joined after the rebuild
+            cx, cy = enemy.rect.center
+            distances = (self.tower_x - cx) ** 2 + (self.tower_y - cy) ** 2
+        return [self.towers[row] for row in np.flatnonzero(distances < radius * radius).tolist()]
@@ -1,35 +1,103 @@
+import bisect
 import pygame
 from settings import *
 import assets
 
 class Barricade(pygame.sprite.Sprite):
+    pool = None # PoolSet the barricade came from, if any
+    retired = False
+
     def __init__(self, pos):
         super().__init__()
-        self.pos = pos
-        self.health = BARRICADE_HEALTH
-        self.max_health = BARRICADE_HEALTH
-        self.lifetime = BARRICADE_DURATION
         self.image = pygame.Surface(BARRICADE_SIZE, pygame.SRCALPHA)
         # Main block
         pygame.draw.rect(self.image, BROWN, (2, 2, BARRICADE_SIZE[0] - 4, BARRICADE_SIZE[1] - 4))
         # High-contrast border
         pygame.draw.rect(self.image, (255, 255, 0, 200), (0, 0, BARRICADE_SIZE[0], BARRICADE_SIZE[1]), 2)
-        self.rect = self.image.get_rect(center=pos)
+        self.rect = self.image.get_rect()
+        self.reset(pos)
+
+    def reset(self, pos):
+        self.pos = pos
+        self.health = BARRICADE_HEALTH
+        self.max_health = BARRICADE_HEALTH
+        self.expiry = None # Timer that removes the barricade after BARRICADE_DURATION ticks
+        self.path_span = None # (near, far) path distances it blocks; set by BarricadeGroup
+        self.rect.center = pos
+
+    def release(self):
+        if self.expiry:
+            self.expiry.cancel()
+            self.expiry = None
+
+    def kill(self):
+        super().kill()
+        if self.pool is not None:
+            self.pool.retire(self)
 
     def take_damage(self, amount):
         self.health -= amount
         if self.health <= 0:
+            if self.expiry:
+                self.expiry.cancel()
             self.kill()
 
-    def update(self):
-        self.lifetime -= 1
-        if self.lifetime <= 0:
-            self.kill()
+class BarricadeGroup(pygame.sprite.Group):
+    """Sprite group that also indexes its barricades by where they sit along the level path.
+
+    Each barricade is projected onto the path once, when added, and kept in a list sorted by
+    the far edge of the stretch it blocks. Enemies only ever move forward, so the one blocker
+    that can stop an enemy is the first whose far edge is still ahead of the enemy's front.
+    Barricades further than PATH_WIDTH / 2 from the path are drawn but never block.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.blockers = [] # Barricades on the path, ordered by far edge
+        self.far_edges = []
+        self.version = 0 # Bumped on every change so vectorized callers can cache arrays
+
+    def set_path(self, path):
+        self.empty()
+        self.path = path
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        distance, off_path, segment = self.path.project(sprite.rect.center)
+        if off_path > PATH_WIDTH / 2:
+            return
+        # Half the barricade's extent along the path direction at that point
+        dx, dy = self.path.directions[segment]
+        reach = (abs(dx) * sprite.rect.width + abs(dy) * sprite.rect.height) / 2
+        sprite.path_span = (distance - reach, distance + reach)
+        index = bisect.bisect(self.far_edges, sprite.path_span[1])
+        self.far_edges.insert(index, sprite.path_span[1])
+        self.blockers.insert(index, sprite)
+        self.version += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite.path_span is not None:
+            index = self.blockers.index(sprite)
+            del self.blockers[index]
+            del self.far_edges[index]
+            sprite.path_span = None
+            self.version += 1
+
+    def blocker_at(self, front):
+        """Returns the barricade blocking an enemy whose leading edge is front along the path, or None."""
+        index = bisect.bisect(self.far_edges, front)
+        if index < len(self.blockers):
+            barricade = self.blockers[index]
+            if front >= barricade.path_span[0]:
+                return barricade
+        return None
 
 class SpirePlot(pygame.sprite.Sprite):
     def __init__(self, pos):
         super().__init__()
         self.pos = pos
-        self.image = pygame.transform.scale(pygame.image.load(assets.TOWER_PLOT).convert_alpha(), PLOT_SIZE)
+        self.image = assets.load_image(assets.TOWER_PLOT, PLOT_SIZE)
         self.rect = self.image.get_rect(center=pos)
         self.is_occupied = False
\ No newline at end of file
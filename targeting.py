@@ -0,0 +1,34 @@
+# --- TARGETING POLICIES ---
+# Which enemy in range a single-target spire shoots. Every policy skips enemies already finished
+# off this tick by another spire. "nearest" is answered by the range index directly; the others
+# score each enemy in range on one field and take the highest, ties going to the enemy furthest
+# along the path and then to the one that joined the group first. On busy ticks the range matrix
+# scores a tower's whole row at once from the EnemyStore columns.
+
+TARGETING_POLICIES = ("nearest", "first", "last", "strongest", "weakest", "shielded", "fastest")
+DEFAULT_TARGETING = "nearest"
+
+# Policy -> (enemy field, sign); the range index returns the live enemy in range scoring highest
+_SCORES = {
+    "first": ("distance_traveled", 1),
+    "last": ("distance_traveled", -1),
+    "strongest": ("health", 1),
+    "weakest": ("health", -1),
+    "shielded": ("shield", 1), # Shielding Sentinels with their shield up come first
+    "fastest": ("speed", 1),
+}
+
+def next_policy(policy):
+    return TARGETING_POLICIES[(TARGETING_POLICIES.index(policy) + 1) % len(TARGETING_POLICIES)]
+
+def select_target(ranges, tower, policy):
+    """Returns the enemy tower should shoot under policy, or None if none is in range."""
+    if policy == "nearest":
+        target = ranges.nearest(tower)
+        if target is None or target.health > 0:
+            return target
+        # The closest of the rest; min keeps the first of equal distances, so ties stay in group order
+        return min((enemy for enemy in ranges.enemies_in_range(tower) if enemy.health > 0),
+                   key=lambda enemy: ranges.distance_sq(tower, enemy), default=None)
+    # Only the enemies in range are scored, so nothing is sorted per shot
+    return ranges.best_in_range(tower, *_SCORES[policy])
@@ -0,0 +1,108 @@
+WHEEL_BITS = 6 # 64 slots per level
+WHEEL_LEVELS = 4 # 64**4 ticks (about 77 hours at 60 FPS) before timers wait in the overflow list
+
+class Timer:
+    """Handle for one scheduled callback; cancel() stops it from firing."""
+
+    __slots__ = ("deadline", "callback", "args", "cancelled", "wheel")
+
+    def __init__(self, wheel, deadline, callback, args):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.wheel.pending -= 1
+
+    @property
+    def remaining(self):
+        return max(0, self.deadline - self.wheel.now)
+
+
+class TimerWheel:
+    """Hierarchical timing wheel of expiry callbacks keyed on simulation ticks.
+
+    Level 0 has one slot per tick for the next 64 ticks; each level above covers 64 times the
+    span of the one below and is cascaded down as time reaches it. Per-tick cost depends on the
+    timers that come due, not on how many are pending. Time only moves when the simulation
+    calls advance(), so pausing the game pauses every timer.
+    """
+
+    def __init__(self, now=0, bits=WHEEL_BITS, levels=WHEEL_LEVELS):
+        self.now = now
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self.overflow = []
+        self.pending = 0
+
+    def __len__(self):
+        return self.pending
+
+    def schedule(self, delay, callback, *args):
+        """Calls callback(*args) when the wheel reaches now + delay ticks; returns a Timer handle.
+
+        Delays are at least one tick, since the current tick's timers may already have run.
+        """
+        timer = Timer(self, self.now + max(1, int(delay)), callback, args)
+        self._insert(timer)
+        self.pending += 1
+        return timer
+
+    def _insert(self, timer):
+        delta = timer.deadline - self.now
+        bits = self.bits
+        for level, slots in enumerate(self.levels):
+            if delta < 1 << (bits * (level + 1)):
+                slots[(timer.deadline >> (bits * level)) & self.mask].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def advance(self):
+        """Moves to the next tick and cascades the timers that now fall within level 0.
+
+        Timers due on the new tick fire on the next run_due() call, so the simulation can pick
+        where in its tick expiries happen.
+        """
+        self.now += 1
+        now = self.now
+        bits = self.bits
+        # Find how many levels wrapped, then cascade from the highest one down
+        wrapped = 0
+        while wrapped < len(self.levels) - 1 and now & ((1 << (bits * (wrapped + 1))) - 1) == 0:
+            wrapped += 1
+        if wrapped == len(self.levels) - 1 and now & ((1 << (bits * len(self.levels))) - 1) == 0:
+            overflow, self.overflow = self.overflow, []
+            for timer in overflow:
+                if not timer.cancelled:
+                    self._insert(timer)
+        for level in range(wrapped, 0, -1):
+            slots = self.levels[level]
+            index = (now >> (bits * level)) & self.mask
+            bucket, slots[index] = slots[index], []
+            for timer in bucket:
+                if not timer.cancelled:
+                    self._insert(timer)
+
+    def run_due(self):
+        """Fires every timer due on the current tick, in the order they were scheduled or cascaded."""
+        slots = self.levels[0]
+        index = self.now & self.mask
+        # Anything the callbacks schedule is at least a tick away, so it never lands in this slot
+        bucket, slots[index] = slots[index], []
+        for timer in bucket:
+            if not timer.cancelled:
+                timer.cancelled = True # Spent, so a late cancel() is a no-op
+                self.pending -= 1
+                timer.callback(*timer.args)
+
+    def clear(self):
+        for slots in self.levels:
+            for bucket in slots:
+                bucket.clear()
+        self.overflow.clear()
+        self.pending = 0
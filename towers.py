@@ -2,85 +2,113 @@ import pygame
 from settings import *
 import math
 import assets
-from effects import create_explosion, create_frost_effect, create_storm_effect
+import audio
+from renderer import LAYER_WORLD, LAYER_EFFECTS
+from targeting import DEFAULT_TARGETING, select_target
+from effects import create_explosion, create_frost_effect, create_storm_effect, visual_rng
+
+
+def get_tower_cost(tower_type):
+    return {"sunfire": SUNFIRE_SPIRE_COST, "frost": FROST_SPIRE_COST, "storm": STORM_SPIRE_COST}[tower_type]
 
 
 class Tower(pygame.sprite.Sprite):
+    pool = None # PoolSet the tower came from, if any
+    retired = False
+    has_targeting = True # Whether the player can pick a targeting policy for it
+
     def __init__(self, pos, cost, range, damage, fire_rate):
+        # Subclasses set original_image and fire_sound before calling this
         super().__init__()
+        self.base_stats = (cost, range, damage, fire_rate)
+        self.reset(pos)
+
+    def reset(self, pos):
+        """Puts the tower on pos at level 1, as if newly built."""
         self.pos = pos
-        self.cost = cost
-        self.range = range
-        self.damage = damage
-        self.fire_rate = fire_rate
+        self.cost, self.range, self.damage, self.fire_rate = self.base_stats
         self.level = 1
-        self.upgrade_cost = int(cost * 1.5)
+        self.upgrade_cost = int(self.cost * 1.5)
         self.last_shot_time = 0
-        self.image = None # Will be set by subclasses
-        self.rect = pygame.Rect(pos[0] - TOWER_SIZE[0] // 2, pos[1] - TOWER_SIZE[1] // 2, TOWER_SIZE[0], TOWER_SIZE[1])
-        self.projectiles = pygame.sprite.Group()
+        self.image = self.original_image # Switches to status variants of original_image
+        # ADJUST TOWER PLACEMENT: TOWER_Y_OFFSET shifts the tower image up (negative) or down (positive)
+        self.rect = self.image.get_rect(center=(pos[0], pos[1] + TOWER_Y_OFFSET))
+        self.target = None
+        self.targeting = DEFAULT_TARGETING # One of targeting.TARGETING_POLICIES
         self.vfx_timer = 0
         self.vfx_duration = 0
-        self.slow_effect_timer = 0
-        self.disable_timer = 0
+        # Set when the tower joins a Simulation; status effects expire through its timer wheel
+        self.timers = None
+        self.slow_effect_timer = None
+        self.disable_timer = None
 
-    def update(self, enemies, projectiles, particles, screen, damage_multiplier=1.0):
+    def release(self):
+        for timer in (self.slow_effect_timer, self.disable_timer):
+            if timer:
+                timer.cancel()
+        self.slow_effect_timer = self.disable_timer = None
+        self.target = None
+        self.timers = None
+
+    def kill(self):
+        super().kill()
+        if self.pool is not None:
+            self.pool.retire(self)
+
+    def update(self, ranges, projectiles, particles, now, damage_multiplier=1.0):
         # VFX update
         if self.vfx_timer > 0:
             self.vfx_timer -= 1
         else:
-            if hasattr(self, 'target') and self.target:
-                self.target = None
+            self.target = None
 
-        # Handle disable effect
-        if self.disable_timer > 0:
-            self.disable_timer -= 1
-            # The visual effect is now handled in draw_vfx
+        if self.disable_timer:
             return # Do not attack if disabled
 
         # Handle slow effect
         current_fire_rate = self.fire_rate
-        if self.slow_effect_timer > 0:
-            self.slow_effect_timer -= 1
+        if self.slow_effect_timer:
             current_fire_rate *= (1 / CHRONO_WARPER_SLOW_FACTOR)
 
-        # Attack logic
-        now = pygame.time.get_ticks()
+        # Attack logic (now is simulation time in ms, so fire rates follow the game clock)
         if now - self.last_shot_time > current_fire_rate:
             self.last_shot_time = now
-            self.target = self.get_target(enemies)
+            self.target = self.get_target(ranges)
             if self.target:
-                self.attack(self.target, enemies, projectiles, particles, screen, damage_multiplier)
-
-        self.projectiles.update()
+                self.attack(self.target, ranges, projectiles, particles, damage_multiplier)
     
-    def draw_vfx(self, surface, offset, overcharge_timer=0):
-        # Draw disable effect if active
-        if self.disable_timer > 0:
-            disable_surface = pygame.Surface((50, 50), pygame.SRCALPHA)
-            pygame.draw.line(disable_surface, (255, 0, 0, 200), (0, 0), (50, 50), 5)
-            pygame.draw.line(disable_surface, (255, 0, 0, 200), (50, 0), (0, 50), 5)
-            surface.blit(disable_surface, (self.rect.left + offset[0], self.rect.top + offset[1]))
-
-        # Draw overcharge effect
+    def disable(self, duration):
+        # A new disable restarts the countdown rather than stacking
+        if self.disable_timer:
+            self.disable_timer.cancel()
+        self.disable_timer = self.timers.schedule(duration, self.end_disable)
+        self.image = assets.get_variant(self.original_image, "disabled")
+
+    def end_disable(self):
+        self.disable_timer = None
+        self.image = self.original_image
+
+    def slow(self, duration):
+        if self.slow_effect_timer:
+            self.slow_effect_timer.cancel()
+        self.slow_effect_timer = self.timers.schedule(duration, self.end_slow)
+
+    def end_slow(self):
+        self.slow_effect_timer = None
+
+    def submit_vfx(self, renderer, offset, overcharge_timer=0):
+        # The disabled look is part of self.image (see update), so only the overcharge glow is added here
         if overcharge_timer > 0:
             pulse = (math.sin(pygame.time.get_ticks() * 0.02) + 1) / 2 # 0 to 1
-            radius = self.rect.width // 2 + int(pulse * 5)
-            alpha = 50 + int(pulse * 100)
-            
-            overcharge_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(overcharge_surface, (255, 255, 0, alpha), (radius, radius), radius)
-            surface.blit(overcharge_surface, (self.rect.centerx - radius + offset[0], self.rect.centery - radius + offset[1]))
-
-    def get_target(self, enemies):
-        closest_enemy = None
-        min_dist = self.range
-        for enemy in enemies:
-            dist = math.hypot(self.rect.centerx - enemy.rect.centerx, self.rect.centery - enemy.rect.centery)
-            if dist < min_dist:
-                min_dist = dist
-                closest_enemy = enemy
-        return closest_enemy
+            step = round(pulse * (assets.OVERCHARGE_GLOW_STEPS - 1))
+            overcharge_surface = assets.get_variant(self.original_image, "overcharged", step)
+            radius = overcharge_surface.get_width() // 2
+            # Same key as the tower itself, submitted after it, so the glow sits right on top of it
+            renderer.submit(overcharge_surface, (self.rect.centerx - radius + offset[0], self.rect.centery - radius + offset[1]), LAYER_WORLD, self.rect.bottom)
+
+    def get_target(self, ranges):
+        # ranges is the simulation's spatial.RangeMatrix (or IndexedRanges), rebuilt after enemies moved this tick
+        return select_target(ranges, self, self.targeting)
 
     def upgrade(self):
         self.level += 1
@@ -91,15 +119,19 @@ class Tower(pygame.sprite.Sprite):
 
 class SunfireSpire(Tower):
     def __init__(self, pos):
+        self.original_image = assets.load_image(assets.TOWER_SUNFIRE_SPIRE, TOWER_SIZE)
+        self.fire_sound = assets.SFX_TOWER_FIRE_SUNFIRE
         super().__init__(pos, SUNFIRE_SPIRE_COST, SUNFIRE_SPIRE_RANGE, SUNFIRE_SPIRE_DAMAGE, SUNFIRE_SPIRE_FIRE_RATE)
-        self.image = pygame.transform.scale(pygame.image.load(assets.TOWER_SUNFIRE_SPIRE).convert_alpha(), TOWER_SIZE)
-        # ADJUST TOWER PLACEMENT: Modify the 'y' value (pos[1]) to shift the tower up or down.
-        # Negative values move it up, positive values move it down.
-        self.rect = self.image.get_rect(center=(pos[0], pos[1] + TOWER_Y_OFFSET))
+
+    def reset(self, pos):
+        super().reset(pos)
         self.locked_target = None
-        self.fire_sound = pygame.mixer.Sound(assets.SFX_TOWER_FIRE_SUNFIRE)
 
-    def update(self, enemies, projectiles, particles, screen, damage_multiplier=1.0):
+    def release(self):
+        super().release()
+        self.locked_target = None
+
+    def update(self, ranges, projectiles, particles, now, damage_multiplier=1.0):
         # Sunfire Spire specific update for target locking
         if self.vfx_timer > 0:
             self.vfx_timer -= 1
@@ -108,120 +140,127 @@ class SunfireSpire(Tower):
 
         # Check if locked target is still valid
         if self.locked_target and self.locked_target.alive():
-            dist = math.hypot(self.rect.centerx - self.locked_target.rect.centerx, self.rect.centery - self.locked_target.rect.centery)
-            if dist > self.range:
+            if ranges.distance_sq(self, self.locked_target) > self.range * self.range:
                 self.locked_target = None # Target out of range
         else:
             self.locked_target = None # Target is dead
 
         # If no locked target, find a new one
         if not self.locked_target:
-            self.locked_target = self.get_target(enemies)
+            self.locked_target = self.get_target(ranges)
 
         # Attack logic
-        now = pygame.time.get_ticks()
         if self.locked_target and now - self.last_shot_time > self.fire_rate:
             self.last_shot_time = now
-            self.attack(self.locked_target, enemies, projectiles, particles, screen, damage_multiplier)
+            self.attack(self.locked_target, ranges, projectiles, particles, damage_multiplier)
 
-    def attack(self, target, enemies, projectiles, particles, screen, damage_multiplier=1.0):
-        if self.fire_sound:
-            self.fire_sound.play()
-        target.take_damage(self.damage * damage_multiplier, self, self.fire_sound)
+    def attack(self, target, ranges, projectiles, particles, damage_multiplier=1.0):
+        audio.sfx.play(self.fire_sound)
+        target.take_damage(self.damage * damage_multiplier, self)
         create_explosion(target.rect.centerx, target.rect.centery, particles)
         self.vfx_timer = 15 # Longer beam
         self.target = target
 
-    def draw_vfx(self, surface, offset, overcharge_timer=0):
-        super().draw_vfx(surface, offset, overcharge_timer)
+    def submit_vfx(self, renderer, offset, overcharge_timer=0):
+        super().submit_vfx(renderer, offset, overcharge_timer)
         if self.vfx_timer > 0 and self.target:
             start_pos = (self.rect.centerx + offset[0], self.rect.centery + offset[1])
             end_pos = (self.target.rect.centerx + offset[0], self.target.rect.centery + offset[1])
-            pygame.draw.line(surface, ORANGE, start_pos, end_pos, 3)
+            renderer.submit_draw(lambda surface: pygame.draw.line(surface, ORANGE, start_pos, end_pos, 3), LAYER_EFFECTS)
 
 class FrostSpire(Tower):
     def __init__(self, pos):
+        self.original_image = assets.load_image(assets.TOWER_FROST_SPIRE, TOWER_SIZE)
+        self.fire_sound = assets.SFX_TOWER_FIRE_FROST
         super().__init__(pos, FROST_SPIRE_COST, FROST_SPIRE_RANGE, FROST_SPIRE_DAMAGE, FROST_SPIRE_FIRE_RATE)
-        self.image = pygame.transform.scale(pygame.image.load(assets.TOWER_FROST_SPIRE).convert_alpha(), TOWER_SIZE)
-        # ADJUST TOWER PLACEMENT: Modify the 'y' value (pos[1]) to shift the tower up or down.
-        self.rect = self.image.get_rect(center=(pos[0], pos[1] + TOWER_Y_OFFSET))
-        self.fire_sound = pygame.mixer.Sound(assets.SFX_TOWER_FIRE_FROST)
 
-    def attack(self, target, enemies, projectiles, particles, screen, damage_multiplier=1.0):
-        if self.fire_sound:
-            self.fire_sound.play()
+    def attack(self, target, ranges, projectiles, particles, damage_multiplier=1.0):
+        audio.sfx.play(self.fire_sound)
         # No damage, only slow
         target.speed = target.original_speed * FROST_SPIRE_SLOW_FACTOR
         target.slow_timer = FROST_SPIRE_SLOW_DURATION
-        # Create a new surface with a semi-transparent blue overlay
-        tinted_image = target.original_image.copy()
-        tint_surface = pygame.Surface(tinted_image.get_size(), pygame.SRCALPHA)
-        tint_surface.fill((*LIGHT_BLUE, 128)) # 128 for 50% transparency
-        tinted_image.blit(tint_surface, (0,0))
-        target.image = tinted_image
+        target.refresh_image() # Switches to the shared frosted variant
         create_frost_effect(target.rect.centerx, target.rect.centery, particles)
         self.vfx_timer = 5 # Shorter beam duration
         self.target = target
 
-    def draw_vfx(self, surface, offset, overcharge_timer=0):
-        super().draw_vfx(surface, offset, overcharge_timer)
+    def submit_vfx(self, renderer, offset, overcharge_timer=0):
+        super().submit_vfx(renderer, offset, overcharge_timer)
         if self.vfx_timer > 0 and self.target:
             # Draw a frozen area circle instead of a beam
             radius = 30
-            overlay = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(overlay, (173, 216, 230, 75), (radius, radius), radius) # Light blue, semi-transparent
+            overlay = frost_overlay()
             draw_pos = (self.target.rect.centerx - radius + offset[0], self.target.rect.centery - radius + offset[1])
-            surface.blit(overlay, draw_pos)
+            renderer.submit(overlay, draw_pos, LAYER_EFFECTS)
+
+_frost_overlay = None
+
+def frost_overlay():
+    # The frozen-area circle is the same for every shot, so it is drawn once and reused
+    global _frost_overlay
+    if _frost_overlay is None:
+        radius = 30
+        _frost_overlay = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(_frost_overlay, (173, 216, 230, 75), (radius, radius), radius) # Light blue, semi-transparent
+    return _frost_overlay
 
 class StormSpire(Tower):
+    has_targeting = False # Strikes everything in range
+
     def __init__(self, pos):
-        super().__init__(pos, STORM_SPIRE_COST, STORM_SPIRE_RANGE, STORM_SPIRE_DAMAGE, STORM_SPIRE_FIRE_RATE)
-        self.image = pygame.transform.scale(pygame.image.load(assets.TOWER_STORM_SPIRE).convert_alpha(), TOWER_SIZE)
-        # ADJUST TOWER PLACEMENT: Modify the 'y' value (pos[1]) to shift the tower up or down.
-        self.rect = self.image.get_rect(center=(pos[0], pos[1] + TOWER_Y_OFFSET))
+        self.original_image = assets.load_image(assets.TOWER_STORM_SPIRE, TOWER_SIZE)
+        self.fire_sound = assets.SFX_TOWER_FIRE_STORM
         self.targets_hit = []
-        self.fire_sound = pygame.mixer.Sound(assets.SFX_TOWER_FIRE_STORM)
+        super().__init__(pos, STORM_SPIRE_COST, STORM_SPIRE_RANGE, STORM_SPIRE_DAMAGE, STORM_SPIRE_FIRE_RATE)
 
-    def update(self, enemies, projectiles, particles, screen, damage_multiplier=1.0):
+    def reset(self, pos):
+        super().reset(pos)
+        self.targets_hit.clear()
+
+    def release(self):
+        super().release()
+        self.targets_hit.clear()
+
+    def update(self, ranges, projectiles, particles, now, damage_multiplier=1.0):
         # VFX update
         if self.vfx_timer > 0:
             self.vfx_timer -= 1
 
         # Storm Spire doesn't need a single target, it attacks all in range.
-        now = pygame.time.get_ticks()
         if now - self.last_shot_time > self.fire_rate:
             self.last_shot_time = now
             # Check if any enemy is in range to justify an attack
-            if self.get_target(enemies):
-                self.attack(None, enemies, projectiles, particles, screen, damage_multiplier)
+            if ranges.count_in_range(self):
+                self.attack(None, ranges, projectiles, particles, damage_multiplier)
 
-    def attack(self, target, enemies, projectiles, particles, screen, damage_multiplier=1.0):
+    def attack(self, target, ranges, projectiles, particles, damage_multiplier=1.0):
         self.vfx_timer = 15 # Lightning duration
         self.targets_hit.clear()
 
         # Find all targets in range first
-        for enemy in list(enemies):
-            if enemy.alive() and math.hypot(self.rect.centerx - enemy.rect.centerx, self.rect.centery - enemy.rect.centery) < self.range:
+        for enemy in ranges.enemies_in_range(self):
+            if enemy.alive():
                 self.targets_hit.append(enemy)
 
         # Only play sound and do damage if there are targets
         if self.targets_hit:
-            if self.fire_sound:
-                self.fire_sound.play()
+            # One sound for the whole volley, not one per enemy struck
+            audio.sfx.play(self.fire_sound)
             for enemy in self.targets_hit:
-                enemy.take_damage(self.damage * damage_multiplier, self, self.fire_sound)
+                enemy.take_damage(self.damage * damage_multiplier, self)
                 create_storm_effect(enemy.rect.centerx, enemy.rect.centery, particles)
 
-    def draw_vfx(self, surface, offset, overcharge_timer=0):
-        super().draw_vfx(surface, offset, overcharge_timer)
-        if self.vfx_timer > 0:
-            for target in self.targets_hit:
-                if target.alive():
-                    self.draw_lightning_bolt(surface, self.rect.center, target.rect.center, offset)
+    def submit_vfx(self, renderer, offset, overcharge_timer=0):
+        super().submit_vfx(renderer, offset, overcharge_timer)
+        if self.vfx_timer > 0 and self.targets_hit:
+            renderer.submit_draw(lambda surface: self.draw_lightning(surface, offset), LAYER_EFFECTS)
+
+    def draw_lightning(self, surface, offset):
+        for target in self.targets_hit:
+            if target.alive():
+                self.draw_lightning_bolt(surface, self.rect.center, target.rect.center, offset)
 
     def draw_lightning_bolt(self, surface, start_pos, end_pos, offset):
-        import random
-        
         start = (start_pos[0] + offset[0], start_pos[1] + offset[1])
         end = (end_pos[0] + offset[0], end_pos[1] + offset[1])
 
@@ -239,7 +278,7 @@ class StormSpire(Tower):
         for i in range(1, num_segments):
             progress = i / num_segments
             pos = (start[0] + dx * progress, start[1] + dy * progress)
-            offset_val = random.uniform(-10, 10)
+            offset_val = visual_rng.uniform(-10, 10)
             perp_dx = -dy / dist
             perp_dy = dx / dist
             points.append((pos[0] + offset_val * perp_dx, pos[1] + offset_val * perp_dy))
@@ -250,4 +289,6 @@ class StormSpire(Tower):
         alpha = int(255 * (self.vfx_timer / 15.0))
         color = (255, 255, 255, alpha)
         
-        pygame.draw.aalines(surface, color, False, points, 2)
\ No newline at end of file
+        pygame.draw.aalines(surface, color, False, points, 2)
+
+TOWER_TYPES = {"sunfire": SunfireSpire, "frost": FrostSpire, "storm": StormSpire}
@@ -1,45 +1,95 @@
 import random
+from collections import namedtuple
+from settings import *
 from enemies import ShadowCrawler, ShadowFlyer, ShieldingSentinel, ChronoWarper, Saboteur, Healer
 
+# One enemy in a wave: spawn it offset ticks after the wave starts, with modifiers applied on top
+# of its type's defaults. Modifiers override attributes; "speed" also sets original_speed.
+SpawnEntry = namedtuple("SpawnEntry", "offset enemy_type modifiers")
+
+ENEMY_CLASSES = (ShadowCrawler, ShadowFlyer, ShieldingSentinel, ChronoWarper, Saboteur, Healer)
+
+# Synergistic squads: a support enemy and the escorts it covers, listed in marching order.
+# Squads only decide who spawns next to whom; every enemy keeps its own type's speed.
+SQUADS = (
+    (ShieldingSentinel, (ShadowCrawler, ShadowCrawler)), # Sentinel soaks fire at the front
+    (Healer, (ShadowCrawler, ShadowFlyer, ShadowCrawler)), # Healer in the middle of its pack
+    (ChronoWarper, (ShadowFlyer, ShadowFlyer)), # Slows the towers the flyers are running past
+    (Saboteur, (ShadowFlyer,)), # Escort draws fire so the Saboteur dies to a tower it can disable
+)
+FODDER_PACK_SIZE = 5
+
 class WaveManager:
-    def __init__(self, path):
+    def __init__(self, path, total_waves=10, pools=None, rng=None):
         self.path = path
-        self.total_waves = 10
+        self.total_waves = total_waves
+        self.pools = pools # Optional PoolSet that enemies are drawn from
+        self.rng = rng if rng is not None else random.Random() # The simulation's seeded RNG, so waves replay
+
+    def roster(self, wave_number):
+        """Returns how many of each enemy type the wave contains."""
+        counts = {
+            # Simple scaling for basic enemies
+            ShadowCrawler: wave_number * 3,
+            ShadowFlyer: wave_number * 2,
+            # Introduce new archetypes
+            ShieldingSentinel: max(0, wave_number - 3),
+            Healer: max(0, (wave_number - 4) // 2),
+            ChronoWarper: max(0, wave_number - 5),
+            Saboteur: max(0, wave_number - 7),
+        }
+        return counts
+
+    def squads(self, wave_number):
+        """Splits the wave's roster into squads, each a list of enemy types in marching order."""
+        counts = self.roster(wave_number)
+        squads = []
+        for leader, escorts in SQUADS:
+            for _ in range(counts[leader]):
+                counts[leader] -= 1
+                squad = [leader]
+                for escort in escorts:
+                    # Escorts come out of the basic enemies; late in a wave there may be none left
+                    if counts[escort] > 0:
+                        counts[escort] -= 1
+                        squad.append(escort)
+                if leader is Healer:
+                    squad.insert(len(squad) // 2, squad.pop(0))
+                squads.append(squad)
+        fodder = [enemy_type for enemy_type in (ShadowCrawler, ShadowFlyer) for _ in range(counts[enemy_type])]
+        self.rng.shuffle(fodder)
+        for i in range(0, len(fodder), FODDER_PACK_SIZE):
+            squads.append(fodder[i:i + FODDER_PACK_SIZE])
+        self.rng.shuffle(squads)
+        return squads
+
+    def wave_stream(self, wave_number):
+        """Yields the wave's SpawnEntry rows in offset order without creating any enemies.
+
+        Squad members are WAVE_SQUAD_SPACING ticks apart and squads WAVE_SQUAD_INTERVAL ticks
+        apart, so a wave of any size is built a few enemies per tick at most.
+        """
+        offset = 0
+        for squad in self.squads(wave_number):
+            for enemy_type in squad:
+                yield SpawnEntry(offset, enemy_type, {})
+                offset += WAVE_SQUAD_SPACING
+            offset += WAVE_SQUAD_INTERVAL - WAVE_SQUAD_SPACING
+
+    def spawn(self, entry):
+        """Creates the enemy an entry describes, at the start of the path."""
+        if self.pools is not None:
+            enemy = self.pools.acquire(entry.enemy_type, self.path)
+        else:
+            enemy = entry.enemy_type(self.path)
+        for name, value in entry.modifiers.items():
+            setattr(enemy, name, value)
+        if "speed" in entry.modifiers:
+            enemy.original_speed = entry.modifiers["speed"]
+        if "health" in entry.modifiers:
+            enemy.max_health = entry.modifiers["health"]
+        return enemy
 
     def get_wave(self, wave_number):
-        wave_enemies = []
-        
-        # Simple scaling for basic enemies
-        num_crawlers = wave_number * 3
-        num_flyers = wave_number * 2
-
-        for _ in range(num_crawlers):
-            wave_enemies.append(ShadowCrawler(self.path))
-        for _ in range(num_flyers):
-            wave_enemies.append(ShadowFlyer(self.path))
-
-        # Introduce new archetypes
-        if wave_number >= 4:
-            num_sentinels = (wave_number - 3) * 1
-            for _ in range(num_sentinels):
-                wave_enemies.append(ShieldingSentinel(self.path))
-        
-        if wave_number >= 5:
-            num_healers = (wave_number - 4) // 2
-            for _ in range(num_healers):
-                wave_enemies.append(Healer(self.path))
-
-        if wave_number >= 6:
-            num_warpers = (wave_number - 5) * 1
-            for _ in range(num_warpers):
-                wave_enemies.append(ChronoWarper(self.path))
-
-        if wave_number >= 8:
-            num_saboteurs = (wave_number - 7) * 1
-            for _ in range(num_saboteurs):
-                wave_enemies.append(Saboteur(self.path))
-
-        # Future: Add synergistic squads here
-
-        random.shuffle(wave_enemies)
-        return wave_enemies
\ No newline at end of file
+        # The whole wave at once, ignoring offsets; for tools that want every enemy up front
+        return [self.spawn(entry) for entry in self.wave_stream(wave_number)]